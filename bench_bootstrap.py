@@ -0,0 +1,90 @@
+import asyncio
+import sys
+import threading
+import time
+from models import bootstrapNode
+from models.bootstrapNode import BootstrapNode
+from models.membership import Membership
+from utils.framing import PROTOCOLS, handshake_line, accept_codec
+
+BOOTSTRAP = ("127.0.0.1", 6510)
+MINERS = 2000
+SILENT = 200  # miners that stop heartbeating and should be expired
+HEARTBEAT_INTERVAL = 1
+GET_MINERS_SAMPLES = 200
+
+bootstrapNode.MINER_EXPIRY = 5  # short, so expiry shows within the run
+PROTOCOL = PROTOCOLS["json"]
+
+
+async def fake_miner(port, stop_at, registered):
+    """Registers, then heartbeats over one connection until stop_at (monotonic time)."""
+    reader, writer = await asyncio.open_connection(*BOOTSTRAP)
+    writer.write(handshake_line("MINER", ["json"]))
+    accept_codec(await reader.readline())
+    writer.write(PROTOCOL.pack({"type": "REGISTER_MINER", "ip": "10.0.0.1", "port": port}))
+    await PROTOCOL.read_payload(reader)
+    registered.append(port)
+    seq = 0
+    while time.monotonic() < stop_at:
+        await asyncio.sleep(HEARTBEAT_INTERVAL)
+        seq += 1
+        writer.write(PROTOCOL.pack({"type": "HEARTBEAT", "ip": "10.0.0.1", "port": port, "seq": seq,
+                                    "load": {"mempool": port % 100, "peers": 8}, "latency_ms": 1.0}))
+        await PROTOCOL.read_payload(reader)
+    await asyncio.sleep(3600)  # stay connected but silent, like a hung miner
+
+
+async def get_miners():
+    reader, writer = await asyncio.open_connection(*BOOTSTRAP)
+    writer.write(handshake_line("WALLET", ["json"]))
+    accept_codec(await reader.readline())
+    start = time.perf_counter()
+    writer.write(PROTOCOL.pack({"type": "GET_MINERS"}))
+    miners = PROTOCOL.decode(await PROTOCOL.read_payload(reader))
+    elapsed = time.perf_counter() - start
+    writer.close()
+    return elapsed, miners
+
+
+async def main(miner_count):
+    registered = []
+    now = time.monotonic()
+    start = time.perf_counter()
+    tasks = [asyncio.create_task(fake_miner(port, now + 2 if port < SILENT else now + 3600, registered))
+             for port in range(miner_count)]
+    while len(registered) < miner_count:
+        await asyncio.sleep(0.01)
+    print(f"[BENCH] {miner_count} miners registered in {time.perf_counter() - start:.2f}s, "
+          f"threads in this process (bootstrap included): {threading.active_count()}")
+
+    latencies = []
+    for _ in range(GET_MINERS_SAMPLES):
+        elapsed, miners = await get_miners()
+        latencies.append(elapsed)
+        await asyncio.sleep(0.01)
+    latencies.sort()
+    print(f"[BENCH] GET_MINERS with {miner_count} heartbeats/s: p50 {latencies[len(latencies) // 2] * 1000:.1f} ms, "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.1f} ms, {len(miners)} miners, "
+          f"sample entry {miners[-1]}")
+
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline and len(view.miners) > miner_count - SILENT:
+        await asyncio.sleep(0.1)
+    print(f"[BENCH] {SILENT} silent miners expired after {bootstrapNode.MINER_EXPIRY}s: "
+          f"subscriber sees {len(view.miners)} miners, GET_MINERS lists {len((await get_miners())[1])}")
+    for task in tasks:
+        task.cancel()
+
+
+if __name__ == "__main__":
+    miner_count = int(sys.argv[1]) if len(sys.argv) > 1 else MINERS
+    bootstrap = BootstrapNode(*BOOTSTRAP)
+    threading.Thread(target=bootstrap.start, daemon=True).start()
+    time.sleep(0.5)
+    view = Membership(BOOTSTRAP, "WALLET")
+    view.start()
+    view.synced.wait(5)
+    asyncio.run(main(miner_count))
+    view.stop()
+    bootstrap.running = False
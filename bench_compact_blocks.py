@@ -0,0 +1,92 @@
+import sys
+import time
+import models.Miner as miner_module
+from models.Miner import Miner
+from models.wallet import Wallet
+
+MINER_IP = "127.0.0.1"
+PORTS = [6400, 6401]
+BLOCK_SIZES = [4, 1000]
+ROUNDS = 5
+BLOCK_STATS = ["block_inv_bytes", "block_getdata_bytes", "block_data_bytes",
+               "block_compact_bytes", "block_getblocktxn_bytes", "block_txn_bytes"]
+
+
+def block_bytes(miners):
+    return sum(m.gossip.get_stats()[key] for m in miners for key in BLOCK_STATS)
+
+
+def wait_for(condition, timeout=30):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.0005)
+    return condition()
+
+
+def run(miners, wallet, block_size, compact, missing_share, rounds):
+    """Average relay bytes and latency of blocks mined on miners[0] and relayed to miners[1]."""
+    origin, peer = miners
+    origin.gossip.compact_blocks = compact
+    announced = {}
+    announce_block = origin.gossip.announce_block
+
+    def timed_announce(block, source=None):
+        announced[block.hash] = time.perf_counter()
+        announce_block(block, source)
+
+    origin.gossip.announce_block = timed_announce
+    total_bytes, total_latency = 0, 0.0
+    for _ in range(rounds):
+        missing = int(block_size * missing_share)
+        start = run.counter
+        run.counter += block_size
+        # Relayed ahead of the block, so the peer has them in its mempool
+        wallet.send_transactions([(f"Receiver{i}", 1) for i in range(start, start + block_size - missing)])
+        wait_for(lambda: len(peer.mempool) >= block_size - missing)
+        # Known only to the origin, with a fee that gets them into the block
+        origin.add_transactions_to_mempool([{"sender": wallet.owner, "receiver": f"Receiver{i}", "amount": 1, "fee": 1}
+                                            for i in range(start + block_size - missing, start + block_size)],
+                                           source=peer.port)
+        before = block_bytes(miners)
+        block = origin.produce_block()
+        if not wait_for(lambda: peer.chain_index.has_block(block.hash)):
+            raise RuntimeError("block did not reach the peer")
+        total_latency += time.perf_counter() - announced[block.hash]
+        time.sleep(0.05)  # let the trailing relay messages be counted
+        total_bytes += block_bytes(miners) - before
+    origin.gossip.announce_block = announce_block
+    return total_bytes / rounds, total_latency / rounds
+
+
+run.counter = 0
+
+
+if __name__ == "__main__":
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else ROUNDS
+    miners = [Miner(MINER_IP, port, MINER_IP, 5500) for port in PORTS]
+    for miner in miners:
+        miner.running = True
+        miner.server.start()
+        miner.gossip.start()
+    miners[0].connect_to_miner(MINER_IP, PORTS[1])
+    miners[1].connect_to_miner(MINER_IP, PORTS[0])
+    time.sleep(0.5)
+
+    wallet = Wallet("BenchSender", 10 ** 9)
+    wallet.miners = [{"ip": MINER_IP, "port": PORTS[0]}]
+    for block_size in BLOCK_SIZES:
+        miner_module.TRANS_PER_BLOCK = block_size
+        full_bytes, full_latency = run(miners, wallet, block_size, False, 0.0, rounds)
+        print(f"[BENCH] {block_size}-tx blocks, full relay: {full_bytes:,.0f} bytes, {full_latency * 1000:.1f} ms")
+        for missing_share in (0.0, 0.1):
+            before = miners[1].gossip.get_stats()
+            compact_bytes, compact_latency = run(miners, wallet, block_size, True, missing_share, rounds)
+            after = miners[1].gossip.get_stats()
+            hits = after["compact_tx_hits"] - before["compact_tx_hits"]
+            total = hits + after["compact_tx_missing"] - before["compact_tx_missing"]
+            print(f"[BENCH] {block_size}-tx blocks, compact relay, {missing_share:.0%} unrelayed: "
+                  f"{compact_bytes:,.0f} bytes ({compact_bytes / full_bytes:.0%}), "
+                  f"{compact_latency * 1000:.1f} ms, hit rate {hits / total:.0%}")
+    wallet.close()
+    for miner in miners:
+        miner.stop()
@@ -0,0 +1,56 @@
+import asyncio
+import resource
+import sys
+import time
+from models.Miner import Miner
+from models.minerServer import raise_fd_limit
+from utils.framing import accept_codec, handshake_line
+
+MINER_IP = "127.0.0.1"
+MINER_PORT = 6101
+CONNECTIONS = 10000
+CONNECT_BATCH = 500
+
+
+async def open_wallet_connection():
+    reader, writer = await asyncio.open_connection(MINER_IP, MINER_PORT)
+    writer.write(handshake_line("WALLET"))
+    protocol = accept_codec(await reader.readline())
+    return reader, writer, protocol
+
+
+async def run(connections):
+    start = time.perf_counter()
+    conns = []
+    for i in range(0, connections, CONNECT_BATCH):
+        batch = min(CONNECT_BATCH, connections - i)
+        conns += await asyncio.gather(*(open_wallet_connection() for _ in range(batch)))
+    connected = time.perf_counter() - start
+    print(f"[BENCH] {len(conns)} wallet connections open after {connected:.2f}s")
+
+    # Every connection stays open and sends one request at the same time
+    for i, (_, writer, protocol) in enumerate(conns):
+        writer.write(protocol.pack({"type": "GET_BALANCE", "wallet": f"Client{i}"}))
+    replies = await asyncio.gather(*(protocol.read_payload(reader) for reader, _, protocol in conns))
+    answered = sum(1 for reply, (_, _, protocol) in zip(replies, conns)
+                   if reply and protocol.decode(reply).get("status") == "success")
+    print(f"[BENCH] {answered}/{len(conns)} concurrent GET_BALANCE answered in {time.perf_counter() - start - connected:.2f}s")
+
+    for _, writer, _ in conns:
+        writer.close()
+
+
+if __name__ == "__main__":
+    connections = int(sys.argv[1]) if len(sys.argv) > 1 else CONNECTIONS
+    raise_fd_limit()  # client and server share this process, so 2 fds per connection
+    fd_limit = resource.getrlimit(resource.RLIMIT_NOFILE)[0]
+    if 2 * connections + 100 > fd_limit:
+        connections = (fd_limit - 100) // 2
+        print(f"[BENCH] Open file limit is {fd_limit}, running {connections} connections instead")
+
+    # Only the network front end is needed; no bootstrap or peers
+    miner = Miner(MINER_IP, MINER_PORT, MINER_IP, 5500)
+    miner.running = True
+    miner.server.start()
+    asyncio.run(run(connections))
+    miner.stop()
@@ -0,0 +1,75 @@
+import json
+import socket
+import sys
+import threading
+import time
+from utils.framing import PROTOCOLS, FramedSocket
+
+SIZES_MB = [1, 4, 16]
+
+
+def make_message(size_mb):
+    # A block-like message with non-ASCII text so multi-byte characters straddle reads
+    tx = {"sender": "Zoë Müller", "receiver": "Jürgen Čapek", "amount": 1, "fee": 0}
+    count = size_mb * 1024 * 1024 // len(json.dumps(tx))
+    return {"hash": "00" * 32, "transactions": [tx] * count}
+
+
+def old_line_reader(sock):
+    """The reader the nodes used before: decode each chunk and rescan the buffer."""
+    buffer = ""
+    while True:
+        data = sock.recv(4096).decode()
+        if not data:
+            return None
+        buffer += data
+        if "\n" in buffer:
+            line, _ = buffer.split("\n", 1)
+            return json.loads(line)
+
+
+def timed(sender, receiver):
+    a, b = socket.socketpair()
+    thread = threading.Thread(target=sender, args=(a,))
+    start = time.perf_counter()
+    thread.start()
+    try:
+        result = receiver(b)
+    except UnicodeDecodeError:
+        result = "UnicodeDecodeError"
+    elapsed = time.perf_counter() - start
+    a.close()
+    b.close()
+    thread.join()
+    return elapsed, result
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES_MB
+    for size_mb in sizes:
+        message = make_message(size_mb)
+        line = (json.dumps(message, ensure_ascii=False) + "\n").encode()
+        # ASCII-escaped copy for the old reader, which cannot survive a character split across reads
+        escaped = (json.dumps(message) + "\n").encode()
+
+        def send_line(sock):
+            try:
+                sock.sendall(line)
+            except OSError:
+                pass
+        old_time, old_result = timed(send_line, old_line_reader)
+
+        def send_escaped(sock):
+            sock.sendall(escaped)
+        escaped_time, _ = timed(send_escaped, old_line_reader)
+
+        frame = PROTOCOLS["json"].pack(message)
+
+        def send_frame(sock):
+            sock.sendall(frame)
+        new_time, new_result = timed(send_frame, lambda sock: FramedSocket(sock, PROTOCOLS["json"]).recv())
+
+        utf8 = "failed with " + old_result if isinstance(old_result, str) else "ok"
+        ok = "ok" if new_result == message else "MISMATCH"
+        print(f"[BENCH] {size_mb:3d} MB message: newline reader {escaped_time:.3f}s (raw UTF-8: {utf8}), "
+              f"framed reader {new_time:.3f}s ({ok})")
@@ -0,0 +1,58 @@
+import sys
+import time
+from models.Miner import Miner
+from models.wallet import Wallet
+from utils.framing import PROTOCOLS
+
+MINER_IP = "127.0.0.1"
+BASE_PORT = 6200
+MINER_COUNTS = [2, 4, 8]
+TRANSACTIONS = 1000
+BATCH = 20
+
+
+def run(miner_count, transactions):
+    ports = [BASE_PORT + miner_count * 10 + i for i in range(miner_count)]
+    # Only the network front end and gossip are needed; no bootstrap or mining
+    miners = [Miner(MINER_IP, port, MINER_IP, 5500) for port in ports]
+    for miner in miners:
+        miner.running = True
+        miner.server.start()
+        miner.gossip.start()
+    for miner in miners:  # every miner dials every other, as maintain_miner_connections does
+        for port in ports:
+            if port != miner.port:
+                miner.connect_to_miner(MINER_IP, port)
+    time.sleep(0.5)
+
+    wallet = Wallet("BenchSender", 10 ** 9)
+    wallet.miners = [{"ip": MINER_IP, "port": port} for port in ports]
+    for i in range(0, transactions, BATCH):
+        wallet.send_transactions([(f"Receiver{j}", 1) for j in range(i, i + BATCH)])
+
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline and any(len(m.mempool) < transactions for m in miners):
+        time.sleep(0.1)
+    time.sleep(0.5)
+    propagated = min(len(m.mempool) for m in miners)
+
+    stats = [m.gossip.get_stats() for m in miners]
+    tx_bytes = sum(s["tx_bytes_sent"] for s in stats)
+    wallet.close()
+    for miner in miners:
+        miner.stop()
+    return propagated, tx_bytes / transactions
+
+
+if __name__ == "__main__":
+    transactions = int(sys.argv[1]) if len(sys.argv) > 1 else TRANSACTIONS
+    # What the old full-payload flood sent per transaction: the origin pushed it to its
+    # n - 1 peers and each of them re-pushed it on all n - 1 of its own outbound
+    # connections (the sender's inbound socket was the only one excluded), n * (n - 1) copies
+    payload = len(PROTOCOLS["json"].pack(
+        {"type": "TRANSACTION", "sender": "BenchSender", "receiver": "Receiver100", "amount": 1, "fee": 0}))
+    for miner_count in MINER_COUNTS:
+        propagated, per_tx = run(miner_count, transactions)
+        flood = miner_count * (miner_count - 1) * payload
+        print(f"[BENCH] {miner_count} miners: {propagated}/{transactions} transactions on every miner, "
+              f"{per_tx:,.0f} gossip bytes/tx (flood: {flood:,} bytes/tx, {per_tx / flood:.0%})")
@@ -0,0 +1,66 @@
+import random
+import sys
+import time
+from types import SimpleNamespace
+import models.ledger as ledger_module
+from models.accountState import AccountState
+from models.ledger import Ledger, QUERIES
+from models.transaction import Transaction
+
+BLOCKS = 5000
+TRANS_PER_BLOCK = 200
+WALLETS = 10000
+ROUNDS = 3
+
+
+def build_chain(blocks, per_block, wallets):
+    rng = random.Random(1)
+    names = [f"Wallet{i}" for i in range(wallets)]
+    return [SimpleNamespace(transactions=[
+        Transaction(rng.choice(names), rng.choice(names), rng.randrange(3), rng.randrange(1, 1000))
+        for _ in range(per_block)]) for _ in range(blocks)]
+
+
+def timed(fn, rounds=ROUNDS):
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def rescan_report(chain):
+    """The queries answered the old way: loops over every Block's Transaction objects."""
+    balances = AccountState.rescan(chain, [])
+    sent, fees = {}, []
+    for block in chain:
+        fees.append(sum(tx.transaction_fees for tx in block.transactions))
+        for tx in block.transactions:
+            sent[tx.sender] = sent.get(tx.sender, 0) + tx.amount
+    return balances, sorted(sent, key=sent.get, reverse=True)[:10], fees
+
+
+if __name__ == "__main__":
+    blocks = int(sys.argv[1]) if len(sys.argv) > 1 else BLOCKS
+    chain = build_chain(blocks, TRANS_PER_BLOCK, WALLETS)
+    print(f"[BENCH] {blocks} blocks x {TRANS_PER_BLOCK} transactions, {WALLETS} wallets")
+
+    ledger = Ledger()
+    start = time.perf_counter()
+    for height, block in enumerate(chain):
+        ledger.add_block(height, block.transactions)
+    appended = time.perf_counter() - start
+    print(f"[BENCH] ledger append: {appended / blocks * 1e6:.0f} us per block")
+
+    elapsed, _ = timed(lambda: rescan_report(chain))
+    print(f"[BENCH] object rescan (balances, top senders, fees per block): {elapsed * 1000:.0f} ms")
+    numpy = ledger_module.np
+    backends = [("numpy", numpy), ("python", None)] if numpy is not None else [("python", None)]
+    for name, module in backends:
+        ledger_module.np = module
+        elapsed, _ = timed(lambda: ledger.query(QUERIES))
+        print(f"[BENCH] ledger query ({name}), whole chain: {elapsed * 1000:.0f} ms")
+        elapsed, _ = timed(lambda: ledger.query(QUERIES, blocks - 100, None))
+        print(f"[BENCH] ledger query ({name}), last 100 blocks: {elapsed * 1000:.1f} ms")
+    ledger_module.np = numpy
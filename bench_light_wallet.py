@@ -0,0 +1,107 @@
+import contextlib
+import io
+import json
+import random
+import sys
+import time
+from models.Miner import Miner
+from models.block import Block
+from models.transaction import Transaction
+from models.wallet import Wallet
+
+MINER_IP = "127.0.0.1"
+PORT = 6702
+BLOCKS = 2000
+TRANS_PER_BLOCK = 50
+WALLETS = 1000
+OWNER = "LightWallet"
+OWNER_SHARE = 0.01  # share of transactions from or to the measured wallet
+
+
+def build_chain(miner, blocks):
+    rng = random.Random(1)
+    names = [f"Wallet{i}" for i in range(WALLETS)]
+    with contextlib.redirect_stdout(io.StringIO()):  # mine_block prints every block
+        for height in range(blocks):
+            transactions = []
+            for i in range(TRANS_PER_BLOCK):
+                sender, receiver = rng.choice(names), rng.choice(names)
+                if rng.random() < OWNER_SHARE:
+                    sender, receiver = (OWNER, receiver) if rng.random() < 0.5 else (sender, OWNER)
+                # A distinct fee keeps txids unique, as the mempool would
+                transactions.append(Transaction(sender, receiver, height * TRANS_PER_BLOCK + i, rng.randrange(1, 10)))
+            block = Block(transactions, miner.last_block_hash)
+            block.mine_block()
+            with miner.chain_lock:
+                miner.append_block(block)
+
+
+def state_size(light):
+    """Bytes the light client keeps: the tip plus its verified and pending transaction ids."""
+    size = sys.getsizeof(light.tip_hash) + sys.getsizeof(light.confirmed) + sys.getsizeof(light.pending)
+    return size + sum(sys.getsizeof(txid) for txid in list(light.confirmed) + list(light.pending))
+
+
+def metered(wallet):
+    """Count the JSON bytes of every reply the wallet receives."""
+    received = [0]
+    request, request_miner = wallet.request, wallet.request_miner
+
+    def count(reply):
+        received[0] += len(json.dumps(reply)) if reply is not None else 0
+        return reply
+    wallet.request = lambda message: count(request(message))
+    wallet.request_miner = lambda miner, message: count(request_miner(miner, message))  # light syncs
+    return received
+
+
+def full_scan(wallet):
+    """What verifying the balance took before: download every block and sum the wallet's transactions."""
+    net, height = 0, 0
+    while True:
+        reply = wallet.request({"type": "GET_BLOCKCHAIN", "from_height": height})
+        for block in reply["blockchain"]:
+            for tx in block["transactions"]:
+                net += tx["amount"] * ((tx["receiver"] == OWNER) - (tx["sender"] == OWNER))
+        if reply["next_height"] > reply["tip_height"]:
+            return net
+        height = reply["next_height"]
+
+
+if __name__ == "__main__":
+    blocks = int(sys.argv[1]) if len(sys.argv) > 1 else BLOCKS
+    miner = Miner(MINER_IP, PORT, MINER_IP, 5500, ledger=True)  # indexed wallet proofs
+    miner.running = True
+    miner.server.start()
+    build_chain(miner, blocks)
+    time.sleep(0.2)
+    expected = miner.calculate_balance(OWNER)
+    print(f"[BENCH] {blocks} blocks x {TRANS_PER_BLOCK} transactions, "
+          f"{len(miner.ledger.wallet_locations(OWNER))} from or to {OWNER}")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        wallet = Wallet(OWNER, 0, light=True)
+        wallet.miners = [{"ip": MINER_IP, "port": PORT}]
+        received = metered(wallet)
+        start = time.perf_counter()
+        wallet.update_balance()
+        elapsed = time.perf_counter() - start
+    print(f"[BENCH] light sync: {elapsed:.2f}s, {received[0] / 1024:.0f} KiB received, "
+          f"{state_size(wallet.light) / 1024:.0f} KiB of light client state, {wallet.light.stats}, balance {wallet.balance} "
+          f"(miner says {expected})")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        received[0] = 0
+        start = time.perf_counter()
+        net = full_scan(wallet)
+        elapsed = time.perf_counter() - start
+    print(f"[BENCH] full block download: {elapsed:.2f}s, {received[0] / 1024:.0f} KiB received, balance {net}")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        build_chain(miner, 10)
+        received[0] = 0
+        wallet.update_balance()
+    print(f"[BENCH] incremental light sync after 10 more blocks: {received[0] / 1024:.1f} KiB received, "
+          f"height {wallet.light.height}")
+    wallet.close()
+    miner.stop()
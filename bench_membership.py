@@ -0,0 +1,72 @@
+import sys
+import threading
+import time
+from models.bootstrapNode import BootstrapNode
+from models.membership import Membership
+from utils.framing import FramedSocket
+
+BOOTSTRAP = ("127.0.0.1", 6500)
+REGISTERED = 100
+SUBSCRIBERS = 50
+JOINS = 20
+POLL_INTERVAL = 5  # seconds between the old GET_MINERS polls
+
+
+def register(port):
+    conn = FramedSocket.connect(BOOTSTRAP, "MINER", timeout=5)
+    try:
+        conn.send({"type": "REGISTER_MINER", "ip": "10.0.0.1", "port": port})
+        conn.recv()
+    finally:
+        conn.close()
+
+
+def wait_until(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.0005)
+    return condition()
+
+
+if __name__ == "__main__":
+    subscribers = int(sys.argv[1]) if len(sys.argv) > 1 else SUBSCRIBERS
+    bootstrap = BootstrapNode(*BOOTSTRAP)
+    threading.Thread(target=bootstrap.start, daemon=True).start()
+    time.sleep(0.5)
+    for port in range(REGISTERED):
+        register(port)
+
+    views = [Membership(BOOTSTRAP, "WALLET") for _ in range(subscribers)]
+    for view in views:
+        view.start()
+    for view in views:
+        view.synced.wait(5)
+
+    join_latency = []
+    for port in range(REGISTERED, REGISTERED + JOINS):
+        start = time.perf_counter()
+        register(port)
+        wait_until(lambda: all(("10.0.0.1", port) in view.miners for view in views))
+        join_latency.append(time.perf_counter() - start)
+
+    # A miner that subscribes with its address leaves when its connection closes
+    leaver = Membership(BOOTSTRAP, "MINER", address=("10.0.0.2", 1))
+    leaver.start()
+    wait_until(lambda: all(("10.0.0.2", 1) in view.miners for view in views))
+    start = time.perf_counter()
+    leaver.stop()
+    wait_until(lambda: all(("10.0.0.2", 1) not in view.miners for view in views))
+    leave_latency = time.perf_counter() - start
+
+    average = sum(join_latency) / len(join_latency)
+    print(f"[BENCH] {subscribers} subscribers, {REGISTERED + JOINS} miners registered")
+    print(f"[BENCH] join seen by every subscriber after {average * 1000:.1f} ms on average "
+          f"(polling every {POLL_INTERVAL}s: {POLL_INTERVAL / 2 * 1000:.0f} ms on average)")
+    print(f"[BENCH] leave seen by every subscriber after {leave_latency * 1000:.1f} ms (polling: never)")
+    print(f"[BENCH] idle bootstrap load: 0 requests/min "
+          f"(polling: {subscribers * 60 // POLL_INTERVAL} connections + GET_MINERS/min)")
+    print(f"[BENCH] all views agree: {len({tuple(sorted(view.miners)) for view in views}) == 1}, "
+          f"version {bootstrap.version}")
+    for view in views:
+        view.stop()
+    bootstrap.running = False
@@ -0,0 +1,44 @@
+import hashlib
+import json
+import sys
+import time
+from models.block import Block, verify_merkle_proof
+from models.transaction import Transaction
+
+BLOCK_SIZES = [100, 1000, 10000]
+ROUNDS = 200
+
+
+def legacy_merkle_root(transactions):
+    """The previous build_merkle_root: every leaf re-serialized, only the root kept."""
+    layer = [hashlib.sha256(json.dumps(tx.tx_to_dict(), sort_keys=True).encode()).hexdigest() for tx in transactions]
+    while len(layer) > 1:
+        layer = [hashlib.sha256((layer[i] + (layer[i + 1] if i + 1 < len(layer) else layer[i])).encode()).hexdigest()
+                 for i in range(0, len(layer), 2)]
+    return layer[0]
+
+
+def per_call(fn, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - start) / rounds
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or BLOCK_SIZES
+    for size in sizes:
+        block = Block([Transaction(f"Sender{i}", f"Receiver{i}", i % 3, i) for i in range(size)], "0" * 64)
+        received = json.loads(json.dumps(block.to_dict()))
+        rounds = max(1, ROUNDS * 100 // size)
+        legacy = per_call(lambda: legacy_merkle_root(Block.from_dict(received).transactions), rounds)
+        check = per_call(lambda: Block.from_dict(received).merkle_valid(), rounds)
+        position = size // 2
+        proof = block.merkle_proof(position)
+        txid = block.txids[position]
+        verify = per_call(lambda: verify_merkle_proof(txid, position, proof, block.merkle_root), 10000)
+        proof_bytes = len(json.dumps({"proof": proof, "header": block.header()}))
+        print(f"[BENCH] {size}-tx block: receive + root check {check * 1000:.2f} ms "
+              f"(rebuilding it from re-serialized leaves as before: {legacy * 1000:.2f} ms); "
+              f"proof {len(proof)} hashes, {proof_bytes} B with header vs {len(json.dumps(received))} B block, "
+              f"verified in {verify * 1e6:.1f} us")
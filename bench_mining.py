@@ -0,0 +1,63 @@
+import time
+from models.block import Block
+from models.transaction import Transaction
+from utils.constants import TRANS_PER_BLOCK
+
+ATTEMPTS = 200000
+
+
+def make_block():
+    transactions = [
+        Transaction(f"Client{i}", f"Client{i + 1}", i, 10 + i)
+        for i in range(TRANS_PER_BLOCK)
+    ]
+    return Block(transactions, "0" * 64)
+
+
+def bench_full_serialization(block, attempts):
+    """Old path: rebuild and re-serialize the whole block for every nonce."""
+    start = time.perf_counter()
+    for nonce in range(attempts):
+        block.nonce = nonce
+        block.compute_hash()
+    return attempts / (time.perf_counter() - start)
+
+
+def bench_midstate(block, attempts):
+    """New path: copy the precomputed SHA-256 state and feed only the nonce."""
+    start = time.perf_counter()
+    midstate, suffix = block.hash_template()
+    for nonce in range(attempts):
+        h = midstate.copy()
+        h.update(str(nonce).encode())
+        h.update(suffix)
+        h.hexdigest()
+    return attempts / (time.perf_counter() - start)
+
+
+def check_compatible(block):
+    """Both paths must agree so peers accept midstate-mined blocks."""
+    midstate, suffix = block.hash_template()
+    for nonce in (0, 1, 12345, 10 ** 9):
+        block.nonce = nonce
+        h = midstate.copy()
+        h.update(str(nonce).encode())
+        h.update(suffix)
+        assert h.hexdigest() == block.compute_hash(), f"hash mismatch at nonce {nonce}"
+
+
+if __name__ == "__main__":
+    block = make_block()
+    check_compatible(block)
+
+    before = bench_full_serialization(block, ATTEMPTS)
+    after = bench_midstate(block, ATTEMPTS)
+    print(f"[BENCH] {TRANS_PER_BLOCK} transactions per block, {ATTEMPTS} attempts")
+    print(f"[BENCH] compute_hash per nonce: {before:,.0f} hashes/sec")
+    print(f"[BENCH] midstate per nonce:     {after:,.0f} hashes/sec")
+    print(f"[BENCH] speedup: {after / before:.1f}x")
+
+    mined = make_block()
+    mined.mine_block()
+    assert mined.hash == mined.compute_hash()
+    print(f"[BENCH] mine_block() result verified against compute_hash()")
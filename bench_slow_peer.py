@@ -0,0 +1,72 @@
+import socket
+import sys
+import threading
+import time
+from models import minerServer
+from models.Miner import Miner
+from models.wallet import Wallet
+
+MINER_IP = "127.0.0.1"
+PORTS = [6300, 6301]
+STALLED_PORT = 6309
+TRANSACTIONS = 40000
+BATCH = 500
+
+# Small limits so the stalled peer hits them within a short run
+minerServer.PEER_QUEUE_MAX_BYTES = 256 * 1024
+minerServer.PEER_SEND_TIMEOUT = 3
+
+
+def stalled_peer(listener):
+    """Accepts one miner connection, finishes the handshake and never reads again."""
+    conn, _ = listener.accept()
+    conn.recv(64)
+    conn.sendall(b"CODEC json\n")
+    time.sleep(3600)
+
+
+if __name__ == "__main__":
+    transactions = int(sys.argv[1]) if len(sys.argv) > 1 else TRANSACTIONS
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    listener.bind((MINER_IP, STALLED_PORT))
+    listener.listen()
+    threading.Thread(target=stalled_peer, args=(listener,), daemon=True).start()
+
+    miners = [Miner(MINER_IP, port, MINER_IP, 5500) for port in PORTS]
+    for miner in miners:
+        miner.running = True
+        miner.server.start()
+        miner.gossip.start()
+    miners[0].connect_to_miner(MINER_IP, PORTS[1])
+    miners[1].connect_to_miner(MINER_IP, PORTS[0])
+    miners[0].connect_to_miner(MINER_IP, STALLED_PORT)
+    # Keep the kernel from absorbing the stall in megabytes of socket buffer
+    stalled = miners[0].miner_connections[-1]
+    stalled.writer.get_extra_info("socket").setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4096)
+    time.sleep(0.5)
+
+    wallet = Wallet("BenchSender", 10 ** 9)
+    wallet.miners = [{"ip": MINER_IP, "port": PORTS[0]}]
+    start = time.perf_counter()
+    for i in range(0, transactions, BATCH):
+        wallet.send_transactions([(f"Receiver{j}", 1) for j in range(i, i + BATCH)])
+    ingest = time.perf_counter() - start
+
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline and len(miners[1].mempool) < transactions:
+        time.sleep(0.1)
+    time.sleep(minerServer.PEER_SEND_TIMEOUT + 1)
+
+    # The stalled peer is gone from GET_PEER_STATS once disconnected, so read its counters directly
+    peers = wallet.pool.request(wallet.miners[0], {"type": "GET_PEER_STATS"})["peers"] + [stalled.get_stats()]
+    print(f"[BENCH] {transactions} transactions accepted in {ingest:.2f}s ({transactions / ingest:,.0f} tx/s), "
+          f"{len(miners[1].mempool)} relayed to the healthy peer")
+    for stats in peers:
+        print(f"[BENCH] peer {stats['peer']}: sent {stats['sent_bytes']:,} bytes, "
+              f"max queued {stats['max_queued_bytes']:,} bytes, dropped {stats['dropped_messages']} messages, "
+              f"disconnected: {stats['disconnect_reason']}")
+    wallet.close()
+    for miner in miners:
+        miner.stop()
@@ -0,0 +1,75 @@
+import gc
+import hashlib
+import json
+import sys
+import time
+import tracemalloc
+from models.transaction import Transaction
+
+TRANSACTIONS = 1_000_000
+TXID_ROUNDS = 5  # mempool, Merkle tree, chain index and gossip all ask for it
+
+
+class LegacyTransaction:
+    """The previous Transaction: name-mangled fields behind properties, txid rebuilt on every access."""
+
+    def __init__(self, sender, receiver, transaction_fees, amount):
+        self.__sender = sender
+        self.__receiver = receiver
+        self.__transaction_fees = transaction_fees
+        self.__amount = amount
+
+    @property
+    def sender(self):
+        return self.__sender
+
+    @property
+    def receiver(self):
+        return self.__receiver
+
+    @property
+    def transaction_fees(self):
+        return self.__transaction_fees
+
+    @property
+    def amount(self):
+        return self.__amount
+
+    def tx_to_dict(self):
+        return {
+            "sender": self.sender,
+            "receiver": self.receiver,
+            "transaction_fees": self.transaction_fees,
+            "amount": self.amount
+        }
+
+    @property
+    def txid(self):
+        return hashlib.sha256(json.dumps(self.tx_to_dict(), sort_keys=True).encode()).hexdigest()
+
+
+def measure(cls, count, rounds):
+    """Bytes held by count transactions before and after their txids are used, and the time those txids take."""
+    senders = [f"Sender{i}" for i in range(1000)]  # parsed fields are shared strings for repeat senders
+    gc.collect()
+    tracemalloc.start()
+    transactions = [cls(senders[i % 1000], f"Receiver{i}", i % 7, i) for i in range(count)]
+    built = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for tx in transactions:
+            tx.txid
+    elapsed = time.perf_counter() - start
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return built, used, elapsed
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else TRANSACTIONS
+    print(f"[BENCH] {count} transactions, each txid asked for {TXID_ROUNDS} times")
+    for name, cls in (("properties + __dict__", LegacyTransaction), ("__slots__, cached digest", Transaction)):
+        built, used, elapsed = measure(cls, count, TXID_ROUNDS)
+        print(f"[BENCH] {name}: {built / count:.0f} B/tx built, {used / count:.0f} B/tx with txids "
+              f"({used / 2 ** 20:.0f} MiB), txids in {elapsed:.2f}s")
+        gc.collect()
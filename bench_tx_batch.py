@@ -0,0 +1,40 @@
+import sys
+import time
+from models.Miner import Miner
+from models.wallet import Wallet
+
+MINER_IP = "127.0.0.1"
+MINER_PORT = 6103
+TRANSACTIONS = 2000
+
+
+def new_wallet(name):
+    wallet = Wallet(name, 10 ** 9)
+    wallet.miners = [{"ip": MINER_IP, "port": MINER_PORT}]
+    return wallet
+
+
+if __name__ == "__main__":
+    transactions = int(sys.argv[1]) if len(sys.argv) > 1 else TRANSACTIONS
+
+    # Only the network front end is needed; no bootstrap or peers
+    miner = Miner(MINER_IP, MINER_PORT, MINER_IP, 5500)
+    miner.running = True
+    miner.server.start()
+
+    wallet = new_wallet("SingleSender")
+    start = time.perf_counter()
+    single = sum(wallet.send_transaction(f"Receiver{i}", 1) for i in range(transactions))
+    single_rate = transactions / (time.perf_counter() - start)
+    wallet.close()
+
+    wallet = new_wallet("BatchSender")
+    start = time.perf_counter()
+    batched = sum(wallet.send_transactions([(f"Receiver{i}", 1) for i in range(transactions)]))
+    batch_rate = transactions / (time.perf_counter() - start)
+    wallet.close()
+    miner.stop()
+
+    print(f"[BENCH] TRANSACTION one per request: {single}/{transactions} accepted, {single_rate:,.0f} tx/sec")
+    print(f"[BENCH] TRANSACTION_BATCH:           {batched}/{transactions} accepted, {batch_rate:,.0f} tx/sec")
+    print(f"[BENCH] Batched submission is {batch_rate / single_rate:.1f}x faster")
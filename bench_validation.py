@@ -0,0 +1,80 @@
+import contextlib
+import io
+import json
+import sys
+import time
+from models.Miner import Miner
+from models.block import Block
+from models.blockValidator import BlockValidator, validate_body
+from models.transaction import Transaction
+
+MINER_IP = "127.0.0.1"
+PORTS = [6800, 6801, 6802]
+BLOCKS = 200
+TRANS_PER_BLOCK = 1000
+BLOCK_SIZES = [4, 256, 1000]
+
+
+def make_block(previous_hash, size, seed):
+    block = Block([Transaction(f"Sender{i}", f"Receiver{seed}", i, 1 + i % 50) for i in range(size)], previous_hash)
+    with contextlib.redirect_stdout(io.StringIO()):
+        block.mine_block()
+    return block
+
+
+def stage_costs(size, rounds=20):
+    """Per-block time of the body stage inline and through the process pool, and the pool's cost to the caller."""
+    data = json.loads(json.dumps(make_block("0" * 64, size, 0).to_dict()))
+    start = time.perf_counter()
+    for _ in range(rounds):
+        validate_body(data)
+    inline = (time.perf_counter() - start) / rounds
+    validator = BlockValidator()
+    validator.pool_min_tx = 0  # even on a single core
+    validator.validate_bodies([data])  # start the workers
+    start, cpu = time.perf_counter(), time.process_time()
+    validator.validate_bodies([data] * rounds)
+    pooled = (time.perf_counter() - start) / rounds
+    main_cpu = (time.process_time() - cpu) / rounds  # what is left for this process's GIL to do
+    validator.stop()
+    return inline, pooled, main_cpu
+
+
+def sync(origin, port, pool_min_tx):
+    miner = Miner(MINER_IP, port, MINER_IP, 5500)
+    miner.validator.pool_min_tx = pool_min_tx
+    miner.running = True
+    miner.server.start()
+    miner.connect_to_miner(MINER_IP, origin.port)
+    time.sleep(0.2)
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        applied = miner.chain_sync.run()
+        elapsed = time.perf_counter() - start
+    stats = miner.validator.get_stats()
+    miner.stop()
+    return applied, elapsed, stats
+
+
+if __name__ == "__main__":
+    blocks = int(sys.argv[1]) if len(sys.argv) > 1 else BLOCKS
+    print(f"[BENCH] {BlockValidator().workers} validation worker processes")
+    for size in BLOCK_SIZES:
+        inline, pooled, main_cpu = stage_costs(size)
+        print(f"[BENCH] body stage, {size}-tx block: {inline * 1000:.2f} ms inline, "
+              f"{pooled * 1000:.2f} ms per block through the pool ({main_cpu * 1000:.2f} ms of it in the miner process)")
+
+    origin = Miner(MINER_IP, PORTS[0], MINER_IP, 5500)
+    origin.running = True
+    origin.server.start()
+    for height in range(blocks):
+        block = make_block(origin.last_block_hash, TRANS_PER_BLOCK, height)
+        with origin.chain_lock:
+            origin.append_block(block)
+    print(f"[BENCH] syncing {blocks} blocks x {TRANS_PER_BLOCK} transactions")
+    for port, (name, pool_min_tx) in zip(PORTS[1:], [("inline", float("inf")), ("process pool", 256)]):
+        applied, elapsed, stats = sync(origin, port, pool_min_tx)
+        per_stage = ", ".join(f"{stage} {s['ms_per_block']} ms" for stage, s in stats.items())
+        print(f"[BENCH] {name}: {applied} blocks in {elapsed:.2f}s ({applied / elapsed:.0f} blocks/sec); "
+              f"per block: {per_stage}")
+    origin.stop()
@@ -0,0 +1,76 @@
+import random
+import socket
+import sys
+import time
+import models.wallet as wallet_module
+from models.Miner import Miner
+from models.minerSelector import MinerSelector
+from models.wallet import Wallet
+
+MINER_IP = "127.0.0.1"
+HEALTHY_PORTS = [6600, 6601]
+SLOW_PORT = 6602
+HUNG_PORT = 6603
+SLOW_DELAY = 0.05  # seconds the overloaded miner takes per request
+TIMEOUT = 1  # wallet request timeout for this run
+SENDS = 100
+FAILOVER_ATTEMPTS = wallet_module.WALLET_FAILOVER_ATTEMPTS
+
+
+class RandomSelector(MinerSelector):
+    """The old behaviour: a uniformly random miner, no health tracking."""
+
+    def choose(self, miners, exclude=()):
+        candidates = [m for m in miners if m not in exclude]
+        return random.choice(candidates) if candidates else None
+
+
+def slow(handle_request):
+    def handle(request, exclude_socket=None):
+        time.sleep(SLOW_DELAY)  # blocks this miner's event loop, like a miner under load
+        return handle_request(request, exclude_socket)
+    return handle
+
+
+def run(selector, failover_attempts, sends):
+    wallet_module.WALLET_FAILOVER_ATTEMPTS = failover_attempts
+    wallet = Wallet("BenchSender", 10 ** 9, timeout=TIMEOUT)
+    wallet.selector = selector
+    wallet.miners = [{"ip": MINER_IP, "port": port} for port in HEALTHY_PORTS + [SLOW_PORT, HUNG_PORT]]
+    latencies, failures = [], 0
+    for i in range(sends):
+        start = time.perf_counter()
+        if not wallet.send_transaction(f"Receiver{i}", 1):
+            failures += 1
+        latencies.append(time.perf_counter() - start)
+    wallet.close()
+    latencies.sort()
+    return latencies, failures
+
+
+def report(name, latencies, failures):
+    pick = lambda q: latencies[min(int(len(latencies) * q), len(latencies) - 1)] * 1000
+    print(f"[BENCH] {name}: p50 {pick(0.5):.1f} ms, p90 {pick(0.9):.1f} ms, p99 {pick(0.99):.1f} ms, "
+          f"max {latencies[-1] * 1000:.0f} ms, {failures} failed sends")
+
+
+if __name__ == "__main__":
+    sends = int(sys.argv[1]) if len(sys.argv) > 1 else SENDS
+    miners = [Miner(MINER_IP, port, MINER_IP, 5500) for port in HEALTHY_PORTS + [SLOW_PORT]]
+    for miner in miners:
+        miner.running = True
+        miner.server.start()
+    miners[-1].handle_request = slow(miners[-1].handle_request)
+    # Accepts connections (the kernel does) but never answers the handshake
+    hung = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    hung.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    hung.bind((MINER_IP, HUNG_PORT))
+    hung.listen(1000)
+    time.sleep(0.5)
+
+    print(f"[BENCH] 2 healthy miners, 1 taking {SLOW_DELAY * 1000:.0f} ms per request, "
+          f"1 hung; {sends} send_transaction calls, {TIMEOUT}s timeout")
+    report("random choice, no failover", *run(RandomSelector(), 1, sends))
+    report("power of two choices + failover", *run(MinerSelector(), FAILOVER_ATTEMPTS, sends))
+    for miner in miners:
+        miner.stop()
@@ -0,0 +1,41 @@
+import sys
+import time
+from models.Miner import Miner
+from models.wallet import Wallet
+
+MINER_IP = "127.0.0.1"
+MINER_PORT = 6102
+TRANSACTIONS = 500
+
+
+def run(pool_size, transactions):
+    wallet = Wallet("BenchSender", 10 ** 9, pool_size=pool_size)
+    wallet.miners = [{"ip": MINER_IP, "port": MINER_PORT}]
+    latencies = []
+    for i in range(transactions):
+        sent_at = time.perf_counter()
+        wallet.send_transaction(f"BenchReceiver{i}", 1)
+        latencies.append(time.perf_counter() - sent_at)
+    wallet.close()
+    latencies.sort()
+    average = sum(latencies) / len(latencies) * 1000
+    p95 = latencies[int(len(latencies) * 0.95)] * 1000
+    return average, p95, wallet.pool.stats
+
+
+if __name__ == "__main__":
+    transactions = int(sys.argv[1]) if len(sys.argv) > 1 else TRANSACTIONS
+
+    # Only the network front end is needed; no bootstrap or peers
+    miner = Miner(MINER_IP, MINER_PORT, MINER_IP, 5500)
+    miner.running = True
+    miner.server.start()
+
+    results = {}
+    for label, pool_size in (("new connection per request", 0), ("pooled connections", 4)):
+        average, p95, stats = run(pool_size, transactions)
+        results[label] = average
+        print(f"[BENCH] {label:28s}: avg {average:.3f} ms, p95 {p95:.3f} ms per send_transaction "
+              f"({stats['opened']} connections opened)")
+    miner.stop()
+    print(f"[BENCH] Pooled sends are {results['new connection per request'] / results['pooled connections']:.1f}x faster")
@@ -1,33 +1,46 @@
-import json
-import socket
+from utils.framing import FramedSocket
 
 def send_command_to_miner(command_json, miner_ip, miner_port):
     try:
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-            s.connect((miner_ip, miner_port))
-            s.sendall(b"WALLET\n")
-            s.sendall(json.dumps(command_json).encode() + b"\n")
-            data = ""
-            while True:
-                part = s.recv(1024).decode()
-                if not part:
-                    break
-                data += part
-                if "\n" in data:
-                    line, _ = data.split("\n", 1)
-                    return json.loads(line)
+        s = FramedSocket.connect((miner_ip, miner_port), "WALLET")
+        try:
+            s.send(command_json)
+            return s.recv()
+        finally:
+            s.close()
     except Exception as e:
         print(f"Error communicating with miner: {e}")
         return None
 
-def display_blockchain(blocks):
-    if not blocks:
-        print("Blockchain is empty")
-        return
-        
-    print(f"\nBlockchain ({len(blocks)} blocks):")
+def stream_from_miner(command_json, miner_ip, miner_port):
+    """
+    Send a streaming query and yield the header, then one item per message,
+    reading a message at a time so neither side holds the whole result.
+    """
+    try:
+        s = FramedSocket.connect((miner_ip, miner_port), "WALLET")
+        try:
+            s.send(dict(command_json, stream=True))
+            header = s.recv()
+            yield header
+            if header.get("status") != "success":
+                return
+            while True:
+                item = s.recv()
+                if item.get("status") == "end":
+                    return
+                yield item
+        finally:
+            s.close()
+    except Exception as e:
+        print(f"Error communicating with miner: {e}")
+
+def display_blockchain(blocks, start_height=0):
+    print("\nBlockchain:")
     print("-" * 50)
-    for i, block in enumerate(blocks):
+    count = 0
+    for i, block in enumerate(blocks, start=start_height):
+        count += 1
         print(f"Block #{i}:")
         print(f"  Hash: {block['hash'][:16]}...")
         print(f"  Previous Hash: {block['previous_hash'][:16]}...")
@@ -38,16 +51,22 @@ def display_blockchain(blocks):
         for j, tx in enumerate(block['transactions']):
             print(f"    {j+1}. {tx['sender']} -> {tx['receiver']}: {tx['amount']} (Fee: {tx['transaction_fees']})")
         print()
+    if count == 0:
+        print("Blockchain is empty")
+    else:
+        print(f"({count} blocks)")
 
-def display_mempool(mempool):
-    if not mempool:
-        print("Mempool is empty")
-        return
-        
-    print(f"\nMempool ({len(mempool)} transactions):")
+def display_mempool(mempool, size=None):
+    print("\nMempool (highest fee first):")
     print("-" * 30)
+    count = 0
     for i, tx in enumerate(mempool):
+        count += 1
         print(f"{i+1}. {tx['sender']} -> {tx['receiver']}: {tx['amount']} (Fee: {tx['transaction_fees']})")
+    if count == 0:
+        print("Mempool is empty")
+    else:
+        print(f"({count} of {size if size is not None else count} transactions shown)")
     print()
 
 def main():
@@ -87,28 +106,32 @@ def main():
         elif cmd == "2":
             miner_ip = "127.0.0.1"
             miner_port = int(input("Miner port to query blockchain from: "))
+            from_height = int(input("From height (default 0): ") or 0)
 
-            query_command = {"type": "GET_BLOCKCHAIN"}
+            query_command = {"type": "GET_BLOCKCHAIN", "from_height": from_height}
 
-            response = send_command_to_miner(query_command, miner_ip, miner_port)
-            if response and response.get("status") == "success":
-                display_blockchain(response.get("blockchain", []))
-            elif response:
-                print("Error:", response)
+            stream = stream_from_miner(query_command, miner_ip, miner_port)
+            header = next(stream, None)
+            if header and header.get("status") == "success":
+                display_blockchain(stream, start_height=from_height)
+            elif header:
+                print("Error:", header)
             else:
                 print("Failed to communicate with miner")
 
         elif cmd == "3":
             miner_ip = "127.0.0.1"
             miner_port = int(input("Miner port to query mempool from: "))
+            top_n = int(input("Show top N by fee (default 20): ") or 20)
 
-            query_command = {"type": "GET_MEMPOOL"}
+            query_command = {"type": "GET_MEMPOOL", "limit": top_n}
 
-            response = send_command_to_miner(query_command, miner_ip, miner_port)
-            if response and response.get("status") == "success":
-                display_mempool(response.get("mempool", []))
-            elif response:
-                print("Error:", response)
+            stream = stream_from_miner(query_command, miner_ip, miner_port)
+            header = next(stream, None)
+            if header and header.get("status") == "success":
+                display_mempool(stream, size=header.get("size"))
+            elif header:
+                print("Error:", header)
             else:
                 print("Failed to communicate with miner")
 
@@ -14,7 +14,8 @@ def start_bootstrap():
 def start_miners():
     miners = []
     for i, port in enumerate(MINER_PORT, start=1):
-        miner = Miner("127.0.0.1", port, "127.0.0.1", 5500)
+        # Mine partial blocks too, so no transaction waits more than 5s
+        miner = Miner("127.0.0.1", port, "127.0.0.1", 5500, mine_max_wait_ms=5000)
         miner.start()
         miners.append(miner)
         print(f"[NODES] Miner {i} started on port {port}")
@@ -29,16 +30,6 @@ def start_wallets():
         print(f"[NODES] Wallet Client{i} started with balance 100")
     return wallets
 
-def start_mining_loop(miner):
-    def mining_loop():
-        while miner.running:
-            block = miner.produce_block()
-            if block:
-                print(f"[NODES] Miner on port {miner.port} mined a block with hash: {block.hash}")
-            time.sleep(5)  # Reduced sleep time to check more frequently
-
-    threading.Thread(target=mining_loop, daemon=True).start()
-
 def run_nodes():
     bootstrap = start_bootstrap()
     time.sleep(3)
@@ -46,9 +37,6 @@ def run_nodes():
     time.sleep(3)
     wallets = start_wallets()
 
-    for miner in miners:
-        start_mining_loop(miner)
-
     while True:
         time.sleep(1)
 
@@ -1,16 +1,32 @@
+import os
 import socket
 import threading
 import json
 import time
-import heapq
 
 from models.transaction import Transaction
 from models.block import Block
-from utils.constants import TRANS_PER_BLOCK
+from models.blockStore import BlockStore
+from models.blockValidator import BlockValidator, check_transaction
+from models.chainIndex import ChainIndex
+from models.chainSync import ChainSync
+from models.gossip import Gossip
+from models.membership import Membership
+from models.accountState import AccountState
+from models.ledger import Ledger, QUERIES
+from models.mempool import Mempool, ADMITTED, DUPLICATE, REJECTED_LOW_FEE
+from models.miningEngine import MiningEngine
+from models.miningScheduler import MiningScheduler
+from models.minerServer import MinerServer
+from utils.framing import FramedSocket, RawJson
+from utils.constants import (TRANS_PER_BLOCK, MINE_MAX_WAIT_MS, BLOCKSTORE_DIR, QUERY_MAX_BLOCKS, QUERY_MAX_MEMPOOL,
+                             TX_BATCH_MAX, MEMBERSHIP_RETRY, LEDGER_TOP_MAX, WALLET_PROOFS_MAX,
+                             CHAIN_SNAPSHOT_INTERVAL, LEDGER_ENABLED)
 
 
 class Miner:
-    def __init__(self, ip, port, bootstrap_ip, bootstrap_port):
+    def __init__(self, ip, port, bootstrap_ip, bootstrap_port, mine_max_wait_ms=MINE_MAX_WAIT_MS, data_dir=None,
+                 ledger=LEDGER_ENABLED):
         self.ip = ip
         self.port = port
         self.bootstrap_ip = bootstrap_ip
@@ -20,105 +36,253 @@ class Miner:
         self.wallet_connections = []
         self.miner_connections = []
         self.connected_miners = set()  # Track connected miners (ip, port)
+        self.peers_lock = threading.Lock()
 
-        self.mempool = []
-        self.mempool_lock = threading.Lock()
+        self.accounts = AccountState()
+        self.mempool = Mempool(accounts=self.accounts)
+        self.mempool_lock = self.mempool.lock
 
-        self.blockchain = []
+        if data_dir is None and BLOCKSTORE_DIR:
+            data_dir = os.path.join(BLOCKSTORE_DIR, f"miner_{port}")
+        self.blockchain = BlockStore(data_dir)
         self.last_block_hash = "0" * 64
-        self.server_socket = None
+        self.chain_lock = threading.Lock()
+        self.chain_index = ChainIndex()
+        # Optional: the columns grow with the whole transaction history
+        self.ledger = Ledger() if ledger else None
+        self.validator = BlockValidator()
+        self.chain_sync = ChainSync(self)
+        self.gossip = Gossip(self)
+        self.server = MinerServer(self)
+        # Pushed miner joins and leaves replace polling the bootstrap
+        self.membership = Membership((bootstrap_ip, bootstrap_port), "MINER",
+                                     on_change=self.miners_changed, address=(ip, port), load=self.load_report)
+
+        self.mining_engine = MiningEngine()
+        self.mining_cancel = threading.Event()
+        self.mining_parent = None  # previous_hash of the block being mined
+        self.scheduler = MiningScheduler(self, mine_max_wait_ms)
+        self.snapshot_height = 0  # chain height of the last saved snapshot
+        self.snapshot_thread = None
+        self.restore_chain()
+
+    def restore_chain(self):
+        """
+        Rebuild the in-memory indexes from a reopened block store: load its
+        snapshot and replay only the blocks appended after it.
+        """
+        if not len(self.blockchain):
+            return
+        start = 0
+        try:
+            snapshot = self.blockchain.load_snapshot()
+        except Exception as e:  # a damaged snapshot only costs a full replay
+            print(f"[MINER ERROR] Ignoring unreadable chain snapshot: {e}")
+            snapshot = None
+        if snapshot is not None and (self.ledger is None or snapshot[1]["ledger"] is not None):
+            start, state = snapshot
+            self.chain_index.restore(state["chain_index"])
+            self.accounts.restore(state["accounts"])
+            if self.ledger is not None:
+                self.ledger.restore(state["ledger"])
+        for height in range(start, len(self.blockchain)):  # one block deserialized at a time
+            self.index_block(self.blockchain.read(height, keep=False))
+        self.last_block_hash = self.chain_index.hash_at(len(self.chain_index) - 1)
+        self.snapshot_height = start
+        print(f"[MINER {self.port}] Restored {len(self.blockchain)} blocks ({len(self.blockchain) - start} replayed), "
+              f"tip {self.last_block_hash[:16]}...")
+
+    def snapshot_state(self):
+        """The indexes as of the tip, for the block store's snapshot; callers hold chain_lock."""
+        return {"chain_index": self.chain_index.snapshot(), "accounts": self.accounts.snapshot(),
+                "ledger": self.ledger.snapshot() if self.ledger is not None else None}
+
+    def save_snapshot(self, background=True):
+        """Snapshot the indexes next to a persistent block store; callers hold chain_lock."""
+        if self.blockchain.data_dir is None or self.snapshot_height == len(self.blockchain):
+            return
+        height, state = len(self.blockchain), self.snapshot_state()
+        self.snapshot_height = height
+        if not background:
+            self.blockchain.save_snapshot(height, state)
+            return
+
+        def save():
+            try:
+                self.blockchain.save_snapshot(height, state)
+            except (OSError, ValueError) as e:
+                print(f"[MINER ERROR] Could not save chain snapshot: {e}")
+        self.snapshot_thread = threading.Thread(target=save, daemon=True)
+        self.snapshot_thread.start()
 
     def start(self):
         self.running = True
-        self.register_to_bootstrap()
-        threading.Thread(target=self.run_server, daemon=True).start()
+        miners_list = self.register_to_bootstrap()
+        self.server.start()
+        self.gossip.start()
+        self.membership.start()
+        threading.Thread(target=self.join_network, args=(miners_list,), daemon=True).start()
         threading.Thread(target=self.maintain_miner_connections, daemon=True).start()
-        threading.Thread(target=self.auto_mine, daemon=True).start()
 
-    def auto_mine(self):
-        """Continuously attempt to mine blocks"""
-        while self.running:
-            time.sleep(5)  # Check every 5 seconds
-            with self.mempool_lock:
-                if len(self.mempool) >= TRANS_PER_BLOCK:
-                    threading.Thread(target=self.produce_block, daemon=True).start()
-      
+    def join_network(self, miners_list):
+        """Connect to peers and catch up with their chain before mining."""
+        try:
+            self.connect_to_peers(miners_list)
+            self.chain_sync.run()
+        finally:
+            self.scheduler.start()
+
+    def sync_chain(self):
+        """Catch up in the background, e.g. after a block with an unknown parent."""
+        threading.Thread(target=self.chain_sync.run, daemon=True).start()
 
     def connect_to_peers(self, miners_list):
         for m in miners_list:
-            peer = (m['ip'], m['port'])
-            if peer == (self.ip, self.port) or peer in self.connected_miners:
-                continue  # skip self or already connected
-            try:
-                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                sock.connect(peer)
-                sock.sendall("MINER\n".encode())
-                self.miner_connections.append(sock)
-                self.connected_miners.add(peer)
-                threading.Thread(target=self.handle_miner, args=(sock,), daemon=True).start()
-                print(f"[MINER {self.port}] Connected to miner {peer[1]}")
-            except Exception as e:
-                print(f"[MINER {self.port}] Failed to connect to {peer[1]}: {e}")
-
-    def run_server(self):
-        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.server_socket.bind((self.ip, self.port))
-        self.server_socket.listen(5)
-        print(f"[MINER {self.port}] Listening on {self.ip}:{self.port}")
-
-        while self.running:
-            try:
-                client_socket, addr = self.server_socket.accept()
-                threading.Thread(target=self.handle_client, args=(client_socket, addr), daemon=True).start()
-            except Exception as e:
-                print(f"[MINER ERROR] run_server: {e}")
-
-    def handle_client(self, client_socket, addr):
+            if (m['ip'], m['port']) != (self.ip, self.port):
+                self.connect_to_miner(m['ip'], m['port'])
+
+    def handle_request(self, request, exclude_socket=None):
+        """Answer one wallet/client request; returns a response dict or a stream of messages."""
+        req_type = request.get("type")
+        if req_type == "TRANSACTION":
+            status = self.add_transaction_to_mempool(request, source=exclude_socket)
+            return self.transaction_response(status)
+        elif req_type == "TRANSACTION_BATCH":
+            transactions = request.get("transactions")
+            if not isinstance(transactions, list) or len(transactions) > TX_BATCH_MAX:
+                return {"status": "error", "message": f"transactions must be a list of at most {TX_BATCH_MAX}"}
+            statuses = self.add_transactions_to_mempool(transactions, source=exclude_socket)
+            min_fee = self.mempool.min_fee() if REJECTED_LOW_FEE in statuses else None
+            return {
+                "status": "batch_received",
+                "results": [self.transaction_response(status, min_fee) for status in statuses]
+            }
+        elif req_type == "GET_BALANCE":
+            balance = self.calculate_balance(request.get("wallet"))
+            return {"status": "success", "balance": balance}
+        elif req_type == "GET_BLOCKCHAIN":
+            return self.query_blockchain(request)
+        elif req_type == "GET_MEMPOOL":
+            return self.query_mempool(request)
+        elif req_type == "GET_BLOCK":
+            block = self.get_block(request.get("hash"), request.get("height"))
+            if block is None:
+                return {"status": "error", "message": "Block not found"}
+            return {"status": "success", "block": block.to_dict(), "height": self.chain_index.height_of(block.hash)}
+        elif req_type == "GET_TRANSACTION":
+            found = self.find_transaction(request.get("txid"))
+            if found is None:
+                return {"status": "error", "message": "Transaction not found"}
+            block, position = found
+            return {
+                "status": "success",
+                "transaction": block.transactions[position].tx_to_dict(),
+                "block_hash": block.hash,
+                "height": self.chain_index.height_of(block.hash),
+                "position": position
+            }
+        elif req_type == "GET_TX_PROOF":
+            return self.transaction_proof(request.get("txid"))
+        elif req_type == "GET_WALLET_PROOFS":
+            return self.wallet_proofs(request)
+        elif req_type == "GET_HEADERS":
+            return self.chain_sync.serve_headers(request)
+        elif req_type == "LEDGER_QUERY":
+            return self.query_ledger(request)
+        elif req_type == "CHECK_ACCOUNT_STATE":
+            mismatches = self.check_account_state()
+            return {"status": "success", "consistent": not mismatches, "mismatches": mismatches}
+        elif req_type == "GET_MEMPOOL_STATS":
+            return {"status": "success", "stats": self.mempool.get_stats()}
+        elif req_type == "GET_GOSSIP_STATS":
+            return {"status": "success", "stats": self.gossip.get_stats()}
+        elif req_type == "GET_VALIDATION_STATS":
+            return {"status": "success", "stats": self.validator.get_stats()}
+        elif req_type == "GET_PEER_STATS":
+            return {"status": "success", "peers": self.server.peer_stats()}
+        return {"status": "error", "message": "Unknown request type"}
+
+    def query_blockchain(self, request):
+        """
+        Blocks from from_height on. Paged by default (at most QUERY_MAX_BLOCKS);
+        with "stream" the whole range is sent one block per message.
+        """
+        tip = len(self.blockchain)
         try:
-            buffer = ""
-            while self.running:
-                data = client_socket.recv(4096)
-                if not data:
-                    break
-                buffer += data.decode()
-                while "\n" in buffer:
-                    line, buffer = buffer.split("\n", 1)
-                    line = line.strip()
-                    if not line:
-                        continue
-                    try:
-                        request = json.loads(line)
-                    except json.JSONDecodeError:
-                        continue
-                    if request.get("type") == "TRANSACTION":
-                        self.add_transaction_to_mempool(line)
-                        self.broadcast_transaction(line)
-                        response = {"status": "transaction_received"}
-                    elif request.get("type") == "GET_BALANCE":
-                        balance = self.calculate_balance(request.get("wallet"))
-                        response = {"status": "success", "balance": balance}
-                    else:
-                        response = {"status": "error", "message": "Unknown request type"}
-                    client_socket.sendall((json.dumps(response) + "\n").encode())
-        except Exception as e:
-            print(f"[MINER ERROR] handle_client: {e}")
-        finally:
-            client_socket.close()
+            start = max(0, int(request.get("from_height", 0)))
+            limit = int(request.get("limit", tip if request.get("stream") else QUERY_MAX_BLOCKS))
+        except (TypeError, ValueError, OverflowError) as e:
+            return {"status": "error", "message": str(e)}
+        if request.get("stream"):
+            end = min(tip, start + limit)
+            header = {"status": "success", "stream": True, "from_height": start, "count": max(0, end - start)}
+            blocks = (RawJson(self.blockchain.raw(h)) for h in range(start, end))
+            return self.stream_messages(header, blocks, {"status": "end", "next_height": max(start, end)})
+        end = min(tip, start + min(limit, QUERY_MAX_BLOCKS))
+        return {
+            "status": "success",
+            "blockchain": [json.loads(self.blockchain.raw(h)) for h in range(start, end)],
+            "from_height": start,
+            "next_height": max(start, end),
+            "tip_height": tip - 1
+        }
+
+    def query_mempool(self, request):
+        """Top pending transactions by fee, paged or streamed one per message."""
+        size = len(self.mempool)
+        try:
+            limit = max(0, int(request.get("limit", size if request.get("stream") else QUERY_MAX_MEMPOOL)))
+        except (TypeError, ValueError, OverflowError) as e:
+            return {"status": "error", "message": str(e)}
+        if request.get("stream"):
+            transactions = self.mempool.top(limit)
+            header = {"status": "success", "stream": True, "count": len(transactions), "size": size}
+            items = (tx.tx_to_dict() for tx in transactions)
+            return self.stream_messages(header, items, {"status": "end"})
+        limit = min(limit, QUERY_MAX_MEMPOOL)
+        return {"status": "success", "mempool": [tx.tx_to_dict() for tx in self.mempool.top(limit)], "size": size}
+
+    def query_ledger(self, request):
+        """
+        Bulk reporting over confirmed blocks: balances of every wallet, top
+        senders, per-block fee totals and volume for a height range.
+        """
+        if self.ledger is None:
+            return {"status": "error", "message": "Ledger is disabled on this miner (LEDGER_ENABLED)"}
+        try:
+            to_height = request.get("to_height")
+            limit = int(request.get("limit", 10))
+            if limit < 0:
+                return {"status": "error", "message": "limit must not be negative"}
+            first, last, results = self.ledger.query(
+                request.get("queries", QUERIES),
+                int(request.get("from_height", 0)),
+                None if to_height is None else int(to_height),
+                min(limit, LEDGER_TOP_MAX)
+            )
+        except (TypeError, ValueError, OverflowError) as e:
+            return {"status": "error", "message": str(e)}
+        return {"status": "success", "from_height": first, "to_height": last,
+                "backend": self.ledger.backend, "results": results}
+
+    @staticmethod
+    def stream_messages(header, items, trailer):
+        yield header
+        yield from items
+        yield trailer
 
     def register_to_bootstrap(self):
         try:
-            s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            s.connect((self.bootstrap_ip, self.bootstrap_port))
+            s = FramedSocket.connect((self.bootstrap_ip, self.bootstrap_port), "MINER", timeout=5)
 
-            msg = json.dumps({
+            s.send({
                 "type": "REGISTER_MINER",
                 "id": f"{self.ip}:{self.port}",
                 "ip": self.ip,
                 "port": self.port
-            }) + "\n"
-            s.send(msg.encode())
+            })
 
-            response = json.loads(s.recv(4096).decode())
+            response = s.recv()
             print(f"[MINER {self.port}] Registered with bootstrap: {response}")
 
             # Get list of all miners
@@ -127,204 +291,332 @@ class Miner:
             print(f"[MINER {self.port}] Peers received: {self.peers}")
 
             s.close()
-
-            # Connect to peers
-            threading.Thread(target=self.connect_to_peers, args=(miners_list,), daemon=True).start()
+            return miners_list
 
         except Exception as e:
             print(f"[MINER {self.port}] Error registering with bootstrap: {e}")
+            return []
 
     def maintain_miner_connections(self):
-        time.sleep(3)  # allow miners to register
-
+        """Retry miners we know of but are not connected to; membership itself is pushed."""
         while self.running:
+            time.sleep(MEMBERSHIP_RETRY)
             try:
-                miners_list = self.get_miners_from_bootstrap()
-                for miner_info in miners_list:
+                for miner_info in self.membership.list():
                     ip, port = miner_info["ip"], miner_info["port"]
-                    if (ip, port) == (self.ip, self.port):
-                        continue
-                    if (ip, port) not in self.connected_miners:
+                    if (ip, port) != (self.ip, self.port) and (ip, port) not in self.connected_miners:
                         self.connect_to_miner(ip, port)
-                time.sleep(5)
             except Exception as e:
                 print(f"[MINER ERROR] maintain_miner_connections: {e}")
-                time.sleep(5)
+
+    def load_report(self):
+        """What the bootstrap hands out with this miner in GET_MINERS."""
+        return {"mempool": len(self.mempool), "peers": len(self.miner_connections), "height": len(self.blockchain)}
+
+    def miners_changed(self, joined, left):
+        for miner_info in joined:
+            ip, port = miner_info["ip"], miner_info["port"]
+            if (ip, port) != (self.ip, self.port):
+                self.connect_to_miner(ip, port)
 
     def connect_to_miner(self, ip, port):
         peer = (ip, port)
-        if peer in self.connected_miners:
-            return
-        try:
-            s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            s.connect(peer)
-            s.sendall("MINER\n".encode())
-            self.miner_connections.append(s)
+        with self.peers_lock:
+            # Claimed before dialing: join_network and membership pushes may race for a peer
+            if peer in self.connected_miners:
+                return
             self.connected_miners.add(peer)
-            threading.Thread(target=self.handle_miner, args=(s,), daemon=True).start()
+        try:
+            conn = self.server.connect_peer(ip, port)
+            self.miner_connections.append(conn)
             print(f"[MINER {self.port}] Connected to miner {ip}:{port}")
         except Exception as e:
+            self.connected_miners.discard(peer)
             print(f"[MINER ERROR] Failed to connect to miner {ip}:{port}: {e}")
 
-    def get_miners_from_bootstrap(self):
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
-            sock.connect((self.bootstrap_ip, self.bootstrap_port))
-            sock.sendall(json.dumps({"type": "GET_MINERS"}).encode())
-            data = sock.recv(4096)
-        return json.loads(data.decode())
-
-    def handle_wallet(self, wallet_socket):
-        buffer = ""
+    def handle_miner_message(self, miner_socket, parsed):
+        if self.chain_sync.handle_message(miner_socket, parsed) or self.gossip.handle_message(miner_socket, parsed):
+            return
+        if all(k in parsed for k in ["hash", "previous_hash", "transactions", "nonce"]):
+            self.add_block_to_chain(parsed, source=miner_socket)
+        elif parsed.get("type") == "TRANSACTION_BATCH":
+            self.add_transactions_to_mempool(parsed.get("transactions") or [], source=miner_socket)
+        else:
+            self.add_transaction_to_mempool(parsed, source=miner_socket)
+
+    def peer_disconnected(self, conn, outbound):
+        if conn in self.miner_connections:
+            self.miner_connections.remove(conn)
+        if outbound:
+            self.connected_miners.discard(conn.getpeername())  # let maintenance reconnect
+        self.gossip.forget_peer(conn)
+        print(f"[MINER {self.port}] Miner disconnected")
+
+    def add_transaction_to_mempool(self, tx_dict, source=None):
+        """Returns the Mempool admission status, or None for a malformed transaction."""
+        return self.add_transactions_to_mempool([tx_dict], source)[0]
+
+    def add_transactions_to_mempool(self, tx_dicts, source=None):
+        """
+        Admit transactions with one mempool lock acquisition and announce the
+        new ones to every peer but source; returns a status per transaction.
+        """
+        statuses = [None] * len(tx_dicts)
+        candidates, positions = [], []
+        for i, tx_dict in enumerate(tx_dicts):
+            tx = self.parse_transaction(tx_dict)
+            if tx is None:
+                continue
+            txid = tx.txid
+            if self.chain_index.has_transaction(txid):
+                statuses[i] = DUPLICATE  # already confirmed, e.g. a late relay
+                continue
+            candidates.append((tx, txid))
+            positions.append(i)
+        admitted = []
+        for i, (tx, txid), status in zip(positions, candidates, self.mempool.add_many(candidates)):
+            statuses[i] = status
+            if status == ADMITTED:
+                admitted.append(txid)
+        self.gossip.received(txid for _, txid in candidates)
+        if admitted:
+            self.gossip.announce_transactions(admitted, source)
+            self.scheduler.notify_transaction()
+        return statuses
+
+    @staticmethod
+    def parse_transaction(tx_dict):
         try:
-            while self.running:
-                data = wallet_socket.recv(4096).decode()
-                if not data:
-                    break
-                buffer += data
-                while "\n" in buffer:
-                    line, buffer = buffer.split("\n", 1)
-                    if not line.strip():
-                        continue
-                    request = json.loads(line)
-                    response = {"status": "error", "message": "Unknown command"}
-
-                    if request.get("type") == "TRANSACTION":
-                        self.add_transaction_to_mempool(line)
-                        self.broadcast_transaction(line, exclude_socket=wallet_socket)
-                        response = {"status": "transaction_received"}
-                    elif request.get("type") == "GET_BALANCE":
-                        balance = self.calculate_balance(request.get("wallet"))
-                        response = {"status": "success", "balance": balance}
-                    wallet_socket.sendall((json.dumps(response) + "\n").encode())
-
-        except Exception as e:
-            print(f"[MINER ERROR] handle_wallet: {e}")
-        finally:
-            wallet_socket.close()
+            tx = Transaction(tx_dict['sender'], tx_dict['receiver'], tx_dict.get('fee', 0), tx_dict['amount'],
+                             tx_dict.get('nonce'))
+        except (KeyError, TypeError, AttributeError):
+            return None
+        # Blocks with such a transaction are rejected by peers, so it is not admitted either
+        return tx if check_transaction(tx) is None else None
+
+    def transaction_response(self, status, min_fee=None):
+        if status == REJECTED_LOW_FEE:
+            return {
+                "status": "rejected",
+                "reason": status,
+                "message": f"Mempool full, fee must exceed {min_fee if min_fee is not None else self.mempool.min_fee()}"
+            }
+        if status is None:
+            return {"status": "error", "message": "Malformed transaction"}
+        if status == DUPLICATE:
+            # Only the same payment (same nonce) again, e.g. resent after a timeout: its sender counts it once
+            return {"status": "duplicate", "message": "Transaction already pending or confirmed"}
+        return {"status": "transaction_received"}
 
-    def handle_miner(self, miner_socket):
-        miner_socket.settimeout(None)
-        buffer = ""
+    def produce_block(self):
+        # The index already holds every block up to parent; if the tip moves on, the block is dropped below
+        parent = self.last_block_hash
+        selected_tx = self.mempool.pop_best(TRANS_PER_BLOCK)
+        # A relayed copy can slip into the mempool just as a peer's block confirms it: never include it twice
+        confirmed = [tx for tx in selected_tx if self.chain_index.has_transaction(tx.txid)]
+        if confirmed:
+            self.mempool.confirm(confirmed)
+            selected_tx = [tx for tx in selected_tx if not self.chain_index.has_transaction(tx.txid)]
+        if not selected_tx:
+            print(f"[MINER {self.port}] Not enough transactions to mine a block")
+            return None
+
+        appended = False
         try:
-            while self.running:
-                data = miner_socket.recv(4096)
-                if not data:
-                    break
-                buffer += data.decode()
-                while "\n" in buffer:
-                    message, buffer = buffer.split("\n", 1)
-                    message = message.strip()
-                    if not message:
-                        continue
-                    try:
-                        parsed = json.loads(message)
-                        if all(k in parsed for k in ["hash", "previous_hash", "transactions", "nonce"]):
-                            self.add_block_to_chain(parsed)
-                        else:
-                            self.add_transaction_to_mempool(message)
-                            self.broadcast_transaction(message, exclude_socket=miner_socket)
-                    except json.JSONDecodeError:
-                        self.add_transaction_to_mempool(message)
-                        self.broadcast_transaction(message, exclude_socket=miner_socket)
-        except Exception as e:
-            print(f"[MINER ERROR] handle_miner: {e}")
+            new_block = Block(selected_tx, parent)
+            print(f"[MINER {self.port}] Mining block...")
+            self.mining_parent = parent
+            self.mining_cancel.clear()
+            mined = self.mining_engine.mine(new_block, self.mining_cancel)
+            self.mining_parent = None
+
+            with self.chain_lock:
+                if mined and self.last_block_hash == parent:
+                    self.append_block(new_block)
+                    appended = True
         finally:
-            miner_socket.close()
-            if miner_socket in self.miner_connections:
-                self.miner_connections.remove(miner_socket)
-            print(f"[MINER {self.port}] Miner disconnected")
+            self.mining_parent = None
+            if not appended:
+                # Back to the pool even if mining failed, or they would stay in flight forever
+                self.mempool.release(selected_tx)
+        if not appended:
+            print(f"[MINER {self.port}] Mining cancelled, parent {parent[:16]}... is no longer the tip")
+            self.scheduler.notify_transaction()
+            return None
+
+        self.mempool.confirm(selected_tx)
+        self.gossip.announce_block(new_block)
+        print(f"[MINER {self.port}] Produced new block with {len(selected_tx)} transactions, hash: {new_block.hash}")
+        return new_block
 
-    def add_transaction_to_mempool(self, transaction_json):
+    def add_block_to_chain(self, block_data, source=None):
         try:
-            tx_dict = json.loads(transaction_json)
-            if "sender" not in tx_dict or "receiver" not in tx_dict:
+            self.gossip.received([block_data["hash"]])
+            if self.chain_index.has_block(block_data["hash"]):
                 return
-            tx = Transaction(tx_dict['sender'], tx_dict['receiver'], tx_dict.get('fee', 0), tx_dict['amount'])
-            with self.mempool_lock:
-                if any(t.sender == tx.sender and t.receiver == tx.receiver and t.amount == tx.amount
-                       for t in self.mempool):
-                    return
-                self.mempool.append(tx)
-                heapq.heapify(self.mempool)
+            # Header checks inline; the body is checked in the validator's pool if it is large
+            reason = self.validator.check_header(block_data)
+            if reason:
+                print(f"[MINER {self.port}] Block rejected: {reason}")
+                return
+            self.validator.submit(block_data, lambda block, reason: self.block_validated(block, reason, source))
         except Exception as e:
-            print(f"[MINER ERROR] add_transaction_to_mempool: {e}")
-
-    def broadcast_transaction(self, transaction_json, exclude_socket=None):
-        for conn in self.miner_connections.copy():
-            if conn != exclude_socket:
-                try:
-                    conn.sendall((transaction_json + "\n").encode())
-                except:
-                    self.miner_connections.remove(conn)
+            print(f"[MINER ERROR] add_block_to_chain: {e}")
 
-    def produce_block(self):
-        with self.mempool_lock:
-            if len(self.mempool) < 1:
-                print(f"[MINER {self.port}] Not enough transactions to mine a block")
-                return None
-            selected_tx = [heapq.heappop(self.mempool) for _ in range(min(TRANS_PER_BLOCK, len(self.mempool)))]
-        
-        new_block = Block(selected_tx, self.last_block_hash)
-        print(f"[MINER {self.port}] Mining block...")
-        new_block.mine_block()  # <-- ADD THIS LINE
-        
-        self.blockchain.append(new_block)
-        self.last_block_hash = new_block.hash
-        self.broadcast_block(new_block)
-        print(f"[MINER {self.port}] Produced new block with {len(selected_tx)} transactions, hash: {new_block.hash}")
-        return new_block
+    def block_validated(self, block, reason, source):
+        if reason:
+            print(f"[MINER {self.port}] Block rejected: {reason}")
+            return
+        self.add_block(block, source, validated=True)
 
-    def add_block_to_chain(self, block_data):
+    def add_block(self, block, source=None, validated=False):
+        """Take a block from a peer: extend the chain and relay it, or sync if its parent is unknown."""
         try:
-            if any(b.hash == block_data["hash"] for b in self.blockchain):
+            if not validated:
+                reason = self.validator.check_header(block.header()) or self.validator.check_body(block)
+                if reason:
+                    print(f"[MINER {self.port}] Block rejected: {reason}")
+                    return
+            if self.accept_block(block):
+                self.gossip.announce_block(block, source)
                 return
-            transactions = [Transaction.from_dict(tx) for tx in block_data["transactions"]]
-            block = Block(transactions, block_data["previous_hash"])
-            block.timestamp = block_data["timestamp"]
-            block.nonce = block_data["nonce"]
-            block.merkle_root = block_data["merkle_root"]
-            block.hash = block_data["hash"]
-            if block.previous_hash != self.last_block_hash and self.blockchain:
+            if not self.chain_index.has_block(block.previous_hash):
+                # We are missing its ancestors: fetch them instead of dropping behind
+                print(f"[MINER {self.port}] Block has unknown parent, syncing chain")
+                self.sync_chain()
+            elif block.previous_hash != self.last_block_hash:
                 print(f"[MINER {self.port}] Block rejected due to invalid previous hash")
-                return
-            self.blockchain.append(block)
-            self.last_block_hash = block.hash
         except Exception as e:
-            print(f"[MINER ERROR] add_block_to_chain: {e}")
-
-    def broadcast_block(self, block):
-        block_str = json.dumps(block.to_dict()) + "\n"
-        for conn in self.miner_connections.copy():
-            try:
-                conn.sendall(block_str.encode())
-            except:
-                self.miner_connections.remove(conn)
+            print(f"[MINER ERROR] add_block: {e}")
+
+    def accept_block(self, block):
+        """Apply stage: append a validated block that extends our tip; returns False otherwise."""
+        started = time.perf_counter()
+        with self.chain_lock:
+            if self.chain_index.has_block(block.hash) or block.previous_hash != self.last_block_hash:
+                return False
+            if any(self.chain_index.has_transaction(txid) for txid in block.txids):
+                print(f"[MINER {self.port}] Block rejected: a transaction is already on chain")
+                self.validator.record("apply", started, rejected=1)
+                return False
+            self.append_block(block)
+
+        self.mempool.confirm(block.transactions)
+        # A peer beat us to this parent: the scheduler restarts on the new tip
+        self.scheduler.notify_block()
+        self.validator.record("apply", started)
+        return True
+
+    def append_block(self, block):
+        """Extend the chain, its indexes and the confirmed balances; callers hold chain_lock."""
+        # What can fail on a bad block runs before the store is touched, so a block goes into all state or none
+        deltas = self.accounts.block_deltas(block.transactions)
+        rows = self.ledger.block_rows_for(block.transactions) if self.ledger is not None else None
+        self.blockchain.append(block)
+        self.index_block(block, rows, deltas)
+        self.last_block_hash = block.hash
+        if len(self.blockchain) - self.snapshot_height >= CHAIN_SNAPSHOT_INTERVAL:
+            self.save_snapshot()
+
+    def index_block(self, block, ledger_rows=None, deltas=None):
+        """Add a stored block to the chain index, the ledger and the confirmed balances."""
+        height = self.chain_index.add(block)
+        if self.ledger is not None:
+            if ledger_rows is None:
+                ledger_rows = self.ledger.block_rows_for(block.transactions)
+            self.ledger.append_rows(height, ledger_rows)
+        if deltas is None:
+            deltas = self.accounts.block_deltas(block.transactions)
+        self.accounts.apply_deltas(deltas)
+
+    def get_block(self, block_hash=None, height=None):
+        if block_hash is not None:
+            height = self.chain_index.height_of(block_hash)
+        if height is None or not 0 <= height < len(self.blockchain):
+            return None
+        return self.blockchain[height]
+
+    def find_transaction(self, txid):
+        """Returns (block, position) for a confirmed transaction, or None."""
+        location = self.chain_index.locate_transaction(txid)
+        if location is None:
+            return None
+        height, position = location
+        return self.blockchain[height], position
+
+    def transaction_proof(self, txid):
+        """Merkle inclusion proof of a confirmed transaction, checkable against the block header alone."""
+        found = self.find_transaction(txid)
+        if found is None:
+            return {"status": "error", "message": "Transaction not found"}
+        block, position = found
+        return {
+            "status": "success",
+            "txid": txid,
+            "height": self.chain_index.height_of(block.hash),
+            "position": position,
+            "proof": block.merkle_proof(position),
+            "header": block.header()
+        }
+
+    def wallet_proofs(self, request):
+        """
+        A wallet's confirmed transactions from from_height on, each with its
+        Merkle proof, for light wallets that only keep headers. Replies hold
+        whole blocks' worth of transactions, at least WALLET_PROOFS_MAX unless
+        the history ends; next_height is where to continue. Without the
+        ledger's per-wallet index the blocks are scanned, QUERY_MAX_BLOCKS
+        per reply.
+        """
+        try:
+            start = max(0, int(request.get("from_height", 0)))
+        except (TypeError, ValueError):
+            return {"status": "error", "message": "from_height must be an integer"}
+        wallet = request.get("wallet")
+        tip = len(self.blockchain)
+        if self.ledger is not None:
+            end, locations = tip, self.ledger.wallet_locations(wallet, start)
+        else:
+            end = min(tip, start + QUERY_MAX_BLOCKS)
+            locations = ((height, position) for height in range(start, end)
+                         for position, tx in enumerate(self.blockchain[height].transactions)
+                         if wallet in (tx.sender, tx.receiver))
+        transactions, next_height = [], end
+        for height, position in locations:
+            if height >= end:
+                break  # appended after tip was read, or past the blocks scanned for this reply
+            if len(transactions) >= WALLET_PROOFS_MAX and height != transactions[-1]["height"]:
+                next_height = height
+                break
+            block = self.blockchain[height]
+            transactions.append({
+                "transaction": block.transactions[position].tx_to_dict(),
+                "height": height,
+                "position": position,
+                "proof": block.merkle_proof(position)
+            })
+        return {"status": "success", "from_height": start, "next_height": max(start, next_height),
+                "tip_height": tip - 1, "transactions": transactions}
 
     def calculate_balance(self, wallet_name):
-        balance = 0
-        for block in self.blockchain:
-            for tx in block.transactions:
-                if tx.sender == wallet_name:
-                    balance -= tx.amount
-                if tx.receiver == wallet_name:
-                    balance += tx.amount
-        with self.mempool_lock:
-            for tx in self.mempool:
-                if tx.sender == wallet_name:
-                    balance -= tx.amount
-                if tx.receiver == wallet_name:
-                    balance += tx.amount
-        return balance
+        return self.accounts.balance(wallet_name)
+
+    def check_account_state(self):
+        """Compare the incremental balances against a full chain + mempool rescan."""
+        mismatches = self.accounts.check(self.blockchain, self.mempool.all_transactions())
+        for wallet, (indexed, rescanned) in mismatches.items():
+            print(f"[MINER {self.port}] Account state mismatch for {wallet}: index {indexed}, rescan {rescanned}")
+        return mismatches
 
     def stop(self):
         self.running = False
-        if self.server_socket:
-            try:
-                self.server_socket.shutdown(socket.SHUT_RDWR)
-            except:
-                pass
-            self.server_socket.close()
-        
+        self.scheduler.stop()
+        self.gossip.stop()
+        self.membership.stop()
+        self.mining_cancel.set()
+        self.mining_engine.stop()
+        self.validator.stop()
+
         for sock in self.wallet_connections + self.miner_connections:
             try:
                 sock.shutdown(socket.SHUT_RDWR)
@@ -334,4 +626,13 @@ class Miner:
                 sock.close()
             except:
                 pass
-        
+        self.server.stop()
+
+        with self.chain_lock:
+            if self.snapshot_thread is not None:
+                self.snapshot_thread.join()
+            try:
+                self.save_snapshot(background=False)
+            except (OSError, ValueError) as e:
+                print(f"[MINER ERROR] Could not save chain snapshot: {e}")
+            self.blockchain.close()
@@ -0,0 +1,90 @@
+import threading
+
+
+class AccountState:
+    """
+    Per-wallet balances, updated incrementally instead of rescanning the chain.
+
+    confirmed holds the net amount each wallet has received on chain; pending
+    holds the net amount of its transactions still in the mempool (including
+    those being mined), together with how many there are so the entry can be
+    dropped exactly when the last one leaves.
+    """
+
+    def __init__(self):
+        self.confirmed = {}  # wallet -> balance from blocks on chain
+        self.pending = {}    # wallet -> [delta, pending transaction count]
+        self.lock = threading.Lock()
+
+    def apply_block(self, transactions):
+        self.apply_deltas(self.block_deltas(transactions))
+
+    @staticmethod
+    def block_deltas(transactions):
+        """Net change per wallet for a block, computed apart so a bad amount fails before anything is applied."""
+        deltas = {}
+        for tx in transactions:
+            deltas[tx.sender] = deltas.get(tx.sender, 0) - tx.amount
+            deltas[tx.receiver] = deltas.get(tx.receiver, 0) + tx.amount
+        return deltas
+
+    def apply_deltas(self, deltas):
+        with self.lock:
+            for wallet, delta in deltas.items():
+                self.confirmed[wallet] = self.confirmed.get(wallet, 0) + delta
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.confirmed)
+
+    def restore(self, confirmed):
+        with self.lock:
+            self.confirmed = confirmed
+
+    def add_pending(self, tx):
+        with self.lock:
+            for wallet, delta in ((tx.sender, -tx.amount), (tx.receiver, tx.amount)):
+                entry = self.pending.setdefault(wallet, [0, 0])
+                entry[0] += delta
+                entry[1] += 1
+
+    def remove_pending(self, tx):
+        with self.lock:
+            for wallet, delta in ((tx.sender, -tx.amount), (tx.receiver, tx.amount)):
+                entry = self.pending.get(wallet)
+                if entry is None:
+                    continue
+                entry[0] -= delta
+                entry[1] -= 1
+                if entry[1] <= 0:
+                    del self.pending[wallet]
+
+    def balance(self, wallet):
+        entry = self.pending.get(wallet)
+        return self.confirmed.get(wallet, 0) + (entry[0] if entry else 0)
+
+    @staticmethod
+    def rescan(blocks, pending_transactions):
+        """Recompute every wallet's balance from scratch (the slow reference path)."""
+        balances = {}
+        for block in blocks:
+            for tx in block.transactions:
+                balances[tx.sender] = balances.get(tx.sender, 0) - tx.amount
+                balances[tx.receiver] = balances.get(tx.receiver, 0) + tx.amount
+        for tx in pending_transactions:
+            balances[tx.sender] = balances.get(tx.sender, 0) - tx.amount
+            balances[tx.receiver] = balances.get(tx.receiver, 0) + tx.amount
+        return balances
+
+    def check(self, blocks, pending_transactions, tolerance=1e-9):
+        """Compare the index against a full rescan; returns {wallet: (indexed, rescanned)} mismatches."""
+        expected = self.rescan(blocks, pending_transactions)
+        with self.lock:
+            wallets = set(expected) | set(self.confirmed) | set(self.pending)
+        mismatches = {}
+        for wallet in wallets:
+            indexed = self.balance(wallet)
+            rescanned = expected.get(wallet, 0)
+            if abs(indexed - rescanned) > tolerance:
+                mismatches[wallet] = (indexed, rescanned)
+        return mismatches
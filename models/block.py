@@ -1,59 +1,129 @@
 import hashlib
 import time
 import json
+from models.transaction import Transaction
 from utils.constants import MINING_DIFFICULTY
 
+HEADER_FIELDS = ("previous_hash", "merkle_root", "timestamp", "nonce", "hash")
+
+
+def merkle_levels(leaves):
+    """Every level of the Merkle tree over leaves (hex hashes), leaves first and the root last."""
+    if not leaves:
+        return []
+    levels = [list(leaves)]
+    layer = levels[0]
+    while len(layer) > 1:
+        new_layer = []
+        for i in range(0, len(layer), 2):
+            left = layer[i]
+            right = layer[i + 1] if i + 1 < len(layer) else left
+            new_layer.append(hashlib.sha256((left + right).encode()).hexdigest())
+        levels.append(new_layer)
+        layer = new_layer
+    return levels
+
+
+def verify_merkle_proof(txid, position, proof, merkle_root):
+    """Check a Merkle path from Block.merkle_proof(): one hash per tree level."""
+    digest = txid
+    for sibling in proof:
+        pair = digest + sibling if position % 2 == 0 else sibling + digest
+        digest = hashlib.sha256(pair.encode()).hexdigest()
+        position //= 2
+    return position == 0 and digest == merkle_root
+
+
+def header_hash(header):
+    """
+    The block hash from its header alone: SHA-256 of the sorted-key JSON of
+    merkle_root, nonce, previous_hash and timestamp. The Merkle root commits
+    to the transactions, so headers can be checked without the block body.
+    """
+    fields = {key: header[key] for key in ("merkle_root", "nonce", "previous_hash", "timestamp")}
+    return hashlib.sha256(json.dumps(fields, sort_keys=True).encode()).hexdigest()
+
 
 class Block:
     def __init__(self, transactions, previous_hash):
         self.transactions = transactions
         self.timestamp = time.time()
         self.previous_hash = previous_hash
+        self.txids = [tx.txid for tx in transactions]  # also the Merkle leaves
         self.merkle_root = self.build_merkle_root()
         self.nonce = 0
         self.hash = self.compute_hash()
 
     def compute_hash(self):
-        block_data = {
-            "transactions": [tx.tx_to_dict() for tx in self.transactions],
-            "timestamp": self.timestamp,
-            "previous_hash": self.previous_hash,
-            "merkle_root": self.merkle_root,
-            "nonce": self.nonce
-        }
-        block_string = json.dumps(block_data, sort_keys=True).encode()
-        return hashlib.sha256(block_string).hexdigest()
+        prefix, suffix = self.hash_parts()
+        return hashlib.sha256(prefix + str(self.nonce).encode() + suffix).hexdigest()
 
     def build_merkle_root(self):
-        if not self.transactions:
-            return ""
-        layer = [
-            hashlib.sha256(
-                json.dumps(tx.tx_to_dict(), sort_keys=True).encode()
-            ).hexdigest()
-            for tx in self.transactions
-        ]
-
-        while len(layer) > 1:
-            new_layer = []
-            for i in range(0, len(layer), 2):
-                left = layer[i]
-                right = layer[i + 1] if i + 1 < len(layer) else left
-                combined = hashlib.sha256((left + right).encode()).hexdigest()
-                new_layer.append(combined)
-            layer = new_layer
-
-        return layer[0]
-
-    def mine_block(self):
+        """Build the Merkle tree from the txids, keep its levels for proofs and return the root."""
+        self.merkle_levels = merkle_levels(self.txids)
+        return self.merkle_levels[-1][0] if self.merkle_levels else ""
+
+    def merkle_valid(self):
+        """Whether merkle_root (e.g. as received from a peer) matches the transactions."""
+        return self.merkle_root == (self.merkle_levels[-1][0] if self.merkle_levels else "")
+
+    def merkle_proof(self, position):
+        """Sibling hashes from the leaf at position up to the root, for verify_merkle_proof()."""
+        proof = []
+        for layer in self.merkle_levels[:-1]:
+            sibling = position ^ 1
+            proof.append(layer[sibling] if sibling < len(layer) else layer[position])
+            position //= 2
+        return proof
+
+    def hash_parts(self):
+        """
+        Split the canonical hash payload around the nonce.
+
+        The header is hashed as its sorted-key JSON (see header_hash()), so the
+        nonce sits between merkle_root and previous_hash. Returns the bytes
+        before and after the nonce, so sha256(prefix + str(nonce) + suffix) ==
+        compute_hash().
+        """
+        prefix = '{"merkle_root": %s, "nonce": ' % json.dumps(self.merkle_root)
+        suffix = ', "previous_hash": %s, "timestamp": %s}' % (
+            json.dumps(self.previous_hash), json.dumps(self.timestamp))
+        return prefix.encode(), suffix.encode()
+
+    def hash_template(self):
+        """Return the SHA-256 midstate of the fixed prefix and the serialized tail."""
+        prefix, suffix = self.hash_parts()
+        return hashlib.sha256(prefix), suffix
+
+    def mine_block(self, use_midstate=True):
         """Mine the block by finding a hash with the required difficulty."""
         target = "0" * MINING_DIFFICULTY
-        while not self.hash.startswith(target):
-            self.nonce += 1
-            self.hash = self.compute_hash()
+        if not use_midstate:
+            while not self.hash.startswith(target):
+                self.nonce += 1
+                self.hash = self.compute_hash()
+            print(f"Block mined: {self.hash}")
+            return
+
+        # Serialize the fixed content once and only feed the nonce per attempt
+        midstate, suffix = self.hash_template()
+        nonce = self.nonce
+        digest = self.hash
+        while not digest.startswith(target):
+            nonce += 1
+            h = midstate.copy()
+            h.update(str(nonce).encode())
+            h.update(suffix)
+            digest = h.hexdigest()
+        self.nonce = nonce
+        self.hash = digest
         print(f"Block mined: {self.hash}")
     
 
+    def header(self):
+        """Compact header: everything but the transactions."""
+        return {field: getattr(self, field) for field in HEADER_FIELDS}
+
     def to_dict(self):
         """Serialize the block for broadcasting."""
         return {
@@ -0,0 +1,205 @@
+import json
+import mmap
+import os
+import pickle
+import struct
+import tempfile
+import threading
+from array import array
+from collections import OrderedDict
+
+from models.block import Block, HEADER_FIELDS
+from utils.constants import BLOCK_CACHE_SIZE
+
+RECORD = struct.Struct(">QI32s")  # segment offset, length, raw block hash
+INDEX_HEADER = struct.Struct(">8sI")  # magic, format version, at the start of blocks.idx
+INDEX_MAGIC = b"BLKINDEX"
+STORE_VERSION = 2  # 2: block hashes cover the header only (Merkle root instead of the transactions)
+
+
+class BlockStore:
+    """
+    Append-only block storage that behaves like the old blockchain list.
+
+    Blocks are appended as JSON to a segment file and located through a
+    fixed-size record per block (offset, length, hash) in an index file.
+    Reads go through an mmap of the segment, and only the most recently used
+    blocks are kept deserialized, so memory stays flat as the chain grows.
+    With no data_dir the segment is an anonymous temporary file.
+
+    A persistent store also keeps chain.snap, the miner's indexes as of some
+    height (txid locations, balances, ledger columns), so a restart only
+    replays the blocks appended after it instead of decoding the whole chain.
+    """
+
+    def __init__(self, data_dir=None, cache_size=BLOCK_CACHE_SIZE):
+        self.cache_size = cache_size
+        self.cache = OrderedDict()  # height -> Block
+        self.offsets = array("Q")
+        self.lengths = array("I")
+        self.map = None
+        self.lock = threading.RLock()
+        self.data_dir = data_dir
+        self.snapshot_lock = threading.Lock()
+        self.snapshot_height = 0  # height of the snapshot last written
+
+        if data_dir is None:
+            self.segment = tempfile.TemporaryFile()
+            self.index = None
+        else:
+            os.makedirs(data_dir, exist_ok=True)
+            self.segment = open(os.path.join(data_dir, "blocks.dat"), "a+b")
+            self.index = open(os.path.join(data_dir, "blocks.idx"), "a+b")
+            self.load_index()
+
+    def load_index(self):
+        """
+        Read the offset index, dropping any record a crash left half-written.
+        Raises ValueError for a store in another format, whose block hashes
+        peers would reject.
+        """
+        segment_size = os.fstat(self.segment.fileno()).st_size
+        self.index.seek(0)
+        data = self.index.read()
+        if len(data) < INDEX_HEADER.size and not segment_size:
+            # A new store (or one that never got past its first write): stamp the format
+            data = INDEX_HEADER.pack(INDEX_MAGIC, STORE_VERSION)
+            self.index.truncate(0)
+            self.index.write(data)
+            self.index.flush()
+        magic, version = INDEX_HEADER.unpack_from(data) if len(data) >= INDEX_HEADER.size else (None, None)
+        if magic != INDEX_MAGIC or version != STORE_VERSION:
+            self.close()
+            raise ValueError(f"block store {self.data_dir} is not in format version {STORE_VERSION} "
+                             f"(written by an older version?); move it away to start a new chain")
+        end = 0
+        for pos in range(INDEX_HEADER.size, len(data) - RECORD.size + 1, RECORD.size):
+            offset, length, _ = RECORD.unpack_from(data, pos)
+            if offset != end or offset + length > segment_size:
+                break
+            self.offsets.append(offset)
+            self.lengths.append(length)
+            end = offset + length
+        self.index.truncate(INDEX_HEADER.size + len(self.offsets) * RECORD.size)
+        self.segment.truncate(end)
+
+    def save_snapshot(self, height, state):
+        """Write the indexes as of height (the first height blocks) to chain.snap, replacing the old one."""
+        if self.data_dir is None or height <= 0:
+            return
+        path = os.path.join(self.data_dir, "chain.snap")
+        data = pickle.dumps({"height": height, "tip": self.hash_at(height - 1), "state": state},
+                            protocol=pickle.HIGHEST_PROTOCOL)
+        with self.snapshot_lock:
+            if height <= self.snapshot_height:
+                return  # a newer one was written meanwhile
+            with tempfile.NamedTemporaryFile(dir=self.data_dir, suffix=".tmp", delete=False) as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(f.name, path)
+            self.snapshot_height = height
+
+    def load_snapshot(self):
+        """Returns (height, state) from chain.snap if it matches the stored chain, else None."""
+        if self.data_dir is None:
+            return None
+        try:
+            with open(os.path.join(self.data_dir, "chain.snap"), "rb") as f:
+                snapshot = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        height = snapshot["height"]
+        if not 0 < height <= len(self) or self.hash_at(height - 1) != snapshot["tip"]:
+            return None  # written for another chain, or for blocks a crash truncated
+        return height, snapshot["state"]
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __iter__(self):
+        for height in range(len(self)):
+            yield self.read(height, keep=False)
+
+    def __getitem__(self, height):
+        if isinstance(height, slice):
+            return [self.read(h) for h in range(*height.indices(len(self)))]
+        if height < 0:
+            height += len(self)
+        if not 0 <= height < len(self):
+            raise IndexError("block height out of range")
+        return self.read(height)
+
+    def append(self, block):
+        data = json.dumps(block.to_dict()).encode()
+        with self.lock:
+            self.segment.seek(0, os.SEEK_END)
+            offset = self.segment.tell()
+            self.segment.write(data)
+            self.segment.flush()
+            if self.index is not None:
+                self.index.write(RECORD.pack(offset, len(data), bytes.fromhex(block.hash)))
+                self.index.flush()
+            self.offsets.append(offset)
+            self.lengths.append(len(data))
+            self.remember(len(self.offsets) - 1, block)
+
+    def read(self, height, keep=True):
+        """Deserialize the block at height; keep=False skips the LRU (full scans)."""
+        with self.lock:
+            block = self.cache.get(height)
+            if block is not None:
+                self.cache.move_to_end(height)
+                return block
+        data = self.raw(height)
+        block = Block.from_dict(json.loads(data))
+        if keep:
+            with self.lock:
+                self.remember(height, block)
+        return block
+
+    def header(self, height):
+        """The header of the block at height, parsed from its JSON unless the block is cached."""
+        with self.lock:
+            block = self.cache.get(height)
+        if block is not None:
+            return block.header()
+        data = json.loads(self.raw(height))
+        return {field: data[field] for field in HEADER_FIELDS}
+
+    def raw(self, height):
+        """Serialized block JSON straight from the segment, for relaying as-is."""
+        with self.lock:
+            offset, length = self.offsets[height], self.lengths[height]
+            if self.map is None or offset + length > len(self.map):
+                self.remap()
+            return self.map[offset:offset + length]
+
+    def hash_at(self, height):
+        """
+        Block hash from the record in blocks.idx, without touching the segment
+        (persistent stores only; the miner's ChainIndex holds the hashes in memory).
+        """
+        with self.lock:
+            self.index.seek(INDEX_HEADER.size + height * RECORD.size)
+            return RECORD.unpack(self.index.read(RECORD.size))[2].hex()
+
+    def remember(self, height, block):
+        self.cache[height] = block
+        self.cache.move_to_end(height)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    def remap(self):
+        if self.map is not None:
+            self.map.close()
+        self.map = mmap.mmap(self.segment.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self):
+        with self.lock:
+            if self.map is not None:
+                self.map.close()
+                self.map = None
+            self.segment.close()
+            if self.index is not None:
+                self.index.close()
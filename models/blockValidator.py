@@ -0,0 +1,166 @@
+import math
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from models.block import Block, header_hash
+from utils.constants import MINING_DIFFICULTY, VALIDATION_WORKERS, VALIDATION_POOL_MIN_TX
+
+STAGES = ("header", "body", "apply")
+# Workers must not be forked from the miner, whose threads may hold locks at fork time
+START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+
+def check_header(header):
+    """Proof-of-work checks on a header (or full block) dict; returns why it is invalid, or None."""
+    if not isinstance(header, dict):
+        return "malformed header"
+    if not isinstance(header.get("hash"), str) or not header["hash"].startswith("0" * MINING_DIFFICULTY):
+        return "hash does not meet the difficulty"
+    try:
+        if header_hash(header) != header["hash"]:
+            return "hash does not match the header"
+    except (KeyError, TypeError, ValueError) as e:
+        return f"malformed header: {e}"
+    return None
+
+
+def is_amount(value):
+    if not isinstance(value, (int, float)) or isinstance(value, bool):
+        return False
+    try:
+        return math.isfinite(value)
+    except OverflowError:  # an integer too large for a float, which the ledger stores amounts as
+        return False
+
+
+def check_transaction(tx):
+    """Returns why a transaction is malformed, or None."""
+    if not isinstance(tx.sender, str) or not isinstance(tx.receiver, str) or not tx.sender or not tx.receiver:
+        return "sender and receiver must be wallet names"
+    if not is_amount(tx.amount) or tx.amount <= 0:
+        return "amount must be a positive number"
+    if not is_amount(tx.transaction_fees) or tx.transaction_fees < 0:
+        return "fee must be a non-negative number"
+    if tx.nonce is not None and (not isinstance(tx.nonce, int) or isinstance(tx.nonce, bool)):
+        return "nonce must be an integer"
+    return None
+
+
+def check_body(block):
+    """Merkle root and transaction checks on a built block; returns why it is invalid, or None."""
+    if not block.merkle_valid():
+        return "merkle root does not match the transactions"
+    if len(set(block.txids)) != len(block.txids):
+        return "duplicate transaction"
+    for tx in block.transactions:
+        reason = check_transaction(tx)
+        if reason:
+            return f"transaction {tx.txid[:16]}...: {reason}"
+    return None
+
+
+def validate_body(data):
+    """Body stage, run in the worker processes: build the block from its dict and check it. Returns (block, reason)."""
+    try:
+        block = Block.from_dict(data)
+    except (KeyError, TypeError, ValueError, AttributeError) as e:
+        return None, f"malformed block: {e}"
+    reason = check_body(block)
+    return (None, reason) if reason else (block, None)
+
+
+class BlockValidator:
+    """
+    Staged validation of blocks received from peers.
+
+    The header stage (difficulty and hash over the header) runs inline and is
+    cheap enough for the network thread. The body stage rebuilds txids and
+    the Merkle tree and checks every transaction; blocks with at least
+    VALIDATION_POOL_MIN_TX transactions go to a pool of worker processes, so
+    many blocks are validated at once during sync (on a single core the body
+    stage stays inline). The apply stage (linking to the tip, double
+    inclusion and state updates) is Miner.accept_block, under chain_lock and
+    in chain order. Each stage counts blocks, rejections and time spent.
+    """
+
+    def __init__(self, workers=None, pool_min_tx=VALIDATION_POOL_MIN_TX):
+        self.workers = workers or VALIDATION_WORKERS or os.cpu_count() or 1
+        # On a single core a worker process only adds pickling and IPC
+        self.pool_min_tx = pool_min_tx if (os.cpu_count() or 1) > 1 else math.inf
+        self.pool = None
+        self.lock = threading.Lock()
+        self.stats = {stage: {"blocks": 0, "rejected": 0, "seconds": 0.0} for stage in STAGES}
+
+    def executor(self):
+        with self.lock:
+            if self.pool is None:
+                self.pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context(START_METHOD))
+            return self.pool
+
+    def record(self, stage, started, blocks=1, rejected=0):
+        elapsed = time.perf_counter() - started
+        with self.lock:
+            stats = self.stats[stage]
+            stats["blocks"] += blocks
+            stats["rejected"] += rejected
+            stats["seconds"] += elapsed
+
+    def check_header(self, header):
+        started = time.perf_counter()
+        reason = check_header(header)
+        self.record("header", started, rejected=reason is not None)
+        return reason
+
+    def check_body(self, block):
+        """Body stage inline, for a block that is already built (e.g. rebuilt from a compact block)."""
+        started = time.perf_counter()
+        reason = check_body(block)
+        self.record("body", started, rejected=reason is not None)
+        return reason
+
+    def in_pool(self, data):
+        transactions = data.get("transactions")
+        return isinstance(transactions, list) and len(transactions) >= self.pool_min_tx
+
+    def submit(self, data, callback):
+        """Body stage for one block dict; callback(block, reason) runs when it is done, maybe on a pool thread."""
+        started = time.perf_counter()
+        if not self.in_pool(data):
+            block, reason = validate_body(data)
+            self.record("body", started, rejected=reason is not None)
+            callback(block, reason)
+            return
+
+        def done(future):
+            try:
+                block, reason = future.result()
+            except Exception as e:
+                block, reason = None, f"validation failed: {e}"
+            self.record("body", started, rejected=reason is not None)
+            callback(block, reason)
+        self.executor().submit(validate_body, data).add_done_callback(done)
+
+    def validate_bodies(self, datas):
+        """Body stage for many block dicts at once; returns [(block, reason)] in order."""
+        started = time.perf_counter()
+        futures = [self.executor().submit(validate_body, data) if self.in_pool(data) else None for data in datas]
+        results = [future.result() if future is not None else validate_body(data)
+                   for data, future in zip(datas, futures)]
+        self.record("body", started, len(datas), sum(reason is not None for _, reason in results))
+        return results
+
+    def get_stats(self):
+        with self.lock:
+            return {stage: dict(stats, seconds=round(stats["seconds"], 6),
+                                ms_per_block=round(stats["seconds"] * 1000 / stats["blocks"], 3)
+                                if stats["blocks"] else None)
+                    for stage, stats in self.stats.items()}
+
+    def stop(self):
+        with self.lock:
+            pool, self.pool = self.pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
@@ -1,88 +1,176 @@
-import socket
-import threading
+import asyncio
 import json
+import socket
+import time
+from collections import OrderedDict
 
-from utils.constants import QUEUED_CONNECTION
+from utils.constants import (SERVER_BACKLOG, MAX_MESSAGE_BYTES, BOOTSTRAP_SUBSCRIBER_MAX_BUFFER,
+                             MINER_EXPIRY)
+from utils.framing import LINE_PROTOCOL, RawJson, negotiate
 
 class BootstrapNode:
+    """
+    Registry of miners. Besides one-off REGISTER_MINER and GET_MINERS
+    requests it serves SUBSCRIBE connections: the subscriber gets the current
+    miner list and then a versioned delta whenever a miner joins or leaves.
+
+    Miners send a HEARTBEAT with their load every few seconds; a miner not
+    heard from for MINER_EXPIRY seconds, or whose subscription closes, is
+    removed. All connections are served as coroutines on one event loop.
+    """
+
     def __init__(self, host, port):
         self.host = host
         self.port = port
         self.registered_miners = {}  # Key: (ip, port), Value: {"ip": ip, "port": port}
-        self.lock = threading.Lock()
+        self.last_seen = OrderedDict()  # (ip, port) -> monotonic time, least recently heard from first
+        self.reports = {}  # (ip, port) -> {"load": {...}, "latency_ms": ...} from its last heartbeat
+        self.version = 0  # bumped on every membership change
+        self.members_json = b"[]"  # registered_miners serialized once per change
+        self.miners_json = None  # GET_MINERS reply with load, rebuilt when next asked after a change
+        self.subscribers = {}  # writer -> (protocol, (ip, port) of the miner it registered or None)
+        self.subscribed_miners = {}  # (ip, port) -> the subscriber writer that registered it
         self.running = True
         self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
 
     def start(self):
         self.server.bind((self.host, self.port))
-        self.server.listen(QUEUED_CONNECTION)
+        self.server.listen(SERVER_BACKLOG)
         print(f"[BOOTSTRAP NODE] Listening on {self.host}:{self.port}")
+        asyncio.run(self.serve())
 
-        self.server.settimeout(1)
-        while self.running:
-            try:
-                client_socket, addr = self.server.accept()
-                threading.Thread(target=self.handle_client, args=(client_socket,), daemon=True).start()
-            except socket.timeout:
-                continue
-            except OSError:
-                break
+    async def serve(self):
+        # Serve from a duplicate, so closing self.server from another thread only stops new work
+        server = await asyncio.start_server(self.handle_client, sock=self.server.dup(), limit=MAX_MESSAGE_BYTES)
+        async with server:
+            while self.running:
+                await asyncio.sleep(1)
+                self.expire_miners()
+        for writer in list(self.subscribers):
+            writer.close()
 
-    def handle_client(self, client_socket):
+    async def handle_client(self, reader, writer):
         try:
-            request = self.receive_json_line(client_socket)
-            if not request:
-                client_socket.close()
-                return
-
-            req_type = request.get("type")
-
-            if req_type == "REGISTER_MINER":
-                ip = request.get("ip")
-                port = request.get("port")
-                key = (ip, port)
-                with self.lock:
-                    self.registered_miners[key] = {"ip": ip, "port": port}
-                response = {
-                    "status": "registered",
-                    "miners": list(self.registered_miners.values())
-                }
-                self.send_json_line(client_socket, response)
-                print(f"[BOOTSTRAP NODE] Miner registered: {ip}:{port}")
-
-            elif req_type == "GET_MINERS":
-                with self.lock:
-                    miners_list = list(self.registered_miners.values())
-                self.send_json_line(client_socket, miners_list)
-                print(f"[BOOTSTRAP NODE] Sent miners list to client")
-
+            line = await reader.readline()
+            if line.lstrip().startswith(b"{"):
+                protocol, payload = LINE_PROTOCOL, line.strip()  # legacy one-line request
             else:
-                self.send_json_line(client_socket, {"error": "unknown request"})
-
-            client_socket.close()
+                _, protocol, reply = negotiate(line)
+                writer.write(reply)
+                payload = await protocol.read_payload(reader)
+            while payload is not None and self.running:
+                if payload:
+                    self.handle_request(writer, protocol, protocol.decode(payload))
+                    await writer.drain()
+                payload = await protocol.read_payload(reader)
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
         except Exception as e:
             print(f"[BOOTSTRAP NODE ERROR] {e}")
-            client_socket.close()
-
-    def receive_json_line(self, sock):
-        buffer = ""
-        while True:
-            try:
-                data = sock.recv(1024).decode()
-                if not data:
-                    break
-                buffer += data
-                if "\n" in buffer:
-                    line, _ = buffer.split("\n", 1)
-                    return json.loads(line.strip())
-            except Exception:
+        finally:
+            self.unsubscribe(writer)
+            writer.close()
+
+    def handle_request(self, writer, protocol, request):
+        req_type = request.get("type")
+
+        if req_type == "REGISTER_MINER":
+            ip = request.get("ip")
+            port = request.get("port")
+            self.heard_from((ip, port))
+            response = RawJson(b'{"status": "registered", "version": %d, "miners": %s}'
+                               % (self.version, self.members_json))
+            self.send_message(writer, protocol, response)
+            print(f"[BOOTSTRAP NODE] Miner registered: {ip}:{port}")
+
+        elif req_type == "GET_MINERS":
+            self.send_message(writer, protocol, RawJson(self.miners_with_load()))
+            print(f"[BOOTSTRAP NODE] Sent miners list to client")
+
+        elif req_type == "SUBSCRIBE":
+            self.subscribe(writer, protocol, request)
+
+        elif req_type == "HEARTBEAT":
+            key = (request.get("ip"), request.get("port"))
+            self.heard_from(key)
+            self.reports[key] = {"load": request.get("load") or {}, "latency_ms": request.get("latency_ms")}
+            self.miners_json = None
+            self.send_message(writer, protocol, {"type": "HEARTBEAT_ACK", "seq": request.get("seq")})
+
+        else:
+            self.send_message(writer, protocol, {"error": "unknown request"})
+
+    def send_message(self, writer, protocol, data):
+        writer.write(protocol.pack(data))
+
+    # --- membership ---
+
+    def heard_from(self, key):
+        """Register the miner if it is new (or was expired) and refresh its last-seen time."""
+        self.last_seen[key] = time.monotonic()
+        self.last_seen.move_to_end(key)
+        self.update_members(joined=[{"ip": key[0], "port": key[1]}])
+
+    def expire_miners(self):
+        cutoff = time.monotonic() - MINER_EXPIRY
+        expired = []
+        while self.last_seen:
+            key, seen = next(iter(self.last_seen.items()))
+            if seen >= cutoff:
                 break
-        return None
+            del self.last_seen[key]
+            expired.append(self.registered_miners.get(key) or {"ip": key[0], "port": key[1]})
+            print(f"[BOOTSTRAP NODE] Miner expired: {key[0]}:{key[1]}")
+        if expired:
+            self.update_members(left=expired)
 
-    def send_json_line(self, sock, data):
-        message = json.dumps(data) + "\n"
-        try:
-            sock.sendall(message.encode())
-        except Exception as e:
-            print(f"[BOOTSTRAP NODE ERROR] send_json_line: {e}")
+    def subscribe(self, writer, protocol, request):
+        """Send the miner list and keep the connection for deltas; a miner subscribes with its address."""
+        key = None
+        if request.get("ip") is not None and request.get("port") is not None:
+            key = (request["ip"], request["port"])
+            self.subscribed_miners[key] = writer
+            self.heard_from(key)
+        self.send_message(writer, protocol, RawJson(b'{"type": "MINERS", "version": %d, "miners": %s}'
+                                                    % (self.version, self.members_json)))
+        self.subscribers[writer] = (protocol, key)
+        print(f"[BOOTSTRAP NODE] Subscriber added ({len(self.subscribers)} total)")
+
+    def unsubscribe(self, writer):
+        _, key = self.subscribers.pop(writer, (None, None))
+        if key is not None and self.subscribed_miners.get(key) is writer:
+            del self.subscribed_miners[key]
+            self.last_seen.pop(key, None)
+            self.update_members(left=[{"ip": key[0], "port": key[1]}])
+            print(f"[BOOTSTRAP NODE] Miner left: {key[0]}:{key[1]}")
+
+    def update_members(self, joined=(), left=()):
+        """Apply a membership change and push it to subscribers."""
+        joined = [m for m in joined if (m["ip"], m["port"]) not in self.registered_miners]
+        left = [m for m in left if (m["ip"], m["port"]) in self.registered_miners]
+        if not joined and not left:
+            return
+        for m in joined:
+            self.registered_miners[(m["ip"], m["port"])] = m
+        for m in left:
+            del self.registered_miners[(m["ip"], m["port"])]
+            self.reports.pop((m["ip"], m["port"]), None)
+        self.version += 1
+        self.members_json = json.dumps(list(self.registered_miners.values())).encode()
+        self.miners_json = None
+        delta = {"type": "MINERS_DELTA", "version": self.version, "joined": joined, "left": left}
+        for writer, (protocol, _) in list(self.subscribers.items()):
+            if writer.transport.get_write_buffer_size() > BOOTSTRAP_SUBSCRIBER_MAX_BUFFER:
+                # Not reading its deltas: drop it, it resubscribes for a fresh snapshot
+                writer.transport.abort()
+                continue
+            self.send_message(writer, protocol, delta)
+
+    def miners_with_load(self):
+        if self.miners_json is None:
+            self.miners_json = json.dumps([
+                dict(m, **self.reports.get(key, {"load": {}, "latency_ms": None}))
+                for key, m in self.registered_miners.items()
+            ]).encode()
+        return self.miners_json
@@ -0,0 +1,58 @@
+import threading
+
+
+class ChainIndex:
+    """
+    Lookup tables over the block list, kept in step with Miner.blockchain.
+
+    Blocks are stored by height in the chain itself; the index maps block
+    hashes to heights and transaction ids to (height, position), so duplicate
+    checks and lookups by hash, height or txid don't scan the chain. It holds
+    the only in-memory list of block hashes; the block store keeps them on disk.
+    """
+
+    def __init__(self):
+        self.heights = {}       # block hash -> height
+        self.hashes = []        # height -> block hash
+        self.transactions = {}  # txid -> (height, position in block)
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def add(self, block):
+        with self.lock:
+            height = len(self.hashes)
+            self.hashes.append(block.hash)
+            self.heights[block.hash] = height
+            for position, txid in enumerate(block.txids):
+                self.transactions[txid] = (height, position)
+            return height
+
+    def snapshot(self):
+        with self.lock:
+            return {"hashes": list(self.hashes), "transactions": dict(self.transactions)}
+
+    def restore(self, state):
+        with self.lock:
+            self.hashes = state["hashes"]
+            self.heights = {block_hash: height for height, block_hash in enumerate(self.hashes)}
+            self.transactions = state["transactions"]
+
+    def has_block(self, block_hash):
+        return block_hash in self.heights
+
+    def has_transaction(self, txid):
+        return txid in self.transactions
+
+    def height_of(self, block_hash):
+        return self.heights.get(block_hash)
+
+    def hash_at(self, height):
+        if 0 <= height < len(self.hashes):
+            return self.hashes[height]
+        return None
+
+    def locate_transaction(self, txid):
+        """Returns (height, position) of a confirmed transaction, or None."""
+        return self.transactions.get(txid)
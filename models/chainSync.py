@@ -0,0 +1,203 @@
+import itertools
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from models.blockValidator import check_header
+from utils.framing import RawJson
+from utils.constants import SYNC_HEADERS_PER_REQUEST, SYNC_BLOCKS_PER_REQUEST, SYNC_TIMEOUT
+
+
+class ChainSync:
+    """
+    Headers-first chain download between miners.
+
+    Peers answer GET_HEADERS and GET_BLOCKS(from_height, count) over the
+    existing miner connections; replies carry the request_id so they can be
+    matched to the waiting request. A syncing miner downloads headers from
+    the peer with the longest chain, fetches block bodies in batches from all
+    peers in parallel and has the miner's BlockValidator check each batch in
+    its process pool, then applies them in height order while later batches
+    are still downloading and being validated.
+    """
+
+    def __init__(self, miner):
+        self.miner = miner
+        self.request_ids = itertools.count(1)
+        self.pending = {}  # request_id -> [Event, response]
+        self.pending_lock = threading.Lock()
+        self.sync_lock = threading.Lock()
+        self.stats = {"blocks": 0, "seconds": 0.0, "blocks_per_sec": 0.0}
+
+    # --- serving peers ---
+
+    def handle_message(self, sock, parsed):
+        """Handle a sync message from a peer; returns False if it isn't one."""
+        msg_type = parsed.get("type")
+        if msg_type == "GET_HEADERS":
+            self.reply(sock, self.serve_headers(parsed))
+        elif msg_type == "GET_BLOCKS":
+            sock.send(self.serve_blocks(parsed))
+        elif msg_type in ("HEADERS", "BLOCKS"):
+            self.resolve(parsed)
+        else:
+            return False
+        return True
+
+    def serve_headers(self, request):
+        store = self.miner.blockchain
+        start = max(0, int(request.get("from_height", 0)))
+        count = min(int(request.get("count", SYNC_HEADERS_PER_REQUEST)), SYNC_HEADERS_PER_REQUEST)
+        end = min(len(store), start + count)
+        return {
+            "type": "HEADERS",
+            "request_id": request.get("request_id"),
+            "from_height": start,
+            "tip_height": len(store) - 1,
+            "headers": [store.header(h) for h in range(start, end)]
+        }
+
+    def serve_blocks(self, request):
+        """Builds the BLOCKS reply from the stored JSON without deserializing blocks."""
+        store = self.miner.blockchain
+        start = max(0, int(request.get("from_height", 0)))
+        count = min(int(request.get("count", SYNC_BLOCKS_PER_REQUEST)), SYNC_BLOCKS_PER_REQUEST)
+        end = min(len(store), start + count)
+        head = json.dumps({"type": "BLOCKS", "request_id": request.get("request_id"), "from_height": start})
+        body = b",".join(store.raw(h) for h in range(start, end))
+        return RawJson(head[:-1].encode() + b', "blocks": [' + body + b"]}")
+
+    def reply(self, sock, message):
+        sock.send(message)
+
+    # --- requesting from peers ---
+
+    def request(self, sock, message):
+        """Send a request to a peer and wait for the matching reply (None on timeout)."""
+        request_id = next(self.request_ids)
+        waiter = [threading.Event(), None]
+        with self.pending_lock:
+            self.pending[request_id] = waiter
+        try:
+            self.reply(sock, dict(message, request_id=request_id))
+            if not waiter[0].wait(SYNC_TIMEOUT):
+                return None
+            return waiter[1]
+        except OSError:
+            return None
+        finally:
+            with self.pending_lock:
+                self.pending.pop(request_id, None)
+
+    def resolve(self, response):
+        with self.pending_lock:
+            waiter = self.pending.get(response.get("request_id"))
+        if waiter is not None:
+            waiter[1] = response
+            waiter[0].set()
+
+    # --- syncing ---
+
+    def run(self):
+        """Download blocks until no peer is ahead of us; returns the number applied."""
+        if not self.sync_lock.acquire(blocking=False):
+            return 0  # already syncing
+        try:
+            start = time.monotonic()
+            applied = 0
+            try:
+                while self.miner.running:
+                    peers = list(self.miner.miner_connections)
+                    if not peers:
+                        break
+                    height = len(self.miner.blockchain)
+                    headers = self.fetch_headers(peers, height)
+                    if not headers:
+                        break
+                    added = self.fetch_and_apply(peers, height, headers)
+                    applied += added
+                    if added < len(headers):
+                        break  # a peer sent something invalid or stopped answering
+            except Exception as e:
+                # Blocks applied so far are kept; a failed sync must not keep the miner from mining
+                print(f"[MINER ERROR] chain sync: {e}")
+            elapsed = time.monotonic() - start
+            if applied:
+                rate = applied / elapsed if elapsed > 0 else float(applied)
+                self.stats = {"blocks": applied, "seconds": elapsed, "blocks_per_sec": rate}
+                print(f"[MINER {self.miner.port}] Synced {applied} blocks in {elapsed:.2f}s ({rate:.1f} blocks/sec)")
+            return applied
+        finally:
+            self.sync_lock.release()
+
+    def fetch_headers(self, peers, height):
+        """Ask every peer for headers after our tip and keep the longest valid run."""
+        request = {"type": "GET_HEADERS", "from_height": height, "count": SYNC_HEADERS_PER_REQUEST}
+        with ThreadPoolExecutor(max_workers=len(peers)) as pool:
+            responses = list(pool.map(lambda peer: self.request(peer, request), peers))
+        best = []
+        for response in responses:
+            if response and response.get("from_height") == height:
+                headers = response.get("headers")
+                if isinstance(headers, list) and len(headers) > len(best) and self.valid_headers(headers):
+                    best = headers  # a malformed reply counts as a peer with nothing to offer
+        return best
+
+    def valid_headers(self, headers):
+        """Headers must extend our tip, link to each other, hash correctly and meet the difficulty."""
+        previous = self.miner.last_block_hash
+        for header in headers:
+            if not isinstance(header, dict) or header.get("previous_hash") != previous or check_header(header):
+                return False
+            previous = header["hash"]
+        return True
+
+    def fetch_and_apply(self, peers, height, headers):
+        batches = [headers[i:i + SYNC_BLOCKS_PER_REQUEST] for i in range(0, len(headers), SYNC_BLOCKS_PER_REQUEST)]
+        pool = ThreadPoolExecutor(max_workers=len(peers))
+        try:
+            futures = [
+                pool.submit(self.fetch_batch, peers, i, height + i * SYNC_BLOCKS_PER_REQUEST, batch)
+                for i, batch in enumerate(batches)
+            ]
+            applied = 0
+            # Batches are fetched and validated in any order; apply them in height order
+            for batch, future in zip(batches, futures):
+                results = future.result()
+                if results is None:
+                    return applied
+                for header, (block, reason) in zip(batch, results):
+                    if reason or not self.miner.accept_block(block):
+                        print(f"[MINER {self.miner.port}] Sync stopped: invalid block {header['hash'][:16]}... "
+                              f"({reason or 'does not extend the chain'})")
+                        return applied
+                    applied += 1
+            return applied
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def fetch_batch(self, peers, index, from_height, headers):
+        """
+        Fetch one batch of bodies, starting with peer index and failing over to
+        the rest, and validate it; returns [(block, reason)] or None.
+        """
+        count = len(headers)
+        for attempt in range(len(peers)):
+            peer = peers[(index + attempt) % len(peers)]
+            response = self.request(peer, {"type": "GET_BLOCKS", "from_height": from_height, "count": count})
+            if response and response.get("from_height") == from_height and len(response.get("blocks", [])) == count:
+                return self.validate_batch(headers, response["blocks"])
+        return None
+
+    def validate_batch(self, headers, blocks):
+        """Header stage for each block, then the body stage for the batch; stops at the first invalid header."""
+        validator = self.miner.validator
+        for i, (header, data) in enumerate(zip(headers, blocks)):
+            if not isinstance(data, dict):
+                return validator.validate_bodies(blocks[:i]) + [(None, "malformed block")]
+            reason = "hash differs from its header" if data.get("hash") != header["hash"] else None
+            reason = reason or validator.check_header(data)
+            if reason:
+                return validator.validate_bodies(blocks[:i]) + [(None, reason)]
+        return validator.validate_bodies(blocks)
@@ -0,0 +1,113 @@
+import select
+import threading
+import time
+
+from utils.constants import WALLET_POOL_SIZE, WALLET_POOL_MAX_IDLE, WALLET_REQUEST_TIMEOUT
+from utils.framing import FramedSocket
+
+
+class MinerConnection:
+    """One long-lived, framed WALLET connection to a miner."""
+
+    def __init__(self, miner, timeout=WALLET_REQUEST_TIMEOUT):
+        self.address = (miner["ip"], miner["port"])
+        self.conn = FramedSocket.connect(self.address, "WALLET", timeout=timeout)
+        self.last_used = time.monotonic()
+
+    def healthy(self, max_idle):
+        """Idle too long, closed by the miner or holding stray data means don't reuse it."""
+        if time.monotonic() - self.last_used > max_idle or self.conn.pending():
+            return False
+        try:
+            readable, _, _ = select.select([self.conn.sock], [], [], 0)
+        except (OSError, ValueError):
+            return False
+        return not readable
+
+    def send(self, messages):
+        self.conn.send_many(messages)
+
+    def receive(self):
+        message = self.conn.recv()
+        self.last_used = time.monotonic()
+        return message
+
+    def close(self):
+        self.conn.close()
+
+
+class ConnectionPool:
+    """
+    Keeps up to max_size idle connections per miner and reuses them across
+    requests. A pooled connection is checked before reuse and dropped if it has
+    been idle longer than max_idle seconds or the miner closed it; a request
+    that fails on a reused connection is retried once on a fresh one.
+    """
+
+    def __init__(self, max_size=WALLET_POOL_SIZE, max_idle=WALLET_POOL_MAX_IDLE, timeout=WALLET_REQUEST_TIMEOUT):
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self.idle = {}  # (ip, port) -> [MinerConnection]
+        self.lock = threading.Lock()
+        self.stats = {"opened": 0, "reused": 0, "discarded": 0}
+
+    def acquire(self, miner):
+        """Returns (connection, reused)."""
+        key = (miner["ip"], miner["port"])
+        with self.lock:
+            connections = self.idle.get(key, [])
+            while connections:
+                conn = connections.pop()
+                if conn.healthy(self.max_idle):
+                    self.stats["reused"] += 1
+                    return conn, True
+                self.stats["discarded"] += 1
+                conn.close()
+            self.stats["opened"] += 1
+        return MinerConnection(miner, self.timeout), False
+
+    def release(self, conn):
+        with self.lock:
+            connections = self.idle.setdefault(conn.address, [])
+            if len(connections) < self.max_size:
+                connections.append(conn)
+                return
+        conn.close()
+
+    def request(self, miner, message):
+        """Send one request to a miner and return its JSON reply."""
+        return self.pipeline(miner, [message])[0]
+
+    def pipeline(self, miner, messages):
+        """Send several requests in one write and read their replies in order."""
+        conn, reused = self.acquire(miner)
+        try:
+            replies = self.exchange(conn, messages)
+        except (OSError, ValueError):
+            if not reused:
+                raise
+            # The pooled socket went stale; a fresh connection either works or raises
+            with self.lock:
+                self.stats["discarded"] += 1
+                self.stats["opened"] += 1
+            conn = MinerConnection(miner, self.timeout)
+            replies = self.exchange(conn, messages)
+        self.release(conn)
+        return replies
+
+    @staticmethod
+    def exchange(conn, messages):
+        try:
+            conn.send(messages)
+            return [conn.receive() for _ in messages]
+        except (OSError, ValueError):
+            conn.close()
+            raise
+
+    def close(self):
+        with self.lock:
+            connections = [conn for pooled in self.idle.values() for conn in pooled]
+            self.idle.clear()
+        for conn in connections:
+            conn.close()
@@ -0,0 +1,372 @@
+import base64
+import threading
+import time
+from collections import OrderedDict
+
+from utils.constants import (GOSSIP_SEEN_CACHE, GOSSIP_KNOWN_PER_PEER, GOSSIP_INV_INTERVAL_MS,
+                             GOSSIP_REQUEST_TIMEOUT, COMPACT_BLOCKS)
+from models.block import Block
+from models.transaction import Transaction
+from models.minerServer import PRIORITY_LOW, PRIORITY_HIGH
+from utils.framing import RawJson
+
+
+class SeenCache:
+    """Bounded set of hashes; the oldest entries are forgotten first."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.items = OrderedDict()
+
+    def add(self, key):
+        self.items[key] = None
+        self.items.move_to_end(key)
+        if len(self.items) > self.capacity:
+            self.items.popitem(last=False)
+
+    def __contains__(self, key):
+        return key in self.items
+
+    def __len__(self):
+        return len(self.items)
+
+
+def node_of(peer):
+    """Connections to and from the same miner share its listening address."""
+    return getattr(peer, "node", None) or peer
+
+
+def pack_hashes(hashes):
+    """Hex hashes as one base64 string of their raw bytes: about 43 bytes per hash instead of 67 in JSON."""
+    return base64.b64encode(b"".join(bytes.fromhex(h) for h in hashes)).decode()
+
+
+def unpack_hashes(packed):
+    if not packed:
+        return []
+    raw = base64.b64decode(packed, validate=True)
+    if len(raw) % 32:
+        raise ValueError("packed hashes must be 32 bytes each")
+    return [raw[i:i + 32].hex() for i in range(0, len(raw), 32)]
+
+
+SHORT_ID_BYTES = 6
+
+
+def short_id(txid):
+    """The first SHORT_ID_BYTES of a txid, as hex; txids are already uniform hashes."""
+    return txid[:SHORT_ID_BYTES * 2]
+
+
+def pack_short_ids(txids):
+    return base64.b64encode(b"".join(bytes.fromhex(short_id(txid)) for txid in txids)).decode()
+
+
+def unpack_short_ids(packed):
+    raw = base64.b64decode(packed or "", validate=True)
+    if len(raw) % SHORT_ID_BYTES:
+        raise ValueError(f"packed short ids must be {SHORT_ID_BYTES} bytes each")
+    return [raw[i:i + SHORT_ID_BYTES].hex() for i in range(0, len(raw), SHORT_ID_BYTES)]
+
+
+class Gossip:
+    """
+    Inventory-based relay between miners.
+
+    New transactions and blocks are announced by hash in INV messages; a peer
+    answers with GETDATA for the hashes it does not have yet and receives only
+    those. Transaction announcements are batched per peer every
+    GOSSIP_INV_INTERVAL_MS, blocks are announced at once. A bounded seen cache
+    stops hashes we already handled from being fetched or relayed again, and
+    per-peer caches skip announcing hashes a peer is known to have. Peers are
+    keyed by node, since two miners are linked by a connection in each
+    direction; hash lists go on the wire packed (see pack_hashes).
+
+    Blocks are pushed as compact blocks (CMPCTBLOCK): the header plus a short
+    id per transaction. The receiver rebuilds the block from its mempool and
+    asks for just the transactions it lacks (GETBLOCKTXN / BLOCKTXN); a block
+    whose rebuilt Merkle root does not match is fetched in full with GETDATA.
+    """
+
+    def __init__(self, miner, compact_blocks=COMPACT_BLOCKS):
+        self.miner = miner
+        self.compact_blocks = compact_blocks  # False announces blocks with INV instead
+        self.seen = SeenCache(GOSSIP_SEEN_CACHE)
+        self.known = {}  # node -> SeenCache of hashes that miner has
+        self.queued = {}  # peer -> txids waiting for the next INV
+        self.requested = {}  # hash -> time of our GETDATA
+        self.partial = {}  # block hash -> (header, transactions with None gaps) awaiting BLOCKTXN
+        self.lock = threading.Lock()
+        self.condition = threading.Condition(self.lock)
+        self.running = False
+        self.stats = {
+            "transactions": 0,  # new transactions admitted here
+            "tx_inv_bytes": 0, "tx_getdata_bytes": 0, "tx_data_bytes": 0,
+            "block_inv_bytes": 0, "block_getdata_bytes": 0, "block_data_bytes": 0,
+            "block_compact_bytes": 0, "block_getblocktxn_bytes": 0, "block_txn_bytes": 0,
+            "compact_blocks": 0,  # compact blocks received and rebuilt
+            "compact_complete": 0,  # of those, rebuilt from the mempool alone
+            "compact_fallbacks": 0,  # fetched in full after a failed rebuild
+            "compact_tx_hits": 0, "compact_tx_missing": 0
+        }
+
+    def start(self):
+        self.running = True
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+
+    # --- announcing ---
+
+    def announce_transactions(self, txids, source=None):
+        """Queue INVs for newly admitted transactions to every peer but their source."""
+        with self.lock:
+            self.stats["transactions"] += len(txids)
+            for txid in txids:
+                self.seen.add(txid)
+            source = node_of(source)
+            for peer in list(self.miner.miner_connections):
+                if node_of(peer) == source:
+                    continue
+                known = self.known_by(peer)
+                fresh = [txid for txid in txids if txid not in known]
+                if fresh:
+                    self.queued.setdefault(peer, []).extend(fresh)
+
+    def announce_block(self, block, source=None):
+        with self.lock:
+            self.seen.add(block.hash)
+            source = node_of(source)
+            peers = [peer for peer in self.miner.miner_connections
+                     if node_of(peer) != source and block.hash not in self.known_by(peer)]
+            for peer in peers:
+                self.known_by(peer).add(block.hash)
+        if not peers:
+            return
+        if not self.compact_blocks:
+            for peer in peers:
+                self.send(peer, {"type": "INV", "block": pack_hashes([block.hash])}, "block_inv_bytes")
+            return
+        # Pushed without an INV round trip: the compact form is barely bigger than one
+        message = {"type": "CMPCTBLOCK", "header": block.header(),
+                   "short_ids": pack_short_ids(block.txids)}
+        for peer in peers:
+            self.send(peer, message, "block_compact_bytes")
+
+    def run(self):
+        """Flush queued transaction INVs every GOSSIP_INV_INTERVAL_MS."""
+        while True:
+            with self.condition:
+                self.condition.wait(GOSSIP_INV_INTERVAL_MS / 1000)
+                if not self.running:
+                    return
+                queued, self.queued = self.queued, {}
+                self.expire_requests()
+            for peer, txids in queued.items():
+                with self.lock:
+                    known = self.known_by(peer)
+                    txids = [txid for txid in txids if txid not in known]
+                    for txid in txids:
+                        known.add(txid)
+                if txids:
+                    self.send(peer, {"type": "INV", "tx": pack_hashes(txids)}, "tx_inv_bytes")
+
+    # --- handling peer messages ---
+
+    def handle_message(self, peer, parsed):
+        """Handle an INV, GETDATA or compact block message from a peer; returns False if it isn't one."""
+        msg_type = parsed.get("type")
+        if msg_type in ("CMPCTBLOCK", "GETBLOCKTXN", "BLOCKTXN"):
+            try:
+                if msg_type == "CMPCTBLOCK":
+                    self.handle_compact_block(peer, parsed)
+                elif msg_type == "GETBLOCKTXN":
+                    self.handle_getblocktxn(peer, parsed)
+                else:
+                    self.handle_blocktxn(peer, parsed)
+            except (KeyError, TypeError, ValueError, IndexError):
+                pass  # malformed, drop it
+            return True
+        if msg_type not in ("INV", "GETDATA"):
+            return False
+        try:
+            txids, block_hashes = unpack_hashes(parsed.get("tx")), unpack_hashes(parsed.get("block"))
+        except ValueError:
+            return True  # malformed inventory, drop it
+        if msg_type == "INV":
+            self.handle_inv(peer, txids, block_hashes)
+        else:
+            self.handle_getdata(peer, txids, block_hashes)
+        return True
+
+    def handle_inv(self, peer, txids, block_hashes):
+        miner = self.miner
+        now = time.monotonic()
+        with self.lock:
+            known = self.known_by(peer)
+            for item in txids + block_hashes:
+                known.add(item)
+            wanted_txs = [txid for txid in txids if self.wanted(txid, now)
+                          and txid not in miner.mempool and not miner.chain_index.has_transaction(txid)]
+            wanted_blocks = [h for h in block_hashes if self.wanted(h, now) and not miner.chain_index.has_block(h)]
+            for item in wanted_txs + wanted_blocks:
+                self.requested[item] = now
+        if wanted_txs:
+            self.send(peer, {"type": "GETDATA", "tx": pack_hashes(wanted_txs)}, "tx_getdata_bytes")
+        if wanted_blocks:
+            self.send(peer, {"type": "GETDATA", "block": pack_hashes(wanted_blocks)}, "block_getdata_bytes")
+
+    def wanted(self, item, now):
+        # Callers hold self.lock
+        if item in self.seen:
+            return False
+        requested_at = self.requested.get(item)
+        return requested_at is None or now - requested_at > GOSSIP_REQUEST_TIMEOUT
+
+    def handle_getdata(self, peer, txids, block_hashes):
+        transactions = []
+        for txid in txids:
+            tx = self.miner.mempool.get(txid)
+            if tx is not None:
+                transactions.append({"sender": tx.sender, "receiver": tx.receiver, "amount": tx.amount,
+                                     "fee": tx.transaction_fees, "nonce": tx.nonce})
+        if transactions:
+            self.send(peer, {"type": "TRANSACTION_BATCH", "transactions": transactions}, "tx_data_bytes")
+        for block_hash in block_hashes:
+            height = self.miner.chain_index.height_of(block_hash)
+            if height is not None:
+                self.send(peer, RawJson(self.miner.blockchain.raw(height)), "block_data_bytes")
+
+    # --- compact blocks ---
+
+    def handle_compact_block(self, peer, parsed):
+        header = parsed["header"]
+        block_hash = header["hash"]
+        short_ids = unpack_short_ids(parsed["short_ids"])
+        with self.lock:
+            self.known_by(peer).add(block_hash)
+            if block_hash in self.seen or block_hash in self.partial:
+                return
+        if self.miner.chain_index.has_block(block_hash):
+            return
+
+        by_short_id = {}
+        for txid, tx in self.miner.mempool.items():
+            key = short_id(txid)
+            # Two pool transactions sharing a short id can't be told apart: ask for it
+            by_short_id[key] = None if key in by_short_id else tx
+        transactions = [by_short_id.get(key) for key in short_ids]
+        missing = [i for i, tx in enumerate(transactions) if tx is None]
+        with self.lock:
+            self.stats["compact_blocks"] += 1
+            self.stats["compact_tx_hits"] += len(transactions) - len(missing)
+            self.stats["compact_tx_missing"] += len(missing)
+            if not missing:
+                self.stats["compact_complete"] += 1
+            else:
+                self.partial[block_hash] = (header, transactions)
+                self.requested[block_hash] = time.monotonic()
+        if missing:
+            self.send(peer, {"type": "GETBLOCKTXN", "block": block_hash, "indexes": missing},
+                      "block_getblocktxn_bytes")
+        else:
+            self.complete_block(peer, header, transactions)
+
+    def handle_getblocktxn(self, peer, parsed):
+        block = self.miner.get_block(block_hash=parsed["block"])
+        if block is None:
+            return
+        transactions = [block.transactions[i].tx_to_dict() for i in parsed["indexes"]]
+        self.send(peer, {"type": "BLOCKTXN", "block": block.hash, "transactions": transactions},
+                  "block_txn_bytes")
+
+    def handle_blocktxn(self, peer, parsed):
+        with self.lock:
+            pending = self.partial.pop(parsed["block"], None)
+        if pending is None:
+            return
+        header, transactions = pending
+        gaps = [i for i, tx in enumerate(transactions) if tx is None]
+        supplied = parsed["transactions"]
+        if len(supplied) != len(gaps):
+            self.fetch_block(peer, header["hash"])
+            return
+        for i, tx_dict in zip(gaps, supplied):
+            transactions[i] = Transaction.from_dict(tx_dict)
+        self.complete_block(peer, header, transactions)
+
+    def complete_block(self, peer, header, transactions):
+        block = Block(transactions, header["previous_hash"])
+        block.merkle_root = header["merkle_root"]
+        if not block.merkle_valid():
+            # A short id matched the wrong transaction
+            self.fetch_block(peer, header["hash"])
+            return
+        block.timestamp = header["timestamp"]
+        block.nonce = header["nonce"]
+        block.hash = header["hash"]
+        self.received([block.hash])
+        self.miner.add_block(block, source=peer)
+
+    def fetch_block(self, peer, block_hash):
+        """Give up on rebuilding a compact block and ask for the full one."""
+        with self.lock:
+            self.stats["compact_fallbacks"] += 1
+            self.requested[block_hash] = time.monotonic()
+        self.send(peer, {"type": "GETDATA", "block": pack_hashes([block_hash])}, "block_getdata_bytes")
+
+    def received(self, items):
+        """Transactions or blocks arrived (from any source): don't fetch them again."""
+        with self.lock:
+            for item in items:
+                self.seen.add(item)
+                self.requested.pop(item, None)
+
+    def expire_requests(self):
+        # Callers hold self.lock
+        cutoff = time.monotonic() - GOSSIP_REQUEST_TIMEOUT
+        for item in [item for item, at in self.requested.items() if at < cutoff]:
+            del self.requested[item]
+            self.partial.pop(item, None)
+
+    def forget_peer(self, peer):
+        with self.lock:
+            self.queued.pop(peer, None)
+            if not any(node_of(other) == node_of(peer) for other in self.miner.miner_connections if other is not peer):
+                self.known.pop(node_of(peer), None)
+
+    # --- helpers ---
+
+    def known_by(self, peer):
+        # Callers hold self.lock
+        node = node_of(peer)
+        known = self.known.get(node)
+        if known is None:
+            known = self.known[node] = SeenCache(GOSSIP_KNOWN_PER_PEER)
+        return known
+
+    def send(self, peer, message, counter):
+        # Transaction gossip is what a slow peer can miss: it is fetched again or arrives in a block
+        priority = PRIORITY_LOW if counter.startswith("tx_") else PRIORITY_HIGH
+        try:
+            data = peer.protocol.pack(message)
+            if not peer.sendall(data, priority):
+                return
+        except OSError:
+            return
+        with self.lock:
+            self.stats[counter] += len(data)
+
+    def get_stats(self):
+        with self.lock:
+            stats = dict(self.stats)
+        tx_bytes = stats["tx_inv_bytes"] + stats["tx_getdata_bytes"] + stats["tx_data_bytes"]
+        stats["tx_bytes_sent"] = tx_bytes
+        stats["bytes_per_transaction"] = tx_bytes / stats["transactions"] if stats["transactions"] else 0.0
+        stats["seen"] = len(self.seen)
+        compact_txs = stats["compact_tx_hits"] + stats["compact_tx_missing"]
+        stats["compact_hit_rate"] = stats["compact_tx_hits"] / compact_txs if compact_txs else 0.0
+        return stats
@@ -0,0 +1,195 @@
+import threading
+from array import array
+from bisect import bisect_left
+
+try:
+    import numpy as np
+except ImportError:  # optional: queries fall back to plain Python loops
+    np = None
+
+QUERIES = ("balances", "top_senders", "block_fees", "volume")
+COLUMNS = ("senders", "receivers", "amounts", "fees", "heights", "block_rows")
+
+
+class Ledger:
+    """
+    The confirmed chain mirrored as columns, one row per transaction, for
+    reporting queries over every wallet at once.
+
+    Wallet names are interned to integer ids; sender, receiver, amount, fee
+    and block height are appended to typed arrays as blocks are added, and
+    block_rows maps each height to its first row so a height range is a row
+    slice; wallet_rows lists the rows each wallet appears in, for its
+    history. With NumPy installed the queries run vectorized over zero-copy
+    views of the columns; without it the same queries loop in Python.
+    """
+
+    def __init__(self):
+        self.wallet_ids = {}  # wallet name -> id
+        self.wallets = []     # id -> wallet name
+        self.wallet_rows = []  # id -> rows (ascending) the wallet sent or received in
+        self.senders = array("i")
+        self.receivers = array("i")
+        self.amounts = array("d")
+        self.fees = array("d")
+        self.heights = array("i")
+        self.block_rows = array("q", [0])  # height -> first row; one extra entry past the tip
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.block_rows) - 1
+
+    @property
+    def backend(self):
+        return "numpy" if np is not None else "python"
+
+    def wallet_id(self, wallet):
+        # Callers hold self.lock
+        wallet_id = self.wallet_ids.get(wallet)
+        if wallet_id is None:
+            wallet_id = self.wallet_ids[wallet] = len(self.wallets)
+            self.wallets.append(wallet)
+            self.wallet_rows.append(array("q"))
+        return wallet_id
+
+    def add_block(self, height, transactions):
+        """Append a block's transactions; blocks must arrive in height order."""
+        self.append_rows(height, self.block_rows_for(transactions))
+
+    def block_rows_for(self, transactions):
+        """
+        A block's rows as typed arrays, built without touching the columns, so
+        a bad transaction raises here and leaves the ledger as it was.
+        """
+        with self.lock:
+            return (array("i", [self.wallet_id(tx.sender) for tx in transactions]),
+                    array("i", [self.wallet_id(tx.receiver) for tx in transactions]),
+                    array("d", [tx.amount for tx in transactions]),
+                    array("d", [tx.transaction_fees for tx in transactions]))
+
+    def append_rows(self, height, rows):
+        """Extend every column with rows from block_rows_for()."""
+        senders, receivers, amounts, fees = rows
+        with self.lock:
+            if height != len(self):
+                raise ValueError(f"ledger is at height {len(self)}, cannot add block {height}")
+            first_row = len(self.amounts)
+            self.senders.extend(senders)
+            self.receivers.extend(receivers)
+            self.amounts.extend(amounts)
+            self.fees.extend(fees)
+            self.heights.extend(array("i", [height]) * len(amounts))
+            self.block_rows.append(len(self.amounts))
+            for row, (sender, receiver) in enumerate(zip(senders, receivers), first_row):
+                self.wallet_rows[sender].append(row)
+                if receiver != sender:
+                    self.wallet_rows[receiver].append(row)
+
+    def snapshot(self):
+        with self.lock:
+            return {"wallets": list(self.wallets),
+                    "wallet_rows": [rows.tobytes() for rows in self.wallet_rows],
+                    "columns": {name: getattr(self, name).tobytes() for name in COLUMNS}}
+
+    def restore(self, state):
+        with self.lock:
+            self.wallets = state["wallets"]
+            self.wallet_ids = {wallet: i for i, wallet in enumerate(self.wallets)}
+            self.wallet_rows = [array("q", rows) for rows in state["wallet_rows"]]
+            for name in COLUMNS:
+                column = getattr(self, name)
+                del column[:]
+                column.frombytes(state["columns"][name])
+
+    def wallet_locations(self, wallet, from_height=0):
+        """(height, position in block) of each confirmed transaction from or to wallet, from from_height on."""
+        with self.lock:
+            wallet_id = self.wallet_ids.get(wallet)
+            if wallet_id is None or from_height >= len(self):
+                return []
+            rows = self.wallet_rows[wallet_id]
+            locations = []
+            for row in rows[bisect_left(rows, self.block_rows[max(0, from_height)]):]:
+                height = self.heights[row]
+                locations.append((height, row - self.block_rows[height]))
+            return locations
+
+    def query(self, queries=QUERIES, from_height=0, to_height=None, limit=10):
+        """
+        Run the named queries over blocks from_height..to_height (inclusive,
+        default the tip). Returns (from_height, to_height, {query: result}).
+        """
+        unknown = [name for name in queries if name not in QUERIES]
+        if unknown:
+            raise ValueError(f"unknown ledger queries {unknown}, expected some of {list(QUERIES)}")
+        if limit < 0:
+            raise ValueError("limit must not be negative")
+        with self.lock:
+            tip = len(self) - 1
+            from_height = max(0, from_height)
+            to_height = tip if to_height is None else min(to_height, tip)
+            if from_height > to_height:
+                lo = hi = 0
+            else:
+                lo, hi = self.block_rows[from_height], self.block_rows[to_height + 1]
+            run = self.query_numpy if np is not None else self.query_python
+            results = run(queries, lo, hi, from_height, max(0, to_height - from_height + 1), limit)
+        return from_height, to_height, results
+
+    def query_numpy(self, queries, lo, hi, first_height, block_count, limit):
+        # Views share memory with the arrays and are dropped before the lock is released
+        n = len(self.wallets)
+        senders = np.frombuffer(self.senders, dtype=np.int32)[lo:hi]
+        receivers = np.frombuffer(self.receivers, dtype=np.int32)[lo:hi]
+        amounts = np.frombuffer(self.amounts, dtype=np.float64)[lo:hi]
+        results = {}
+        if "balances" in queries:
+            net = (np.bincount(receivers, weights=amounts, minlength=n)
+                   - np.bincount(senders, weights=amounts, minlength=n))
+            active = np.union1d(senders, receivers)
+            results["balances"] = dict(zip((self.wallets[i] for i in active.tolist()), net[active].tolist()))
+        if "top_senders" in queries:
+            sent = np.bincount(senders, weights=amounts, minlength=n)
+            counts = np.bincount(senders, minlength=n)
+            k = min(limit, int(np.count_nonzero(counts)))
+            top = np.argpartition(-sent, k - 1)[:k] if k else np.empty(0, dtype=np.intp)
+            top = top[np.argsort(-sent[top], kind="stable")]
+            results["top_senders"] = [{"wallet": self.wallets[i], "sent": float(sent[i]),
+                                       "transactions": int(counts[i])} for i in top.tolist()]
+        if "block_fees" in queries or "volume" in queries:
+            fees = np.frombuffer(self.fees, dtype=np.float64)[lo:hi]
+            if "block_fees" in queries:
+                heights = np.frombuffer(self.heights, dtype=np.int32)[lo:hi]
+                per_block = np.bincount(heights - first_height, weights=fees, minlength=block_count)
+                results["block_fees"] = {"total": float(fees.sum()), "per_block": per_block.tolist()}
+            if "volume" in queries:
+                results["volume"] = {"transactions": hi - lo, "amount": float(amounts.sum()),
+                                     "fees": float(fees.sum())}
+        return results
+
+    def query_python(self, queries, lo, hi, first_height, block_count, limit):
+        senders, receivers = self.senders[lo:hi], self.receivers[lo:hi]
+        amounts, fees = self.amounts[lo:hi], self.fees[lo:hi]
+        results = {}
+        if "balances" in queries:
+            net = {}
+            for sender, receiver, amount in zip(senders, receivers, amounts):
+                net[sender] = net.get(sender, 0.0) - amount
+                net[receiver] = net.get(receiver, 0.0) + amount
+            results["balances"] = {self.wallets[i]: net[i] for i in sorted(net)}
+        if "top_senders" in queries:
+            sent, counts = {}, {}
+            for sender, amount in zip(senders, amounts):
+                sent[sender] = sent.get(sender, 0.0) + amount
+                counts[sender] = counts.get(sender, 0) + 1
+            top = sorted(sent, key=lambda i: -sent[i])[:limit]
+            results["top_senders"] = [{"wallet": self.wallets[i], "sent": sent[i], "transactions": counts[i]}
+                                      for i in top]
+        if "block_fees" in queries:
+            per_block = [0.0] * block_count
+            for height, fee in zip(self.heights[lo:hi], fees):
+                per_block[height - first_height] += fee
+            results["block_fees"] = {"total": float(sum(fees)), "per_block": per_block}
+        if "volume" in queries:
+            results["volume"] = {"transactions": hi - lo, "amount": float(sum(amounts)), "fees": float(sum(fees))}
+        return results
@@ -0,0 +1,120 @@
+import time
+
+from models.block import header_hash, verify_merkle_proof
+from models.transaction import Transaction
+from utils.constants import MINING_DIFFICULTY, SYNC_HEADERS_PER_REQUEST, MEMPOOL_TX_TTL
+
+
+class LightClient:
+    """
+    Headers-only view of the chain for one wallet.
+
+    Headers are checked as they stream in (each links to the previous one,
+    hashes to its hash and meets MINING_DIFFICULTY) and then dropped: only
+    the tip hash and height are kept, plus the Merkle roots of the blocks
+    holding this wallet's transactions until their proofs are checked. The
+    wallet's transactions come from a miner with Merkle proofs, so a miner
+    can leave transactions out but cannot make up ones that aren't on the
+    chain it served headers for.
+    """
+
+    def __init__(self, owner):
+        self.owner = owner
+        self.height = 0  # headers verified so far
+        self.tip_hash = "0" * 64
+        self.confirmed = {}  # txid -> height of the wallet's verified transactions
+        self.net = 0  # amount received minus sent over the verified transactions
+        self.pending = {}  # txid -> (amount, sent at) of sends not yet seen on chain
+        self.stats = {"headers": 0, "proofs": 0, "rejected": 0}
+
+    def sync(self, request):
+        """
+        Bring headers and the wallet's transactions up to the tip; request
+        sends one message to the miner this sync is pinned to and returns its
+        reply or None. Returns False if a reply was missing or a header or
+        proof failed to verify.
+        """
+        entries, tip_height = self.fetch_proofs(request)
+        if entries is None:
+            return False
+        roots = {entry["height"]: None for entry in entries}  # height -> (merkle root, previous hash)
+        verified = self.fetch_headers(request, tip_height, roots)
+        # Heights below self.height were verified even if a later header was not
+        for entry in entries:
+            height = entry["height"]
+            if height >= self.height:
+                break  # entries come in height order
+            merkle_root, previous_hash = roots[height]
+            if not self.apply(entry, merkle_root):
+                # Rewind so the next sync fetches this height's transactions again
+                self.height, self.tip_hash = height, previous_hash
+                return False
+        return verified
+
+    def fetch_proofs(self, request):
+        """The wallet's transactions with proofs from self.height on, and the tip they cover."""
+        entries, height = [], self.height
+        while True:
+            reply = request({"type": "GET_WALLET_PROOFS", "wallet": self.owner, "from_height": height})
+            if reply is None or reply.get("status") != "success" or reply.get("from_height") != height:
+                return None, None
+            entries += reply.get("transactions", [])
+            height = reply["next_height"]
+            if height > reply["tip_height"]:
+                return entries, reply["tip_height"]
+
+    def fetch_headers(self, request, tip_height, roots):
+        """Verify headers up to tip_height, keeping the Merkle roots of the heights in roots."""
+        target = "0" * MINING_DIFFICULTY
+        while self.height <= tip_height:
+            count = min(SYNC_HEADERS_PER_REQUEST, tip_height - self.height + 1)
+            reply = request({"type": "GET_HEADERS", "from_height": self.height, "count": count})
+            if reply is None or reply.get("from_height") != self.height or not reply.get("headers"):
+                break  # this miner is behind: keep what was verified
+            for header in reply["headers"]:
+                if (header["previous_hash"] != self.tip_hash or not header["hash"].startswith(target)
+                        or header_hash(header) != header["hash"]):
+                    print(f"[WALLET ERROR] Invalid header at height {self.height}")
+                    self.stats["rejected"] += 1
+                    return False
+                if self.height in roots:
+                    roots[self.height] = (header["merkle_root"], header["previous_hash"])
+                self.tip_hash = header["hash"]
+                self.height += 1
+                self.stats["headers"] += 1
+        return True
+
+    def apply(self, entry, merkle_root):
+        """Count a transaction whose proof checks against merkle_root; returns False if the proof fails."""
+        tx = Transaction.from_dict(entry["transaction"])
+        if self.owner not in (tx.sender, tx.receiver) or tx.txid in self.confirmed:
+            return True
+        if not verify_merkle_proof(tx.txid, entry["position"], entry["proof"], merkle_root):
+            print(f"[WALLET ERROR] Invalid Merkle proof for {tx.txid[:16]}... at height {entry['height']}")
+            self.stats["rejected"] += 1
+            return False
+        self.confirmed[tx.txid] = entry["height"]
+        self.pending.pop(tx.txid, None)
+        if tx.receiver == self.owner:
+            self.net += tx.amount
+        if tx.sender == self.owner:
+            self.net -= tx.amount
+        self.stats["proofs"] += 1
+        return True
+
+    def sent(self, tx_dict):
+        """Note a send the miner accepted, so it counts against the balance until it is confirmed."""
+        tx = Transaction(tx_dict["sender"], tx_dict["receiver"], tx_dict.get("fee", 0), tx_dict["amount"],
+                         tx_dict.get("nonce"))
+        if tx.txid not in self.confirmed:
+            self.pending[tx.txid] = (tx.amount, time.time())
+        return tx.txid
+
+    def unconfirmed_sends(self):
+        """Amount of pending sends, leaving out those old enough to have expired from the mempool."""
+        cutoff = time.time() - MEMPOOL_TX_TTL
+        self.pending = {txid: sent for txid, sent in self.pending.items() if sent[1] >= cutoff}
+        return sum(amount for amount, _ in self.pending.values())
+
+    def is_confirmed(self, txid):
+        return txid in self.confirmed
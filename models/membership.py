@@ -0,0 +1,133 @@
+import socket
+import threading
+import time
+
+from utils.constants import MEMBERSHIP_RETRY, HEARTBEAT_INTERVAL
+from utils.framing import FramedSocket
+
+
+class Membership:
+    """
+    Live view of the registered miners, kept current over one long-lived
+    SUBSCRIBE connection to the bootstrap node.
+
+    The bootstrap answers with a full MINERS snapshot and then pushes a
+    MINERS_DELTA with the joined and left miners on every change. Each
+    message carries the membership version; a gap in versions, or a dropped
+    connection, leads to a fresh subscription and snapshot. Miners subscribe
+    with their own address, which registers them, and send a HEARTBEAT with
+    their load every HEARTBEAT_INTERVAL over the same connection; the
+    bootstrap drops miners whose heartbeats stop.
+    """
+
+    def __init__(self, bootstrap, role, on_change=None, address=None, load=None):
+        self.bootstrap = bootstrap  # (ip, port)
+        self.role = role
+        self.on_change = on_change  # called with (joined, left) lists of miner dicts
+        self.address = address  # our (ip, port) when subscribing as a miner
+        self.load = load  # returns the load dict sent with each heartbeat
+        self.latency_ms = None  # round trip of the last acknowledged heartbeat
+        self.heartbeats = {}  # seq -> monotonic send time, awaiting HEARTBEAT_ACK
+        self.seq = 0
+        self.send_lock = threading.Lock()
+        self.subscribed = False
+        self.miners = {}  # (ip, port) -> {"ip": ip, "port": port}
+        self.version = None
+        self.conn = None
+        self.running = False
+        self.lock = threading.Lock()
+        self.synced = threading.Event()  # set once the first snapshot arrived
+
+    def start(self):
+        self.running = True
+        threading.Thread(target=self.run, daemon=True).start()
+        if self.address is not None:
+            threading.Thread(target=self.send_heartbeats, daemon=True).start()
+
+    def stop(self):
+        self.running = False
+        if self.conn is not None:
+            try:
+                self.conn.sock.shutdown(socket.SHUT_RDWR)  # wakes the reader thread, unlike close()
+            except OSError:
+                pass
+            self.conn.close()
+
+    def list(self):
+        with self.lock:
+            return list(self.miners.values())
+
+    def run(self):
+        while self.running:
+            try:
+                self.subscribe()
+                while self.running:
+                    self.apply(self.conn.recv())
+            except (OSError, ValueError) as e:
+                if self.running:
+                    print(f"[{self.role}] Bootstrap subscription lost ({e}), resubscribing")
+            finally:
+                with self.send_lock:
+                    self.subscribed = False
+                if self.conn is not None:
+                    self.conn.close()
+            if self.running:
+                time.sleep(MEMBERSHIP_RETRY)
+
+    def subscribe(self):
+        self.conn = FramedSocket.connect(self.bootstrap, self.role, timeout=5)
+        self.conn.settimeout(None)  # pushes arrive whenever membership changes
+        request = {"type": "SUBSCRIBE"}
+        if self.address is not None:
+            request["ip"], request["port"] = self.address
+        with self.send_lock:
+            self.conn.send(request)
+            self.subscribed = True
+
+    def send_heartbeats(self):
+        while self.running:
+            time.sleep(HEARTBEAT_INTERVAL)
+            with self.send_lock:
+                if not self.subscribed:
+                    continue
+                self.seq += 1
+                now = time.monotonic()
+                self.heartbeats = {seq: at for seq, at in self.heartbeats.items() if now - at < HEARTBEAT_INTERVAL * 3}
+                self.heartbeats[self.seq] = now
+                try:
+                    self.conn.send({"type": "HEARTBEAT", "ip": self.address[0], "port": self.address[1],
+                                    "seq": self.seq, "load": self.load() if self.load else {},
+                                    "latency_ms": self.latency_ms})
+                except OSError:
+                    pass  # the reader notices the broken connection and resubscribes
+
+    def apply(self, message):
+        msg_type = message.get("type")
+        if msg_type == "HEARTBEAT_ACK":
+            with self.send_lock:
+                sent_at = self.heartbeats.pop(message.get("seq"), None)
+            if sent_at is not None:
+                self.latency_ms = round((time.monotonic() - sent_at) * 1000, 3)
+            return
+        if msg_type == "MINERS":
+            miners = {(m["ip"], m["port"]): m for m in message["miners"]}
+            with self.lock:
+                joined = [m for key, m in miners.items() if key not in self.miners]
+                left = [m for key, m in self.miners.items() if key not in miners]
+                self.miners, self.version = miners, message["version"]
+        elif msg_type == "MINERS_DELTA":
+            with self.lock:
+                if self.version is None or message["version"] != self.version + 1:
+                    raise ValueError(f"membership version gap: have {self.version}, got {message['version']}")
+                joined = [m for m in message["joined"] if (m["ip"], m["port"]) not in self.miners]
+                left = [m for m in message["left"] if (m["ip"], m["port"]) in self.miners]
+                for m in joined:
+                    self.miners[(m["ip"], m["port"])] = m
+                for m in left:
+                    del self.miners[(m["ip"], m["port"])]
+                self.version = message["version"]
+        else:
+            return
+        self.synced.set()
+        if (joined or left) and self.on_change is not None:
+            self.on_change(joined, left)
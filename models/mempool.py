@@ -0,0 +1,242 @@
+import heapq
+import itertools
+import threading
+import time
+
+from utils.constants import MEMPOOL_MAX_TX, MEMPOOL_MAX_BYTES, MEMPOOL_TX_TTL
+
+ADMITTED = "admitted"
+DUPLICATE = "duplicate"
+REJECTED_LOW_FEE = "rejected_low_fee"
+
+TX_OVERHEAD_BYTES = 400  # rough per-transaction cost of the object, entry and heap items
+
+
+def tx_size(tx):
+    return TX_OVERHEAD_BYTES + len(str(tx.sender)) + len(str(tx.receiver))
+
+
+class Mempool:
+    """
+    Pending transactions, ordered by fee.
+
+    Transactions live in a heap of (-fee, arrival, txid) entries with lazy
+    deletion, so admission is a heappush and removal by txid is a dict pop;
+    eviction (lowest fee) and expiry (oldest) use two more such heaps.
+    Transactions handed out for mining stay "in flight" until they are
+    confirmed or released, which keeps relayed copies from being re-admitted
+    while a block is being mined. Pending balances are kept by the
+    AccountState it is given, which also counts in-flight transactions.
+
+    The pool is capped by transaction count and approximate bytes. When full,
+    the lowest-fee transactions are evicted for a better-paying newcomer, a
+    newcomer that does not beat the current minimum fee is rejected, and
+    transactions pending longer than ttl seconds are dropped.
+    """
+
+    def __init__(self, max_count=MEMPOOL_MAX_TX, max_bytes=MEMPOOL_MAX_BYTES, ttl=MEMPOOL_TX_TTL, accounts=None):
+        self.accounts = accounts  # AccountState told about every add and final removal
+        self.max_count = max_count
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.heap = []        # (-fee, arrival, txid): best first, for mining
+        self.evict_heap = []  # (fee, -arrival, txid): worst first, for eviction
+        self.expiry_heap = []  # (added_at, arrival, txid): oldest first, for the TTL
+        self.entries = {}    # txid -> (arrival, tx, size, added_at), waiting to be mined
+        self.in_flight = {}  # txid -> tx, selected for a block being mined
+        self.arrivals = itertools.count()
+        self.bytes = 0
+        self.stats = {"evicted": 0, "rejected_low_fee": 0, "expired": 0}
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, txid):
+        return txid in self.entries or txid in self.in_flight
+
+    def get(self, txid):
+        """The pending or in-flight transaction with this txid, or None."""
+        with self.lock:
+            entry = self.entries.get(txid) or self.in_flight.get(txid)
+            return entry[1] if entry is not None else None
+
+    def __iter__(self):
+        with self.lock:
+            return iter([entry[1] for entry in self.entries.values()])
+
+    def add(self, tx, txid=None):
+        """Admit a transaction; returns ADMITTED, DUPLICATE or REJECTED_LOW_FEE."""
+        txid = txid or tx.txid
+        size = tx_size(tx)
+        with self.lock:
+            self.expire()
+            return self.admit(tx, txid, size)
+
+    def add_many(self, transactions):
+        """Admit (tx, txid) pairs under one lock acquisition; returns their statuses in order."""
+        sized = [(tx, txid, tx_size(tx)) for tx, txid in transactions]
+        with self.lock:
+            self.expire()
+            return [self.admit(tx, txid, size) for tx, txid, size in sized]
+
+    def admit(self, tx, txid, size):
+        # Callers hold self.lock
+        if txid in self.entries or txid in self.in_flight:
+            return DUPLICATE
+        if not self.make_room(tx.transaction_fees, size):
+            self.stats["rejected_low_fee"] += 1
+            return REJECTED_LOW_FEE
+        self.insert(txid, tx, size, time.monotonic())
+        if self.accounts is not None:
+            self.accounts.add_pending(tx)
+        return ADMITTED
+
+    def insert(self, txid, tx, size, added_at):
+        arrival = next(self.arrivals)
+        self.entries[txid] = (arrival, tx, size, added_at)
+        self.bytes += size
+        heapq.heappush(self.heap, (-tx.transaction_fees, arrival, txid))
+        heapq.heappush(self.evict_heap, (tx.transaction_fees, -arrival, txid))
+        heapq.heappush(self.expiry_heap, (added_at, arrival, txid))
+
+    def min_fee(self):
+        """Lowest fee currently pending, or None if the pool is empty."""
+        with self.lock:
+            while self.evict_heap:
+                fee, neg_arrival, txid = self.evict_heap[0]
+                entry = self.entries.get(txid)
+                if entry is not None and entry[0] == -neg_arrival:
+                    return fee
+                heapq.heappop(self.evict_heap)
+            return None
+
+    def make_room(self, fee, size):
+        """Evict lower-fee transactions until size fits; False if fee does not qualify."""
+        if size > self.max_bytes:
+            return False
+        victims = []
+        count, total = len(self.entries), self.bytes
+        while count >= self.max_count or total + size > self.max_bytes:
+            if not self.evict_heap:
+                break
+            item = heapq.heappop(self.evict_heap)
+            entry = self.entries.get(item[2])
+            if entry is None or entry[0] != -item[1]:
+                continue  # stale heap entry
+            if item[0] >= fee:
+                heapq.heappush(self.evict_heap, item)
+                break
+            victims.append(item)
+            count -= 1
+            total -= entry[2]
+        if count >= self.max_count or total + size > self.max_bytes:
+            # Not worth evicting for: put the candidates back untouched
+            for item in victims:
+                heapq.heappush(self.evict_heap, item)
+            return False
+        for item in victims:
+            self.remove(item[2])
+            self.stats["evicted"] += 1
+        return True
+
+    def expire(self):
+        """Drop transactions pending longer than ttl, released ones included."""
+        if self.ttl is None:
+            return
+        cutoff = time.monotonic() - self.ttl
+        while self.expiry_heap and self.expiry_heap[0][0] <= cutoff:
+            _, arrival, txid = heapq.heappop(self.expiry_heap)
+            entry = self.entries.get(txid)
+            if entry is None or entry[0] != arrival:
+                continue  # stale heap entry
+            self.remove(txid)
+            self.stats["expired"] += 1
+
+    def remove(self, txid):
+        """Drop a transaction (pending or in flight) by txid; returns it or None."""
+        with self.lock:
+            entry = self.entries.pop(txid, None)
+            if entry is not None:
+                tx = entry[1]
+                self.bytes -= entry[2]
+            else:
+                entry = self.in_flight.pop(txid, None)
+                if entry is None:
+                    return None
+                tx = entry[1]
+            if self.accounts is not None:
+                self.accounts.remove_pending(tx)
+            self.compact()
+            return tx
+
+    def confirm(self, transactions):
+        """Forget transactions that made it into a block."""
+        with self.lock:
+            for tx in transactions:
+                self.remove(tx.txid)
+
+    def pop_best(self, count):
+        """Move up to count highest-fee transactions in flight and return them."""
+        selected = []
+        with self.lock:
+            self.expire()
+            while self.heap and len(selected) < count:
+                _, arrival, txid = heapq.heappop(self.heap)
+                entry = self.entries.get(txid)
+                if entry is None or entry[0] != arrival:
+                    continue  # stale heap entry
+                del self.entries[txid]
+                self.bytes -= entry[2]
+                self.in_flight[txid] = entry
+                selected.append(entry[1])
+            self.compact()
+        return selected
+
+    def release(self, transactions):
+        """Return in-flight transactions from an abandoned block to the pool."""
+        with self.lock:
+            for tx in transactions:
+                entry = self.in_flight.pop(tx.txid, None)
+                if entry is None:
+                    continue  # confirmed meanwhile
+                _, tx, size, added_at = entry
+                self.insert(tx.txid, tx, size, added_at)
+
+    def top(self, count):
+        """Highest-fee pending transactions, without removing them."""
+        with self.lock:
+            best = heapq.nsmallest(count, (item for item in self.heap
+                                           if self.entries.get(item[2], (None,))[0] == item[1]))
+            return [self.entries[txid][1] for _, _, txid in best]
+
+    def get_stats(self):
+        with self.lock:
+            self.expire()
+            return dict(self.stats, size=len(self.entries), in_flight=len(self.in_flight), bytes=self.bytes,
+                        max_count=self.max_count, max_bytes=self.max_bytes, min_fee=self.min_fee())
+
+    def all_transactions(self):
+        """Pending and in-flight transactions."""
+        with self.lock:
+            return [entry[1] for entry in self.entries.values()] + [entry[1] for entry in self.in_flight.values()]
+
+    def items(self):
+        """(txid, tx) for pending and in-flight transactions."""
+        with self.lock:
+            return ([(txid, entry[1]) for txid, entry in self.entries.items()]
+                    + [(txid, entry[1]) for txid, entry in self.in_flight.items()])
+
+    def compact(self):
+        # Rebuild once stale entries dominate, so the heap stays O(pending)
+        if not self.entries:
+            self.heap = []
+            self.evict_heap = []
+            self.expiry_heap = []
+        elif max(len(self.heap), len(self.expiry_heap)) > 2 * len(self.entries) + 64:
+            self.heap = [(-e[1].transaction_fees, e[0], txid) for txid, e in self.entries.items()]
+            self.evict_heap = [(e[1].transaction_fees, -e[0], txid) for txid, e in self.entries.items()]
+            self.expiry_heap = [(e[3], e[0], txid) for txid, e in self.entries.items()]
+            heapq.heapify(self.heap)
+            heapq.heapify(self.evict_heap)
+            heapq.heapify(self.expiry_heap)
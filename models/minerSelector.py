@@ -0,0 +1,109 @@
+import math
+import random
+import threading
+import time
+
+from utils.constants import SELECTOR_EWMA_ALPHA, SELECTOR_BACKOFF, SELECTOR_MAX_BACKOFF, SELECTOR_STATS_TTL
+
+
+class MinerStats:
+    def __init__(self):
+        self.rtt = None  # EWMA of request round trips, seconds
+        self.error_rate = 0.0  # EWMA of failed requests
+        self.in_flight = 0
+        self.failures = 0  # consecutive
+        self.down_until = 0.0
+        self.last_sample = 0.0
+
+
+class MinerSelector:
+    """
+    Picks the miner for each wallet request by power of two choices: two
+    random candidates are compared and the one with the lower expected cost
+    wins. Cost is the EWMA round trip scaled by requests already in flight
+    and by the EWMA error rate. A miner that fails is skipped for a backoff
+    that doubles with each consecutive failure; a miner not sampled for
+    SELECTOR_STATS_TTL seconds counts as unmeasured again, so one that
+    recovered gets probed.
+    """
+
+    def __init__(self, alpha=SELECTOR_EWMA_ALPHA):
+        self.alpha = alpha
+        self.stats = {}  # (ip, port) -> MinerStats
+        self.lock = threading.Lock()
+
+    def choose(self, miners, exclude=()):
+        """A miner dict from miners, never one in exclude; None if there is none."""
+        excluded = {(m["ip"], m["port"]) for m in exclude}
+        candidates = [m for m in miners if (m["ip"], m["port"]) not in excluded]
+        if not candidates:
+            return None
+        now = time.monotonic()
+        with self.lock:
+            up = [m for m in candidates if self.stats_for(m).down_until <= now]
+            pool = up or candidates  # everything is down: still try the least bad
+            if len(pool) == 1:
+                return pool[0]
+            first, second = random.sample(pool, 2)
+            return first if self.cost(first, now) <= self.cost(second, now) else second
+
+    def cost(self, miner, now):
+        # Callers hold self.lock
+        stats = self.stats_for(miner)
+        if stats.rtt is None or now - stats.last_sample > SELECTOR_STATS_TTL:
+            rtt = 0.0  # unmeasured: worth a try
+        else:
+            rtt = stats.rtt
+        if stats.down_until > now:
+            return math.inf
+        return (rtt + 1e-4) * (stats.in_flight + 1) / max(1.0 - stats.error_rate, 0.05)
+
+    def begin(self, miner):
+        """Count a request as in flight; returns its start time for succeeded()."""
+        with self.lock:
+            self.stats_for(miner).in_flight += 1
+        return time.monotonic()
+
+    def succeeded(self, miner, started):
+        now = time.monotonic()
+        with self.lock:
+            stats = self.stats_for(miner)
+            stats.in_flight -= 1
+            rtt = now - started
+            stale = stats.rtt is None or now - stats.last_sample > SELECTOR_STATS_TTL
+            stats.rtt = rtt if stale else stats.rtt + self.alpha * (rtt - stats.rtt)
+            stats.error_rate *= 1 - self.alpha
+            stats.failures = 0
+            stats.down_until = 0.0
+            stats.last_sample = now
+
+    def failed(self, miner):
+        now = time.monotonic()
+        with self.lock:
+            stats = self.stats_for(miner)
+            stats.in_flight -= 1
+            stats.error_rate += self.alpha * (1.0 - stats.error_rate)
+            stats.failures += 1
+            stats.down_until = now + min(SELECTOR_BACKOFF * 2 ** (stats.failures - 1), SELECTOR_MAX_BACKOFF)
+            stats.last_sample = now
+
+    def forget(self, miners):
+        """Drop the stats of miners that left the network."""
+        with self.lock:
+            for m in miners:
+                self.stats.pop((m["ip"], m["port"]), None)
+
+    def stats_for(self, miner):
+        # Callers hold self.lock
+        key = (miner["ip"], miner["port"])
+        stats = self.stats.get(key)
+        if stats is None:
+            stats = self.stats[key] = MinerStats()
+        return stats
+
+    def get_stats(self):
+        with self.lock:
+            return {f"{ip}:{port}": {"rtt_ms": round(s.rtt * 1000, 3) if s.rtt is not None else None,
+                                     "error_rate": round(s.error_rate, 3), "in_flight": s.in_flight,
+                                     "down": s.down_until > time.monotonic()}
+                    for (ip, port), s in self.stats.items()}
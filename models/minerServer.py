@@ -0,0 +1,357 @@
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+from utils.constants import SERVER_BACKLOG, MAX_MESSAGE_BYTES, PEER_QUEUE_MAX_BYTES, PEER_SEND_TIMEOUT
+from utils.framing import LINE_PROTOCOL, accept_codec, handshake_line, negotiate
+
+STREAM_CHUNK = 64 * 1024  # bytes of streamed messages coalesced per write
+WRITE_COALESCE = 64 * 1024  # bytes of queued peer messages coalesced per write
+PRIORITY_LOW = 0  # gossip a slow peer can do without; dropped first
+PRIORITY_HIGH = 1  # blocks and replies to a peer's requests
+OFFLOADED_REQUESTS = {"GET_HEADERS", "GET_BLOCKS", "GET_BLOCKCHAIN", "CHECK_ACCOUNT_STATE", "TRANSACTION_BATCH",
+                      "GET_WALLET_PROOFS"}
+OFFLOADED_BLOCK_MESSAGES = {"CMPCTBLOCK", "BLOCKTXN"}  # validated and appended to disk like full blocks
+
+
+def offloaded_peer_message(parsed):
+    """Heavy requests and incoming blocks (full ones have no type) run in the executor, off the event loop."""
+    msg_type = parsed.get("type")
+    if msg_type is None:
+        return "transactions" in parsed
+    return msg_type in OFFLOADED_REQUESTS or msg_type in OFFLOADED_BLOCK_MESSAGES
+
+
+def pack_chunk(messages, protocol):
+    """Pack streamed messages until STREAM_CHUNK bytes or the end; empty once the stream is done."""
+    chunk = bytearray()
+    for message in messages:
+        chunk += protocol.pack(message)
+        if len(chunk) >= STREAM_CHUNK:
+            break
+    return bytes(chunk)
+
+
+class Peer:
+    """
+    A miner connection living on the event loop, usable from any thread.
+
+    Outgoing messages go into a bounded queue that a writer task on the loop
+    drains, coalescing queued messages into writes of up to WRITE_COALESCE
+    bytes. A peer that stops keeping up first loses low-priority gossip (it is
+    dropped once PEER_QUEUE_MAX_BYTES are queued); if high-priority messages
+    still do not fit, or a write stalls for PEER_SEND_TIMEOUT, it is
+    disconnected.
+    """
+
+    def __init__(self, server, writer, address, protocol, node=None):
+        self.server = server
+        self.writer = writer
+        self.address = address
+        self.protocol = protocol
+        self.node = node  # the remote miner's listening (ip, port), once known
+        self.closed = False
+        self.queue = deque()  # (data, priority)
+        self.queued_bytes = 0
+        self.lock = threading.Lock()
+        self.ready = asyncio.Event()  # only touched on the loop
+        self.signalled = False
+        self.task = None
+        self.stats = {"sent_messages": 0, "sent_bytes": 0, "writes": 0, "max_queued_bytes": 0,
+                      "dropped_messages": 0, "dropped_bytes": 0, "disconnect_reason": None}
+
+    def start(self):
+        """Start the writer task; call on the loop."""
+        self.task = self.server.loop.create_task(self.write_loop())
+
+    def send(self, message, priority=PRIORITY_HIGH):
+        """Encode and frame a message with this peer's negotiated codec."""
+        self.sendall(self.protocol.pack(message), priority)
+
+    def sendall(self, data, priority=PRIORITY_HIGH):
+        """Queue data for the peer without blocking the caller; False if it was dropped."""
+        if self.closed:
+            raise OSError(f"connection to {self.address} is closed")
+        data = bytes(data)
+        with self.lock:
+            if self.queue and self.queued_bytes + len(data) > PEER_QUEUE_MAX_BYTES:
+                if priority == PRIORITY_LOW:
+                    self.count_dropped(len(data))
+                    return False
+                self.drop_low_priority()
+            overflow = bool(self.queue) and self.queued_bytes + len(data) > PEER_QUEUE_MAX_BYTES
+            if not overflow:
+                self.queue.append((data, priority))
+                self.queued_bytes += len(data)
+                self.stats["max_queued_bytes"] = max(self.stats["max_queued_bytes"], self.queued_bytes)
+                wake, self.signalled = not self.signalled, True
+        if overflow:
+            self.disconnect(f"outbound queue over {PEER_QUEUE_MAX_BYTES} bytes")
+            raise OSError(f"peer {self.address} is too slow, disconnected")
+        if wake:
+            self.server.call_soon(self.ready.set)
+        return True
+
+    def count_dropped(self, size):
+        # Callers hold self.lock
+        self.stats["dropped_messages"] += 1
+        self.stats["dropped_bytes"] += size
+
+    def drop_low_priority(self):
+        # Callers hold self.lock
+        kept = deque()
+        for data, priority in self.queue:
+            if priority == PRIORITY_LOW:
+                self.queued_bytes -= len(data)
+                self.count_dropped(len(data))
+            else:
+                kept.append((data, priority))
+        self.queue = kept
+
+    async def write_loop(self):
+        try:
+            while not self.closed:
+                await self.ready.wait()
+                chunk, size = [], 0
+                with self.lock:
+                    while self.queue and size < WRITE_COALESCE:
+                        data, _ = self.queue.popleft()
+                        chunk.append(data)
+                        size += len(data)
+                    self.queued_bytes -= size
+                    if not self.queue:
+                        self.signalled = False
+                        self.ready.clear()
+                if not chunk or self.closed:
+                    continue
+                self.writer.write(b"".join(chunk))
+                self.stats["sent_messages"] += len(chunk)
+                self.stats["sent_bytes"] += size
+                self.stats["writes"] += 1
+                await asyncio.wait_for(self.writer.drain(), PEER_SEND_TIMEOUT)
+        except asyncio.TimeoutError:
+            self.disconnect(f"write stalled for {PEER_SEND_TIMEOUT}s")
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+
+    def disconnect(self, reason):
+        if not self.closed:
+            self.stats["disconnect_reason"] = reason
+            print(f"[MINER {self.server.miner.port}] Disconnecting slow peer {self.node or self.address}: {reason}")
+        self.close()
+        # close() would wait for the unsent bytes to flush; a stalled peer never takes them
+        self.server.call_soon(self.writer.transport.abort)
+
+    def get_stats(self):
+        with self.lock:
+            stats = dict(self.stats, queued_messages=len(self.queue), queued_bytes=self.queued_bytes)
+        node = self.node or self.address
+        stats["peer"] = f"{node[0]}:{node[1]}" if node else None
+        return stats
+
+    def getpeername(self):
+        return self.address
+
+    def shutdown(self, how=None):
+        self.close()
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.server.call_soon(self.ready.set)  # let the writer task exit
+            self.server.call_soon(self.writer.close)
+
+
+class MinerServer:
+    """
+    asyncio front end for a Miner: wallet and peer connections are coroutines
+    on one event loop thread instead of one thread per socket. The MINER/WALLET
+    handshake negotiates the framing (utils/framing.py); the Miner still does
+    the request handling, with the heavier read-only queries run on a thread
+    pool so they never stall the loop. Mining stays on the scheduler thread and
+    the mining processes.
+    """
+
+    def __init__(self, miner):
+        self.miner = miner
+        self.loop = None
+        self.loop_thread = None
+        self.server = None
+        self.executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix=f"miner-{miner.port}")
+        self.ready = threading.Event()
+        self.peers = set()  # every peer connection, inbound and outbound
+
+    def start(self):
+        raise_fd_limit()
+        self.loop = asyncio.new_event_loop()
+        self.loop_thread = threading.Thread(target=self.run_loop, daemon=True)
+        self.loop_thread.start()
+        self.ready.wait()
+
+    def run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.server = self.loop.run_until_complete(asyncio.start_server(
+                self.handle_connection, self.miner.ip, self.miner.port,
+                backlog=SERVER_BACKLOG, limit=MAX_MESSAGE_BYTES
+            ))
+            print(f"[MINER {self.miner.port}] Listening on {self.miner.ip}:{self.miner.port}")
+        except OSError as e:
+            print(f"[MINER ERROR] run_server: {e}")
+            self.ready.set()
+            return
+        self.ready.set()
+        self.loop.run_forever()
+
+    def call_soon(self, callback, *args):
+        if threading.current_thread() is self.loop_thread:
+            callback(*args)
+        else:
+            self.loop.call_soon_threadsafe(callback, *args)
+
+    def stop(self):
+        if self.loop is None or not self.loop.is_running():
+            return
+
+        async def shutdown():
+            if self.server is not None:
+                self.server.close()
+            # Let the peer writer tasks unwind before the loop stops
+            tasks = [peer.task for peer in list(self.peers) if peer.task is not None]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.loop.stop()
+
+        asyncio.run_coroutine_threadsafe(shutdown(), self.loop)
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def peer_stats(self):
+        """Queue depth and traffic counters for every peer connection."""
+        return [peer.get_stats() for peer in list(self.peers)]
+
+    # --- outbound peers ---
+
+    def connect_peer(self, ip, port, timeout=5):
+        """Open a MINER connection to a peer from any thread; returns its Peer."""
+        future = asyncio.run_coroutine_threadsafe(self.open_peer(ip, port), self.loop)
+        return future.result(timeout)
+
+    async def open_peer(self, ip, port):
+        reader, writer = await asyncio.open_connection(ip, port, limit=MAX_MESSAGE_BYTES)
+        writer.write(handshake_line("MINER"))
+        try:
+            protocol = accept_codec(await reader.readline())
+        except ConnectionError:
+            writer.close()
+            raise
+        peer = Peer(self, writer, (ip, port), protocol, node=(ip, port))
+        # Tell the peer who we are, so it can match this connection to the one it dials to us
+        writer.write(protocol.pack({"type": "HELLO", "ip": self.miner.ip, "port": self.miner.port}))
+        self.loop.create_task(self.serve_peer(reader, writer, peer, outbound=True))
+        return peer
+
+    # --- connections ---
+
+    async def handle_connection(self, reader, writer):
+        try:
+            line = await reader.readline()
+            if line.lstrip().startswith(b"{"):
+                # No handshake: a one-off newline-JSON request
+                await self.serve_client(reader, writer, LINE_PROTOCOL, first_payload=line.strip())
+                return
+            role, protocol, reply = negotiate(line)
+            writer.write(reply)
+            if role == "MINER":
+                peer = Peer(self, writer, writer.get_extra_info("peername"), protocol)
+                await self.serve_peer(reader, writer, peer, outbound=False)
+            else:
+                await self.serve_client(reader, writer, protocol)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            print(f"[MINER ERROR] handle_client: {e}")
+        finally:
+            writer.close()
+
+    async def serve_client(self, reader, writer, protocol, first_payload=None):
+        while self.miner.running:
+            payload = first_payload if first_payload is not None else await protocol.read_payload(reader)
+            first_payload = None
+            if payload is None:
+                break
+            if not payload:
+                continue
+            try:
+                request = protocol.decode(payload)
+            except ValueError:
+                continue
+            if request.get("type") in OFFLOADED_REQUESTS:
+                response = await self.loop.run_in_executor(self.executor, self.miner.handle_request, request)
+            else:
+                response = self.miner.handle_request(request)
+            await self.write_response(writer, response, protocol)
+
+    async def write_response(self, writer, response, protocol):
+        if isinstance(response, dict):
+            writer.write(protocol.pack(response))
+            await writer.drain()
+            return
+        # A stream: blocks are read and packed in the executor, a chunk of larger writes at a time
+        messages = iter(response)
+        while True:
+            chunk = await self.loop.run_in_executor(self.executor, pack_chunk, messages, protocol)
+            if not chunk:
+                break
+            writer.write(chunk)
+            await writer.drain()
+
+    async def serve_peer(self, reader, writer, peer, outbound):
+        protocol = peer.protocol
+        self.peers.add(peer)
+        peer.start()
+        try:
+            while self.miner.running:
+                payload = await protocol.read_payload(reader)
+                if payload is None:
+                    break
+                if not payload:
+                    continue
+                try:
+                    parsed = protocol.decode(payload)
+                except ValueError:
+                    continue
+                if parsed.get("type") == "HELLO":
+                    peer.node = (parsed.get("ip"), parsed.get("port"))
+                    continue
+                if offloaded_peer_message(parsed):
+                    await self.loop.run_in_executor(self.executor, self.miner.handle_miner_message, peer, parsed)
+                else:
+                    self.miner.handle_miner_message(peer, parsed)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            print(f"[MINER ERROR] handle_miner: {e}")
+        finally:
+            self.peers.discard(peer)
+            peer.close()
+            writer.close()
+            self.miner.peer_disconnected(peer, outbound)
+
+
+def raise_fd_limit():
+    """Allow as many open sockets as the hard limit permits."""
+    if resource is None:
+        return
+    try:
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft < hard:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    except (ValueError, OSError):
+        pass
@@ -0,0 +1,115 @@
+import hashlib
+import multiprocessing
+import os
+import queue
+import threading
+
+from utils.constants import MINING_DIFFICULTY, MINING_WORKERS
+
+CHECK_INTERVAL = 4096  # nonces tried between cancellation checks
+# Workers must not be forked from the miner, whose threads may hold locks at fork time
+START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+
+def search_nonces(prefix, suffix, target, start, step, job_id, current_job, results):
+    """Try nonces start, start + step, ... until a match is found or the job changes."""
+    midstate = hashlib.sha256(prefix)
+    nonce = start
+    while True:
+        for _ in range(CHECK_INTERVAL):
+            h = midstate.copy()
+            h.update(str(nonce).encode())
+            h.update(suffix)
+            digest = h.hexdigest()
+            if digest.startswith(target):
+                results.put((job_id, nonce, digest))
+                return
+            nonce += step
+        if current_job.value != job_id:
+            return
+
+
+def worker_loop(tasks, current_job, results):
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+        search_nonces(*task, current_job, results)
+
+
+class MiningEngine:
+    """
+    Proof-of-work search spread over a pool of worker processes.
+
+    Worker i tries nonces i, i + n, i + 2n, ... for a pool of n workers. The
+    first worker to find a valid hash wins; the others notice the job counter
+    has moved on and go back to waiting for the next block.
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers or MINING_WORKERS or os.cpu_count() or 1
+        self.ctx = multiprocessing.get_context(START_METHOD)
+        self.current_job = self.ctx.Value("q", 0)
+        self.results = self.ctx.Queue()
+        self.tasks = []
+        self.processes = []
+        self.job_counter = 0
+        self.lock = threading.Lock()  # one block is mined at a time
+
+    def start(self):
+        if self.processes:
+            return
+        for _ in range(self.workers):
+            tasks = self.ctx.Queue()
+            p = self.ctx.Process(target=worker_loop, args=(tasks, self.current_job, self.results), daemon=True)
+            p.start()
+            self.tasks.append(tasks)
+            self.processes.append(p)
+
+    def mine(self, block, cancel_event=None):
+        """
+        Find a nonce for block. Returns True and sets block.nonce/block.hash on
+        success, or False if cancel_event was set before a hash was found.
+        """
+        prefix, suffix = block.hash_parts()
+        target = "0" * MINING_DIFFICULTY
+        with self.lock:
+            self.start()
+            self.job_counter += 1
+            job_id = self.job_counter
+            self.current_job.value = job_id
+            for i, tasks in enumerate(self.tasks):
+                tasks.put((prefix, suffix, target, block.nonce + i, self.workers, job_id))
+            try:
+                while True:
+                    if cancel_event is not None and cancel_event.is_set():
+                        return False
+                    try:
+                        found_job, nonce, digest = self.results.get(timeout=0.05)
+                    except queue.Empty:
+                        if not any(p.is_alive() for p in self.processes):
+                            self.stop()  # the next job starts a fresh pool
+                            raise RuntimeError("mining workers exited")
+                        continue
+                    if found_job != job_id:
+                        continue  # late result from a cancelled job
+                    block.nonce = nonce
+                    block.hash = digest
+                    print(f"Block mined: {block.hash}")
+                    return True
+            finally:
+                self.current_job.value = 0  # stop the remaining workers
+
+    def stop(self):
+        self.current_job.value = 0
+        for tasks in self.tasks:
+            try:
+                tasks.put(None)
+            except Exception:
+                pass
+        for p in self.processes:
+            p.join(timeout=1)
+            if p.is_alive():
+                p.terminate()
+        self.tasks = []
+        self.processes = []
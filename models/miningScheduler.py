@@ -0,0 +1,84 @@
+import threading
+import time
+
+from utils.constants import TRANS_PER_BLOCK, MINE_MAX_WAIT_MS, MINE_RETRY_DELAY
+
+
+class MiningScheduler:
+    """
+    Runs at most one mining job at a time for a miner.
+
+    The scheduler sleeps on a condition until the mempool holds a full block
+    of transactions, or until the oldest pending transaction has waited
+    max_wait_ms (when set). Mempool admissions and new blocks wake it up, and
+    a new chain tip cancels a job that is still mining on the old one.
+    """
+
+    def __init__(self, miner, max_wait_ms=MINE_MAX_WAIT_MS):
+        self.miner = miner
+        self.max_wait_ms = max_wait_ms
+        self.condition = threading.Condition()
+        self.pending_since = None  # when the oldest unmined transaction was seen
+        self.running = False
+
+    def start(self):
+        self.running = True
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+
+    def notify_transaction(self):
+        with self.condition:
+            if self.pending_since is None:
+                self.pending_since = time.monotonic()
+            self.condition.notify()
+
+    def notify_block(self):
+        # The tip moved: a job still mining on the old parent is wasted work
+        parent = self.miner.mining_parent
+        if parent is not None and parent != self.miner.last_block_hash:
+            self.miner.mining_cancel.set()
+        with self.condition:
+            self.condition.notify()
+
+    def next_wait(self):
+        """Returns (ready, timeout): whether to mine now, else how long to sleep."""
+        pending = len(self.miner.mempool)
+        if pending == 0:
+            self.pending_since = None
+            return False, None
+        if pending >= TRANS_PER_BLOCK:
+            return True, None
+        if self.max_wait_ms is None:
+            return False, None
+        if self.pending_since is None:
+            self.pending_since = time.monotonic()
+        remaining = self.max_wait_ms / 1000 - (time.monotonic() - self.pending_since)
+        if remaining <= 0:
+            return True, None
+        return False, remaining
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.running:
+                    ready, timeout = self.next_wait()
+                    if ready:
+                        break
+                    self.condition.wait(timeout)
+                if not self.running:
+                    return
+            try:
+                self.miner.produce_block()
+            except Exception as e:
+                # Keep the scheduler alive; produce_block has put the transactions back
+                print(f"[MINER ERROR] produce_block: {e}")
+                with self.condition:
+                    if self.running:
+                        self.condition.wait(MINE_RETRY_DELAY)
+            with self.condition:
+                # Leftover transactions start a fresh wait window
+                self.pending_since = time.monotonic() if len(self.miner.mempool) else None
@@ -1,49 +1,62 @@
-class Transaction:
-    def __init__(self, sender, receiver, transaction_fees, amount):
-        self.__sender = sender
-        self.__receiver = receiver
-        self.__transaction_fees = transaction_fees
-        self.__amount = amount
-
-    @property
-    def sender(self):
-        return self.__sender
+import hashlib
+import json
 
-    @sender.setter
-    def sender(self, value):
-        self.__sender = value
 
-    @property
-    def receiver(self):
-        return self.__receiver
-
-    @receiver.setter
-    def receiver(self, value):
-        self.__receiver = value
-
-    @property
-    def transaction_fees(self):
-        return self.__transaction_fees
-
-    @transaction_fees.setter
-    def transaction_fees(self, value):
-        self.__transaction_fees = value
-
-    @property
-    def amount(self):
-        return self.__amount
-
-    @amount.setter
-    def amount(self, value):
-        self.__amount = value
+class Transaction:
+    """
+    An immutable transfer. Slots instead of an instance dict keep it small;
+    only the 32-byte SHA-256 digest of the canonical JSON is cached, on first
+    use, and the hex txid is derived from it when asked for. Two
+    transactions are equal when their digests are.
+    The sending wallet's nonce is part of the txid, so paying the same
+    amount to the same wallet twice makes two distinct transactions.
+    """
+
+    __slots__ = ("sender", "receiver", "transaction_fees", "amount", "nonce", "_digest")
+
+    def __init__(self, sender, receiver, transaction_fees, amount, nonce=None):
+        init = object.__setattr__
+        init(self, "sender", sender)
+        init(self, "receiver", receiver)
+        init(self, "transaction_fees", transaction_fees)
+        init(self, "amount", amount)
+        init(self, "nonce", nonce)
+        init(self, "_digest", None)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"Transaction is immutable, cannot set {name}")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"Transaction is immutable, cannot delete {name}")
 
     def tx_to_dict(self):
-        return {
+        data = {
             "sender": self.sender,
             "receiver": self.receiver,
             "transaction_fees": self.transaction_fees,
             "amount": self.amount
         }
+        # Left out when unset, so transactions without one keep their txid
+        if self.nonce is not None:
+            data["nonce"] = self.nonce
+        return data
+
+    @property
+    def canonical(self):
+        """The transaction as sorted-key JSON: what the txid is computed over. Rebuilt on each use."""
+        return json.dumps(self.tx_to_dict(), sort_keys=True).encode()
+
+    @property
+    def digest(self):
+        """Raw SHA-256 of the canonical transaction JSON."""
+        if self._digest is None:
+            object.__setattr__(self, "_digest", hashlib.sha256(self.canonical).digest())
+        return self._digest
+
+    @property
+    def txid(self):
+        """Hex of the digest (same as its Merkle leaf)."""
+        return self.digest.hex()
 
     @staticmethod
     def from_dict(data):
@@ -51,26 +64,41 @@ class Transaction:
             data["sender"],
             data["receiver"],
             data["transaction_fees"],
-            data["amount"]
+            data["amount"],
+            data.get("nonce")
         )
 
-    # Comparison methods for priority queue (higher fees = higher priority)
+    def __eq__(self, other):
+        if not isinstance(other, Transaction):
+            return NotImplemented
+        return self.digest == other.digest
+
+    def __hash__(self):
+        return hash(self.digest)
+
+    def __repr__(self):
+        nonce = f", nonce={self.nonce!r}" if self.nonce is not None else ""
+        return (f"Transaction({self.sender!r}, {self.receiver!r}, "
+                f"{self.transaction_fees!r}, {self.amount!r}{nonce})")
+
+    # Ordering by fee for priority queues (higher fees = higher priority)
     def __lt__(self, other):
-        # For priority queue: higher fees should come first, so we reverse the comparison
+        # Higher fees should come first, so we reverse the comparison
         return self.transaction_fees > other.transaction_fees
 
     def __gt__(self, other):
-        # For priority queue: higher fees should come first, so we reverse the comparison
         return self.transaction_fees < other.transaction_fees
 
-    def __eq__(self, other):
-        return self.transaction_fees == other.transaction_fees
-
     def __le__(self, other):
-        return self.__lt__(other) or self.__eq__(other)
+        return not self.__gt__(other)
 
     def __ge__(self, other):
-        return self.__gt__(other) or self.__eq__(other)
+        return not self.__lt__(other)
+
+    def __getstate__(self):
+        # The digest travels along, so blocks validated in another process aren't hashed again
+        return (self.sender, self.receiver, self.transaction_fees, self.amount, self.nonce, self._digest)
 
-    def __ne__(self, other):
-        return not self.__eq__(other)
\ No newline at end of file
+    def __setstate__(self, state):
+        Transaction.__init__(self, *state[:5])
+        object.__setattr__(self, "_digest", state[5])
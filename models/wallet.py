@@ -1,105 +1,144 @@
-import socket
-import random
-import json
+import itertools
 import time
 
+from models.connectionPool import ConnectionPool
+from models.lightClient import LightClient
+from models.membership import Membership
+from models.minerSelector import MinerSelector
+from utils.constants import (WALLET_POOL_SIZE, WALLET_POOL_MAX_IDLE, WALLET_REQUEST_TIMEOUT, TX_BATCH_MAX,
+                             WALLET_FAILOVER_ATTEMPTS)
+
+# A payment carries a nonce no other payment of this wallet uses, so "duplicate" can only mean
+# an earlier copy of this very payment got through (e.g. before a timeout and resend)
+ACCEPTED_STATUSES = ("transaction_received", "duplicate")
+
+
 class Wallet:
-    def __init__(self, owner, balance=100):  # Default balance set to 100
+    def __init__(self, owner, balance=100, pool_size=WALLET_POOL_SIZE, max_idle=WALLET_POOL_MAX_IDLE,
+                 timeout=WALLET_REQUEST_TIMEOUT, light=False):  # Default balance set to 100
         self.owner = owner
         self.received_transactions = []
         self.sent_transactions = []
         self.balance = balance
+        self.initial_balance = balance
+        # Each payment gets its own nonce (and so its own txid); seeded from the clock so restarts don't reuse one
+        self.nonces = itertools.count(time.time_ns())
+        # Light mode keeps only verified headers and checks its own transactions by Merkle proof
+        self.light = LightClient(owner) if light else None
         self.miners = []
+        self.membership = None
+        # Miner connections are kept open and reused; pool_size=0 reconnects per request
+        self.pool = ConnectionPool(max_size=pool_size, max_idle=max_idle, timeout=timeout)
+        # Routes each request by measured latency, load and errors instead of at random
+        self.selector = MinerSelector()
 
-    def connect_to_bootstrap(self, host, port):
-        try:
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                s.connect((host, port))
-                request = json.dumps({"type": "GET_MINERS"}) + "\n"
-                s.sendall(request.encode())
-
-                data = ""
-                while True:
-                    part = s.recv(4096).decode()
-                    if not part:
-                        break
-                    data += part
-                    if "\n" in data:
-                        line, _ = data.split("\n", 1)
-                        self.miners = json.loads(line.strip())
-                        break
-
-                print(f"[WALLET] Miners received: {self.miners}")
-        except Exception as e:
-            print(f"[WALLET ERROR] Could not connect to bootstrap: {e}")
-
-    def select_miner(self):
-        if not self.miners:
+    def connect_to_bootstrap(self, host, port, timeout=5):
+        """Subscribe to the bootstrap's miner list; self.miners then follows joins and leaves."""
+        if self.membership is not None:
+            self.membership.stop()
+        self.membership = Membership((host, port), "WALLET", on_change=self.miners_changed)
+        self.membership.start()
+        if self.membership.synced.wait(timeout):
+            self.miners = self.membership.list()
+            print(f"[WALLET] Miners received: {self.miners}")
+        else:
+            print(f"[WALLET ERROR] Could not connect to bootstrap at {host}:{port}")
+
+    def miners_changed(self, joined, left):
+        self.miners = self.membership.list()
+        self.selector.forget(left)
+        print(f"[WALLET] Miners updated: +{len(joined)} -{len(left)}, {len(self.miners)} known")
+
+    def select_miner(self, exclude=()):
+        miner = self.selector.choose(self.miners, exclude)
+        if not miner:
             print("[WALLET] No miners available.")
             return None
-        miner = random.choice(self.miners)
         print(f"[WALLET] Selected miner: {miner}")
         return miner
 
-    def connect_to_miner(self, miner):
+    def request_miner(self, miner, request):
+        """Send one request over a pooled connection; returns the reply or None"""
+        replies = self.exchange_with(miner, [request])
+        return replies[0] if replies is not None else None
+
+    def request(self, request):
+        """Send one request to the best available miner; returns the reply or None"""
+        replies = self.exchange([request])
+        return replies[0] if replies is not None else None
+
+    def exchange(self, messages):
+        """
+        Pipeline messages to a miner picked by the selector, failing over to
+        another miner when one can't be reached or times out; returns the
+        replies or None.
+        """
+        tried = []
+        for _ in range(WALLET_FAILOVER_ATTEMPTS):
+            miner = self.select_miner(exclude=tried)
+            if not miner:
+                break
+            replies = self.exchange_with(miner, messages)
+            if replies is not None:
+                return replies
+            tried.append(miner)
+        return None
+
+    def exchange_with(self, miner, messages):
+        started = self.selector.begin(miner)
         try:
-            s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            s.connect((miner["ip"], miner["port"]))
-            s.sendall(b"WALLET\n")  # Send connection type immediately
-            print(f"[WALLET] Connected to miner at {miner['ip']}:{miner['port']}")
-            return s
-        except Exception as e:
-            print(f"[WALLET ERROR] Could not connect to miner: {e}")
-            return None
+            replies = self.pool.pipeline(miner, messages)
+        except ValueError:
+            print("[WALLET ERROR] Malformed response from miner")
+        except OSError as e:
+            print(f"[WALLET ERROR] Could not reach miner {miner['ip']}:{miner['port']}: {e}")
+        else:
+            self.selector.succeeded(miner, started)
+            return replies
+        self.selector.failed(miner)
+        return None
 
     def update_balance(self):
         """Update wallet balance by querying a miner"""
-        miner = self.select_miner()
-        if not miner:
+        if self.light is not None:
+            return self.update_light_balance()
+        # Send balance query
+        query = {
+            "type": "GET_BALANCE",
+            "wallet": self.owner
+        }
+        response = self.request(query)
+        if response is None:
             return False
-            
-        try:
-            sock = self.connect_to_miner(miner)
-            if not sock:
-                return False
-                
-            # Send balance query
-            query = {
-                "type": "GET_BALANCE",
-                "wallet": self.owner
-            }
-            sock.sendall((json.dumps(query) + "\n").encode())
-            
-            # Receive response
-            data = sock.recv(4096).decode().strip()
-            if not data:
-                print("[WALLET ERROR] Empty response from miner")
-                return False
-            
-            try:
-                response = json.loads(data)
-            except json.JSONDecodeError:
-                print("[WALLET ERROR] Malformed response from miner")
-                return False
-            
-            if response.get("status") == "success":
-                self.balance +=response.get("balance", 0)
-                print(f"[WALLET] Updated balance for {self.owner}: {self.balance}")
-                sock.close()
-                return True
-            else:
-                print(f"[WALLET] Error getting balance: {response.get('message')}")
-                sock.close()
-                return False
-                
-        except Exception as e:
-            print(f"[WALLET ERROR] Updating balance: {e}")
-            try:
-                sock.close()
-            except:
-                pass
+
+        if response.get("status") == "success":
+            self.balance +=response.get("balance", 0)
+            print(f"[WALLET] Updated balance for {self.owner}: {self.balance}")
+            return True
+        else:
+            print(f"[WALLET] Error getting balance: {response.get('message')}")
             return False
 
+    def update_light_balance(self):
+        """Balance from the wallet's own transactions, verified against synced headers"""
+        # Every page of one sync comes from the same miner, so proofs and headers describe one chain
+        synced, tried = False, []
+        for _ in range(WALLET_FAILOVER_ATTEMPTS):
+            miner = self.select_miner(exclude=tried)
+            if not miner:
+                break
+            try:
+                synced = self.light.sync(lambda message: self.request_miner(miner, message))
+            except (KeyError, TypeError, ValueError) as e:
+                print(f"[WALLET ERROR] Malformed light sync reply: {e}")
+            if synced:
+                break
+            tried.append(miner)
+        self.balance = self.initial_balance + self.light.net - self.light.unconfirmed_sends()
+        if synced:
+            print(f"[WALLET] Verified balance for {self.owner} at height {self.light.height}: {self.balance}")
+        return synced
+
     def get_balance(self):
         """Get current balance (with update)"""
         self.update_balance()
@@ -118,59 +157,92 @@ class Wallet:
             print(f"[WALLET] Insufficient funds. Balance: {self.balance}, Amount: {amount}")
             return False
             
-        miner = self.select_miner()
-        if not miner:
+        tx = {
+            "type": "TRANSACTION",
+            "sender": self.owner,
+            "receiver": receiver,
+            "amount": amount,
+            "fee": 0,
+            "nonce": next(self.nonces)
+        }
+        print(f"[WALLET] Sent transaction: {tx}")
+        # A resend after a timeout keeps the nonce and txid: it is admitted once, and a copy is "duplicate"
+        response = self.request(tx)
+        if response is None:
             return False
-            
-        try:
-            sock = self.connect_to_miner(miner)
-            if not sock:
-                return False
-                
-            sock.settimeout(5)
-            tx = {
-                "type": "TRANSACTION",
-                "sender": self.owner,
+        print(f"[WALLET] Received response: {response}")
+
+        if response.get("status") in ACCEPTED_STATUSES:
+            # Update local records
+            self.sent_transactions.append({
                 "receiver": receiver,
                 "amount": amount,
-                "fee": 0
-            }
-            sock.sendall((json.dumps(tx) + "\n").encode())
-            print(f"[WALLET] Sent transaction: {tx}")
-            
-            # Receive response
-            data = sock.recv(4096).decode().strip()
-            if not data:
-                print("[WALLET ERROR] Empty response from miner")
-                return False
-            
-            try:
-                response = json.loads(data)
-                print(f"[WALLET] Received response: {response}")
-            except json.JSONDecodeError:
-                print("[WALLET ERROR] Malformed response from miner")
-                return False
-            
-            if response.get("status") == "transaction_received":
-                # Update local records
-                self.sent_transactions.append({
-                    "receiver": receiver,
-                    "amount": amount,
-                    "timestamp": time.time()
-                })
-                self.balance -= amount
-                print(f"[WALLET] Transaction sent successfully: {self.owner} -> {receiver}: {amount}")
-                sock.close()
-                return True
-            else:
-                print(f"[WALLET] Error sending transaction: {response.get('message')}")
-                sock.close()
-                return False
-                
-        except Exception as e:
-            print(f"[WALLET ERROR] Sending transaction: {e}")
-            try:
-                sock.close()
-            except:
-                pass
-            return False
\ No newline at end of file
+                "timestamp": time.time()
+            })
+            self.balance -= amount
+            if self.light is not None:
+                self.light.sent(tx)
+            print(f"[WALLET] Transaction sent successfully: {self.owner} -> {receiver}: {amount}")
+            return True
+        else:
+            print(f"[WALLET] Error sending transaction: {response.get('message')}")
+            return False
+
+    def send_transactions(self, payments):
+        """Send many (receiver, amount[, fee]) payments as TRANSACTION_BATCH requests.
+
+        Returns one bool per payment, True if the miner accepted it."""
+        payments = [tuple(payment) for payment in payments]
+        if not payments:
+            return []
+        if any(payment[1] <= 0 for payment in payments):
+            print("[WALLET] Amount must be positive")
+            return [False] * len(payments)
+
+        # Update balance once for the whole batch
+        self.update_balance()
+
+        total = sum(payment[1] for payment in payments)
+        if self.balance < total:
+            print(f"[WALLET] Insufficient funds. Balance: {self.balance}, Amount: {total}")
+            return [False] * len(payments)
+
+        transactions = [{
+            "sender": self.owner,
+            "receiver": payment[0],
+            "amount": payment[1],
+            "fee": payment[2] if len(payment) > 2 else 0,
+            "nonce": next(self.nonces)
+        } for payment in payments]
+        # All batches go out in one pipelined write; replies come back in order
+        batches = [
+            {"type": "TRANSACTION_BATCH", "transactions": transactions[i:i + TX_BATCH_MAX]}
+            for i in range(0, len(transactions), TX_BATCH_MAX)
+        ]
+        responses = self.exchange(batches)
+        if responses is None:
+            return [False] * len(payments)
+
+        results = []
+        for batch, response in zip(batches, responses):
+            if response.get("status") != "batch_received":
+                print(f"[WALLET] Error sending transactions: {response.get('message')}")
+                results += [False] * len(batch["transactions"])
+                continue
+            results += [result.get("status") in ACCEPTED_STATUSES for result in response.get("results", [])]
+
+        now = time.time()
+        for tx, accepted in zip(transactions, results):
+            if accepted:
+                self.sent_transactions.append({"receiver": tx["receiver"], "amount": tx["amount"], "timestamp": now})
+                self.balance -= tx["amount"]
+                if self.light is not None:
+                    self.light.sent(tx)
+        print(f"[WALLET] Batch sent: {sum(results)}/{len(payments)} transactions accepted")
+        return results
+
+    def close(self):
+        """Close the pooled miner connections and the bootstrap subscription"""
+        if self.membership is not None:
+            self.membership.stop()
+        self.pool.close()
@@ -4,6 +4,7 @@ from models.wallet import Wallet
 from models.Miner import Miner
 from models.bootstrapNode import BootstrapNode
 from utils.constants import MINER_PORT, TRANS_PER_BLOCK
+from utils.latency import print_send_latency
 
 BOOTSTRAP_IP = "127.0.0.1"
 BOOTSTRAP_PORT = 5500
@@ -61,6 +62,7 @@ def setup_wallets():
 def simulate_transactions(wallets, miners):
     print_separator("SIMULATING TRANSACTIONS")
     clients = list(wallets.keys())
+    latencies = []
     
     for i in range(NUM_TRANSACTIONS):
         sender = clients[i % NUM_CLIENTS]
@@ -68,7 +70,9 @@ def simulate_transactions(wallets, miners):
         amount = (i % 4) + 1  # always less than 5
         
         print(f"\n[TEST] Transaction {i+1}/{NUM_TRANSACTIONS}: {sender} → {receiver}, Amount: {amount}")
+        sent_at = time.perf_counter()
         success = wallets[sender].send_transaction(receiver, amount)
+        latencies.append(time.perf_counter() - sent_at)
         
         if success:
             print(f"[TEST] ✓ Transaction confirmed")
@@ -85,10 +89,12 @@ def simulate_transactions(wallets, miners):
             print_blockchains(miners)
             time.sleep(2)
 
+    print_send_latency(latencies)
+
 def print_mempools(miners, top_n=5):
     print_separator("MINER MEMPOOLS STATUS")
     for miner in miners:
-        mempool = miner.mempool[:top_n]
+        mempool = miner.mempool.top(top_n)
         print(f"\n[Miner {miner.port}] Total transactions: {len(miner.mempool)}")
         if mempool:
             for idx, tx in enumerate(mempool, 1):
@@ -201,6 +207,8 @@ def test_blockchain():
     
     # Update balances
     update_wallet_balances(wallets)
+    for wallet in wallets.values():
+        wallet.close()
     time.sleep(2)
     
     # Shutdown
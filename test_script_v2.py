@@ -4,6 +4,7 @@ from models.wallet import Wallet
 from models.Miner import Miner
 from models.bootstrapNode import BootstrapNode
 from utils.constants import MINER_PORT, TRANS_PER_BLOCK
+from utils.latency import print_send_latency
 import sys
 from logger import start_logging, stop_logging
 
@@ -73,6 +74,7 @@ def setup_wallets():
 def simulate_transactions(wallets, miners):
     print("[TEST] Starting transaction simulation")
     clients = list(wallets.keys())
+    latencies = []
 
     for i in range(NUM_TRANSACTIONS):
         check_stop()  # Check if stopped
@@ -81,7 +83,9 @@ def simulate_transactions(wallets, miners):
         amount = (i % 4) + 1
 
         print(f"[TEST] Transaction {i + 1}/{NUM_TRANSACTIONS}: {sender} -> {receiver}, Amount: {amount}")
+        sent_at = time.perf_counter()
         success = wallets[sender].send_transaction(receiver, amount)
+        latencies.append(time.perf_counter() - sent_at)
 
         if success:
             print(f"[WALLET {sender}] Transaction sent successfully to {receiver}")
@@ -97,11 +101,13 @@ def simulate_transactions(wallets, miners):
             print_blockchains(miners)
             time.sleep(2)
 
+    print_send_latency(latencies)
+
 
 def print_mempools(miners, top_n=5):
     print("[TEST] Checking miner mempools")
     for miner in miners:
-        mempool = miner.mempool[:top_n]
+        mempool = miner.mempool.top(top_n)
         print(f"[MINER {miner.port}] Mempool size: {len(miner.mempool)} transactions")
         for tx in mempool:
             print(f"[MINER {miner.port}] Transaction: {tx.sender} -> {tx.receiver}, Amount: {tx.amount}")
@@ -202,6 +208,8 @@ def test_blockchain():
     time.sleep(2)
 
     update_wallet_balances(wallets)
+    for wallet in wallets.values():
+        wallet.close()
     time.sleep(2)
 
     shutdown(miners, bootstrap)
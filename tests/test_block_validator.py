@@ -0,0 +1,122 @@
+import contextlib
+import io
+import unittest
+
+from models.block import Block
+from models.blockValidator import BlockValidator, check_body, check_header, validate_body
+from models.transaction import Transaction
+from utils.constants import MINING_DIFFICULTY
+
+
+def mined_block(transactions, previous_hash="0" * 64):
+    block = Block(transactions, previous_hash)
+    with contextlib.redirect_stdout(io.StringIO()):
+        block.mine_block()
+    return block
+
+
+def payments(count):
+    return [Transaction(f"Sender{i}", f"Receiver{i}", i % 3, 1 + i, i) for i in range(count)]
+
+
+class CheckHeaderTest(unittest.TestCase):
+    def test_valid_block(self):
+        block = mined_block(payments(4))
+        self.assertIsNone(check_header(block.header()))
+        self.assertIsNone(check_header(block.to_dict()))
+
+    def test_hash_below_difficulty(self):
+        block = Block(payments(4), "0" * 64)
+        while block.hash.startswith("0" * MINING_DIFFICULTY):
+            block.nonce += 1
+            block.hash = block.compute_hash()
+        self.assertEqual(check_header(block.header()), "hash does not meet the difficulty")
+
+    def test_hash_not_matching_header(self):
+        header = mined_block(payments(4)).header()
+        header["nonce"] += 1  # the claimed hash no longer belongs to this header
+        self.assertEqual(check_header(header), "hash does not match the header")
+
+    def test_missing_hash(self):
+        header = mined_block(payments(4)).header()
+        del header["hash"]
+        self.assertEqual(check_header(header), "hash does not meet the difficulty")
+
+    def test_malformed_header(self):
+        header = mined_block(payments(4)).header()
+        del header["merkle_root"]
+        self.assertTrue(check_header(header).startswith("malformed header"))
+        self.assertEqual(check_header("not a header"), "malformed header")
+
+
+class CheckBodyTest(unittest.TestCase):
+    def test_valid_block(self):
+        self.assertIsNone(check_body(mined_block(payments(5))))
+
+    def test_bad_merkle_root(self):
+        block = mined_block(payments(4))
+        block.merkle_root = "f" * 64
+        self.assertEqual(check_body(block), "merkle root does not match the transactions")
+
+    def test_transactions_swapped_under_the_root(self):
+        data = mined_block(payments(4)).to_dict()
+        data["transactions"][0]["amount"] += 1
+        block, reason = validate_body(data)
+        self.assertIsNone(block)
+        self.assertEqual(reason, "merkle root does not match the transactions")
+
+    def test_duplicate_transaction(self):
+        tx = payments(1)[0]
+        block = mined_block([tx, tx])
+        # The Merkle root is honest, so it is the duplicate check that fails
+        self.assertTrue(block.merkle_valid())
+        self.assertIsNone(check_header(block.header()))
+        self.assertEqual(check_body(block), "duplicate transaction")
+
+    def test_malformed_transaction(self):
+        block = mined_block([Transaction("Sender", "Receiver", 0, -5)])
+        self.assertIn("amount must be a positive number", check_body(block))
+
+    def test_amount_too_large_for_a_float(self):
+        block = mined_block([Transaction("Sender", "Receiver", 0, 10 ** 400)])
+        self.assertIn("amount must be a positive number", check_body(block))
+        block = mined_block([Transaction("Sender", "Receiver", 10 ** 400, 1)])
+        self.assertIn("fee must be a non-negative number", check_body(block))
+
+    def test_malformed_block(self):
+        block, reason = validate_body({"transactions": "nope"})
+        self.assertIsNone(block)
+        self.assertTrue(reason.startswith("malformed block"))
+
+
+class BlockValidatorTest(unittest.TestCase):
+    def test_stages_count_rejections(self):
+        validator = BlockValidator()
+        good = mined_block(payments(4))
+        bad_root = mined_block(payments(4))
+        bad_root.merkle_root = "0" * 64
+        self.assertIsNone(validator.check_header(good.header()))
+        self.assertIsNone(validator.check_body(good))
+        self.assertIsNotNone(validator.check_body(bad_root))
+        stats = validator.get_stats()
+        self.assertEqual(stats["header"]["blocks"], 1)
+        self.assertEqual((stats["body"]["blocks"], stats["body"]["rejected"]), (2, 1))
+
+    def test_pool_matches_inline(self):
+        tx = payments(1)[0]
+        bad_root = mined_block(payments(3)).to_dict()
+        bad_root["merkle_root"] = "0" * 64
+        datas = [mined_block(payments(6)).to_dict(), bad_root, mined_block([tx, tx]).to_dict()]
+        validator = BlockValidator(workers=2)
+        validator.pool_min_tx = 0  # through the worker processes even on a single core
+        try:
+            results = validator.validate_bodies(datas)
+        finally:
+            validator.stop()
+        self.assertEqual([reason for _, reason in results],
+                         [None, "merkle root does not match the transactions", "duplicate transaction"])
+        self.assertEqual(results[0][0].txids, [tx.txid for tx in payments(6)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,4 +1,46 @@
 TRANS_PER_BLOCK=4
 QUEUED_CONNECTION=20
+BOOTSTRAP_SUBSCRIBER_MAX_BUFFER = 1024 * 1024  # unsent bytes a subscriber may fall behind before it is dropped
+HEARTBEAT_INTERVAL = 5  # seconds between a miner's heartbeats to the bootstrap
+MINER_EXPIRY = 15  # seconds without a heartbeat before the bootstrap drops a miner
+MEMBERSHIP_RETRY = 5  # seconds between bootstrap resubscribes and miner reconnect attempts
 MINER_PORT=[6001,6002,6003,6004]
-MINING_DIFFICULTY = 2
\ No newline at end of file
+MINING_DIFFICULTY = 2
+MINING_WORKERS = 0  # 0 = one worker process per CPU core
+VALIDATION_WORKERS = 0  # block validation worker processes; 0 = one per CPU core
+VALIDATION_POOL_MIN_TX = 256  # transactions in a block before its body is validated in a worker process
+MINE_MAX_WAIT_MS = None  # mine a partial block after this long; None = only full blocks
+MINE_RETRY_DELAY = 1  # seconds before mining again after produce_block failed
+MEMPOOL_MAX_TX = 50000  # pending transactions kept before lowest-fee eviction
+MEMPOOL_MAX_BYTES = 32 * 1024 * 1024  # approximate memory budget for pending transactions
+MEMPOOL_TX_TTL = 3600  # seconds a transaction may stay pending
+BLOCKSTORE_DIR = None  # directory for persistent block files; None = temporary file per miner
+BLOCK_CACHE_SIZE = 256  # deserialized blocks kept in memory per miner
+CHAIN_SNAPSHOT_INTERVAL = 500  # blocks between snapshots of the chain indexes in a persistent store
+SYNC_HEADERS_PER_REQUEST = 2000  # headers per GET_HEADERS reply
+SYNC_BLOCKS_PER_REQUEST = 100  # block bodies per GET_BLOCKS reply
+SYNC_TIMEOUT = 10  # seconds to wait for a peer's sync reply
+QUERY_MAX_BLOCKS = 100  # blocks per GET_BLOCKCHAIN page
+QUERY_MAX_MEMPOOL = 1000  # transactions per GET_MEMPOOL page
+LEDGER_ENABLED = False  # keep the columnar ledger for LEDGER_QUERY and indexed GET_WALLET_PROOFS; grows with the history
+LEDGER_TOP_MAX = 1000  # wallets per top_senders answer to a LEDGER_QUERY
+WALLET_PROOFS_MAX = 1000  # transactions with Merkle proofs per GET_WALLET_PROOFS reply
+SERVER_BACKLOG = 4096  # pending connections the miner's listening socket queues
+MAX_MESSAGE_BYTES = 64 * 1024 * 1024  # longest protocol frame (or legacy line) a node accepts
+WALLET_POOL_SIZE = 4  # idle connections a wallet keeps open per miner
+WALLET_POOL_MAX_IDLE = 30  # seconds before an idle wallet connection is reopened
+WALLET_REQUEST_TIMEOUT = 5  # seconds a wallet waits for a miner's reply
+WALLET_FAILOVER_ATTEMPTS = 3  # miners a wallet request is tried on before it fails
+SELECTOR_EWMA_ALPHA = 0.3  # weight of the newest sample in a miner's round-trip and error averages
+SELECTOR_BACKOFF = 2  # seconds a failed miner is skipped, doubled per consecutive failure
+SELECTOR_MAX_BACKOFF = 60  # longest a failed miner is skipped
+SELECTOR_STATS_TTL = 30  # seconds before a miner's round trip is stale and it is probed again
+TX_BATCH_MAX = 10000  # transactions accepted in one TRANSACTION_BATCH
+FRAME_CODECS = ["json", "bin"]  # payload codecs offered in the handshake, most preferred first
+GOSSIP_SEEN_CACHE = 100000  # tx/block hashes remembered to suppress re-fetch and re-relay
+GOSSIP_KNOWN_PER_PEER = 50000  # hashes remembered per peer as already known to it
+GOSSIP_INV_INTERVAL_MS = 50  # transaction announcements are batched per peer this often
+GOSSIP_REQUEST_TIMEOUT = 5  # seconds before a hash asked for with GETDATA may be asked for again
+COMPACT_BLOCKS = True  # relay blocks as header + short transaction ids, rebuilt from the peer's mempool
+PEER_QUEUE_MAX_BYTES = 8 * 1024 * 1024  # outbound bytes queued per peer before its gossip is dropped
+PEER_SEND_TIMEOUT = 10  # seconds a peer may stall our writes before it is disconnected
@@ -0,0 +1,339 @@
+"""
+Wire framing shared by miners, wallets, the bootstrap node and the console.
+
+A connection starts with one text handshake line naming the client's role and
+the payload codecs it speaks, most preferred first:
+
+    MINER json,bin\n
+
+The server answers with the codec it picked, and from then on every message
+in both directions is a frame: a 4-byte big-endian payload length followed by
+the payload encoded with that codec.
+
+    CODEC json\n
+
+A bare handshake ("MINER\n") or a first line that is already a JSON request
+keeps the old newline-delimited JSON protocol on that connection.
+"""
+import asyncio
+import json
+import socket
+import struct
+
+from utils.constants import FRAME_CODECS, MAX_MESSAGE_BYTES
+
+HEADER = struct.Struct(">I")
+RECV_CHUNK = 256 * 1024
+
+
+class RawJson(bytes):
+    """A payload that is already serialized JSON, e.g. a block read from the block store."""
+
+
+class JsonCodec:
+    name = "json"
+
+    def encode(self, message):
+        if isinstance(message, RawJson):
+            return bytes(message)
+        return json.dumps(message).encode()
+
+    def decode(self, payload):
+        return json.loads(bytes(payload))
+
+
+class BinaryCodec:
+    """
+    Compact tagged encoding for JSON-shaped data: one tag byte per value, varint
+    lengths and integers, and raw UTF-8 strings without quoting or escaping.
+    """
+    name = "bin"
+
+    def encode(self, message):
+        if isinstance(message, RawJson):
+            message = json.loads(message)
+        out = bytearray()
+        self.pack(message, out)
+        return bytes(out)
+
+    def decode(self, payload):
+        view = memoryview(payload)
+        try:
+            value, offset = self.unpack(view, 0)
+        except (IndexError, struct.error) as e:
+            raise ValueError("truncated binary payload") from e
+        except RecursionError as e:
+            raise ValueError("binary payload nested too deeply") from e
+        if offset != len(view):
+            raise ValueError("trailing bytes after binary payload")
+        return value
+
+    def pack(self, value, out):
+        if value is None:
+            out += b"N"
+        elif value is True:
+            out += b"T"
+        elif value is False:
+            out += b"F"
+        elif isinstance(value, int):
+            if not -2 ** 63 <= value < 2 ** 63:
+                raise ValueError("integer out of 64-bit range")
+            out += b"i"
+            pack_varint((value << 1) ^ (value >> 63), out)  # zigzag keeps small negatives short
+        elif isinstance(value, float):
+            out += b"f" + struct.pack(">d", value)
+        elif isinstance(value, str):
+            data = value.encode()
+            out += b"s"
+            pack_varint(len(data), out)
+            out += data
+        elif isinstance(value, (bytes, bytearray)):
+            out += b"b"
+            pack_varint(len(value), out)
+            out += value
+        elif isinstance(value, (list, tuple)):
+            out += b"l"
+            pack_varint(len(value), out)
+            for item in value:
+                self.pack(item, out)
+        elif isinstance(value, dict):
+            out += b"d"
+            pack_varint(len(value), out)
+            for key, item in value.items():
+                self.pack(str(key), out)
+                self.pack(item, out)
+        else:
+            raise TypeError(f"cannot encode {type(value).__name__}")
+
+    def unpack(self, view, offset):
+        tag = view[offset]
+        offset += 1
+        if tag == 0x4E:  # N
+            return None, offset
+        if tag == 0x54:  # T
+            return True, offset
+        if tag == 0x46:  # F
+            return False, offset
+        if tag == 0x69:  # i
+            zigzag, offset = unpack_varint(view, offset)
+            return (zigzag >> 1) ^ -(zigzag & 1), offset
+        if tag == 0x66:  # f
+            return struct.unpack_from(">d", view, offset)[0], offset + 8
+        if tag in (0x73, 0x62):  # s, b
+            length, offset = unpack_varint(view, offset)
+            end = offset + length
+            if end > len(view):
+                raise ValueError("truncated binary payload")
+            data = bytes(view[offset:end])
+            return (data.decode() if tag == 0x73 else data), end
+        if tag == 0x6C:  # l
+            count, offset = unpack_varint(view, offset)
+            items = []
+            for _ in range(count):
+                item, offset = self.unpack(view, offset)
+                items.append(item)
+            return items, offset
+        if tag == 0x64:  # d
+            count, offset = unpack_varint(view, offset)
+            items = {}
+            for _ in range(count):
+                key, offset = self.unpack(view, offset)
+                items[key], offset = self.unpack(view, offset)
+            return items, offset
+        raise ValueError(f"unknown binary tag {tag:#x}")
+
+
+def pack_varint(value, out):
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def unpack_varint(view, offset):
+    value = shift = 0
+    while True:
+        byte = view[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+        if shift > 63:
+            raise ValueError("varint too long")
+
+
+CODECS = {codec.name: codec for codec in (JsonCodec(), BinaryCodec())}
+
+
+class Protocol:
+    """A negotiated payload codec, sent either length-prefixed or (legacy) one per line."""
+
+    def __init__(self, codec, framed=True):
+        self.codec = codec
+        self.framed = framed
+
+    def pack(self, message):
+        payload = self.codec.encode(message)
+        if not self.framed:
+            return payload + b"\n"
+        if len(payload) > MAX_MESSAGE_BYTES:
+            raise ValueError(f"message of {len(payload)} bytes exceeds MAX_MESSAGE_BYTES")
+        return HEADER.pack(len(payload)) + payload
+
+    def decode(self, payload):
+        return self.codec.decode(payload)
+
+    async def read_payload(self, reader):
+        """Next payload from an asyncio StreamReader; None at end of stream."""
+        if not self.framed:
+            line = await reader.readline()
+            return line.strip() if line else None
+        try:
+            header = await reader.readexactly(HEADER.size)
+        except asyncio.IncompleteReadError as e:
+            if e.partial:
+                raise ConnectionError("connection closed mid-frame")
+            return None
+        return await reader.readexactly(frame_length(header))
+
+
+LINE_PROTOCOL = Protocol(CODECS["json"], framed=False)
+PROTOCOLS = {name: Protocol(codec) for name, codec in CODECS.items()}
+
+
+def frame_length(header):
+    length = HEADER.unpack(header)[0]
+    if length > MAX_MESSAGE_BYTES:
+        raise ValueError(f"frame of {length} bytes exceeds MAX_MESSAGE_BYTES")
+    return length
+
+
+def handshake_line(role, codecs=None):
+    return f"{role} {','.join(codecs or FRAME_CODECS)}\n".encode()
+
+
+def negotiate(line):
+    """
+    Server side of the handshake. Returns (role, protocol, reply); reply is
+    empty for legacy clients that did not offer codecs.
+    """
+    parts = line.decode().split()
+    if not parts:
+        raise ValueError("empty handshake")
+    if len(parts) == 1:
+        return parts[0], LINE_PROTOCOL, b""
+    for name in parts[1].split(","):
+        if name in PROTOCOLS:
+            return parts[0], PROTOCOLS[name], f"CODEC {name}\n".encode()
+    raise ValueError(f"no common codec in {parts[1]}")
+
+
+def accept_codec(reply):
+    """Client side: the Protocol named by the server's CODEC reply line."""
+    parts = reply.decode().split()
+    if len(parts) != 2 or parts[0] != "CODEC" or parts[1] not in PROTOCOLS:
+        raise ConnectionError(f"unexpected handshake reply {reply[:64]!r}")
+    return PROTOCOLS[parts[1]]
+
+
+class FramedSocket:
+    """
+    Blocking socket speaking the framed protocol. Received bytes collect in one
+    bytearray and frames are cut from it by offset, so a large message costs
+    linear time and a multi-byte character split across reads is never decoded
+    on its own.
+    """
+
+    def __init__(self, sock, protocol=None):
+        self.sock = sock
+        self.protocol = protocol
+        self.buffer = bytearray()
+        self.offset = 0
+
+    @classmethod
+    def connect(cls, address, role, timeout=None, codecs=None):
+        """Open a connection to a node and negotiate the payload codec."""
+        sock = socket.create_connection(address, timeout=timeout)
+        try:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            conn = cls(sock)
+            sock.sendall(handshake_line(role, codecs))
+            conn.protocol = accept_codec(conn.recv_line())
+            return conn
+        except BaseException:
+            sock.close()
+            raise
+
+    @classmethod
+    def accept(cls, sock):
+        """
+        Server side: read the handshake (or a legacy first request line).
+        Returns (conn, role, first_message); first_message is the legacy request, if any.
+        """
+        conn = cls(sock)
+        line = conn.recv_line()
+        if line.lstrip().startswith(b"{"):
+            conn.protocol = LINE_PROTOCOL
+            return conn, None, conn.protocol.decode(line)
+        role, conn.protocol, reply = negotiate(line)
+        if reply:
+            sock.sendall(reply)
+        return conn, role, None
+
+    def send(self, message):
+        self.sock.sendall(self.protocol.pack(message))
+
+    def send_many(self, messages):
+        self.sock.sendall(b"".join(self.protocol.pack(message) for message in messages))
+
+    def recv(self):
+        """Next message; raises ConnectionError if the peer closed the connection."""
+        if not self.protocol.framed:
+            return self.protocol.decode(self.recv_line())
+        length = frame_length(self.recv_exact(HEADER.size))
+        return self.protocol.decode(self.recv_exact(length))
+
+    def recv_line(self):
+        while True:
+            end = self.buffer.find(b"\n", self.offset)
+            if end >= 0:
+                return self.take(end + 1 - self.offset)[:-1]
+            if len(self.buffer) - self.offset > MAX_MESSAGE_BYTES:
+                raise ValueError("line exceeds MAX_MESSAGE_BYTES")
+            self.fill()
+
+    def recv_exact(self, size):
+        while len(self.buffer) - self.offset < size:
+            self.fill()
+        return self.take(size)
+
+    def take(self, size):
+        data = memoryview(self.buffer)[self.offset:self.offset + size].tobytes()
+        self.offset += size
+        if self.offset == len(self.buffer):
+            self.buffer.clear()
+            self.offset = 0
+        return data
+
+    def fill(self):
+        if self.offset and self.offset >= len(self.buffer) // 2:
+            del self.buffer[:self.offset]  # compact once the consumed part dominates
+            self.offset = 0
+        data = self.sock.recv(RECV_CHUNK)
+        if not data:
+            raise ConnectionError("connection closed by peer")
+        self.buffer += data
+
+    def pending(self):
+        """True if a received but unread message is already buffered."""
+        return self.offset < len(self.buffer)
+
+    def settimeout(self, timeout):
+        self.sock.settimeout(timeout)
+
+    def close(self):
+        try:
+            self.sock.close()
+        except OSError:
+            pass
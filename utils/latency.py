@@ -0,0 +1,8 @@
+def print_send_latency(latencies):
+    """Wallet send latency, including its balance query; pooled connections skip the reconnects"""
+    if not latencies:
+        return
+    latencies = sorted(latencies)
+    average = sum(latencies) / len(latencies) * 1000
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000
+    print(f"[TEST] Per-transaction send latency: avg {average:.2f} ms, p95 {p95:.2f} ms over {len(latencies)} sends")